@@ -6,6 +6,8 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.etl.nrel_loader_v2 import NRELLoaderV2
+from src.etl.ingest_engine import IngestEngine, nrel_monthly_job, pvwatts_hourly_job
+from src.etl.marts import MartBuilder
 from datetime import datetime, timedelta
 import pandas as pd
 from sqlalchemy import create_engine
@@ -41,27 +43,19 @@ try:
     print(f"  Records: {existing['count'][0]}")
     print(f"  Date range: {existing['earliest'][0]} to {existing['latest'][0]}")
     
-    # Load more data using different months
-    months_to_load = [
-        (33.4484, -112.0740, 'Phoenix'),
-        (39.7392, -104.9903, 'Denver'),
-        (37.7749, -122.4194, 'San Francisco')
+    # Load more data using different sites (Phoenix keeps the legacy site ids)
+    sites = [
+        {'name': 'Phoenix', 'lat': 33.4484, 'lon': -112.0740},
+        {'name': 'Denver', 'lat': 39.7392, 'lon': -104.9903, 'site_id': 'DENVER'},
+        {'name': 'San Francisco', 'lat': 37.7749, 'lon': -122.4194, 'site_id': 'SAN_FRANCISCO'}
     ]
     
-    total_loaded = 0
+    print(f"\n2️⃣ Loading data for {', '.join(site['name'] for site in sites)}...")
     
-    for lat, lon, city in months_to_load:
-        print(f"\n2️⃣ Loading data for {city} ({lat}, {lon})...")
-        
-        # Load monthly averages
-        monthly_records = loader.load_solar_resource_monthly(lat, lon)
-        total_loaded += monthly_records
-        
-        # Load hourly simulation
-        hourly_records = loader.load_pvwatts_hourly(lat, lon)
-        total_loaded += hourly_records
-        
-        print(f"  ✅ Loaded {monthly_records + hourly_records} records for {city}")
+    # Fetch all sites concurrently, one batch write per table
+    ingest = IngestEngine()
+    stats = ingest.run(sites, [nrel_monthly_job(loader), pvwatts_hourly_job(loader)])
+    total_loaded = sum(stats['rows_written'].values())
     
     # Check new totals
     new_totals = pd.read_sql("""
@@ -78,34 +72,9 @@ try:
     print("\n📈 Updated Database Summary:")
     print(new_totals.to_string(index=False))
     
-    # Create a mart table with hourly aggregates
-    print("\n3️⃣ Creating mart.pv_system_hourly table...")
-    
-    create_mart_sql = """
-    DROP TABLE IF EXISTS mart.pv_system_hourly;
-    
-    CREATE TABLE mart.pv_system_hourly AS
-    SELECT 
-        site_id,
-        DATE_TRUNC('hour', timestamp) as hour,
-        AVG(ac_power) as avg_ac_power,
-        MAX(ac_power) as max_ac_power,
-        AVG(poa_irradiance) as avg_poa_irradiance,
-        AVG(ambient_temp) as avg_ambient_temp,
-        COUNT(*) as sample_count,
-        EXTRACT(HOUR FROM timestamp) as hour_of_day,
-        EXTRACT(DOW FROM timestamp) as day_of_week,
-        EXTRACT(MONTH FROM timestamp) as month
-    FROM api_ingest.nrel_pvdaq
-    WHERE timestamp IS NOT NULL
-    GROUP BY site_id, DATE_TRUNC('hour', timestamp), timestamp;
-    
-    CREATE INDEX idx_pv_hourly_site_hour ON mart.pv_system_hourly(site_id, hour);
-    """
-    
-    with engine.connect() as conn:
-        conn.execute(create_mart_sql)
-        conn.commit()
+    # Fold the newly loaded hours into the hourly mart
+    print("\n3️⃣ Refreshing mart.pv_system_hourly table...")
+    MartBuilder(engine).refresh()
     
     # Check mart table
     mart_stats = pd.read_sql("""
@@ -117,7 +86,7 @@ try:
         FROM mart.pv_system_hourly
     """, engine)
     
-    print("\n✅ Created mart.pv_system_hourly:")
+    print("\n✅ Refreshed mart.pv_system_hourly:")
     print(f"   Total hourly records: {mart_stats['total_hours'][0]}")
     print(f"   Unique sites: {mart_stats['sites'][0]}")
     print(f"   Average power: {mart_stats['overall_avg_power'][0]:.0f} W")
@@ -6,9 +6,11 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
+from src.etl.marts import MartBuilder
+
 load_dotenv()
 
-print("📊 Creating mart.pv_system_hourly table...")
+print("📊 Refreshing mart.pv_system_hourly table...")
 print("=" * 60)
 
 try:
@@ -31,42 +33,8 @@ try:
     print(f"   Sites: {current_stats['sites'][0]}")
     print(f"   Date range: {current_stats['earliest'][0]} to {current_stats['latest'][0]}")
     
-    # Create mart table with proper SQL execution
-    with engine.connect() as conn:
-        # Drop existing table
-        conn.execute(text("DROP TABLE IF EXISTS mart.pv_system_hourly"))
-        conn.commit()
-        
-        # Create new table
-        create_table_sql = text("""
-            CREATE TABLE mart.pv_system_hourly AS
-            SELECT 
-                site_id,
-                DATE_TRUNC('hour', timestamp) as hour,
-                AVG(ac_power) as avg_ac_power,
-                MAX(ac_power) as max_ac_power,
-                MIN(ac_power) as min_ac_power,
-                AVG(dc_power) as avg_dc_power,
-                AVG(poa_irradiance) as avg_poa_irradiance,
-                AVG(ambient_temp) as avg_ambient_temp,
-                COUNT(*) as sample_count,
-                EXTRACT(HOUR FROM DATE_TRUNC('hour', timestamp)) as hour_of_day,
-                EXTRACT(DOW FROM DATE_TRUNC('hour', timestamp)) as day_of_week,
-                EXTRACT(MONTH FROM DATE_TRUNC('hour', timestamp)) as month
-            FROM api_ingest.nrel_pvdaq
-            WHERE timestamp IS NOT NULL
-                AND ac_power IS NOT NULL
-            GROUP BY site_id, DATE_TRUNC('hour', timestamp)
-        """)
-        
-        conn.execute(create_table_sql)
-        conn.commit()
-        
-        # Create index
-        conn.execute(text("CREATE INDEX idx_pv_hourly_site_hour ON mart.pv_system_hourly(site_id, hour)"))
-        conn.commit()
-        
-        print("\n✅ Created mart.pv_system_hourly table")
+    # Merge the hours loaded since the last refresh into the mart; it stays readable throughout
+    MartBuilder(engine).refresh()
     
     # Verify the mart table
     mart_stats = pd.read_sql("""
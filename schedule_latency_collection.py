@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.etl.latency_collector import LatencyCollector
+from src.etl.partitions import PartitionManager
 from build_api_health_panel import build_api_health_panel
 
 def collect_and_build():
@@ -31,13 +32,22 @@ def collect_and_build():
     except Exception as e:
         print(f"❌ Error in collection: {e}")
 
+def maintain_partitions():
+    """Pre-create next months' ingest partitions and apply retention"""
+    try:
+        PartitionManager().run()
+    except Exception as e:
+        print(f"❌ Error in partition maintenance: {e}")
+
 def run_scheduler():
     """Run the scheduler"""
     # Run immediately
     collect_and_build()
+    maintain_partitions()
     
     # Schedule every 5 minutes
     schedule.every(5).minutes.do(collect_and_build)
+    schedule.every().day.at("00:10").do(maintain_partitions)
     
     print("🕐 Latency collector started. Running every 5 minutes...")
     print("   Press Ctrl+C to stop")
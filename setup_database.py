@@ -3,6 +3,7 @@ import os
 import psycopg2
 from psycopg2 import sql
 from dotenv import load_dotenv
+from src.etl.migrations import get_db_engine, run_migrations
 
 load_dotenv()
 
@@ -29,33 +30,8 @@ try:
     cur.close()
     conn.close()
     
-    # Now connect to the new database and create schemas
-    conn = psycopg2.connect(
-        database='solar_analytics',
-        host=os.getenv('DB_HOST', 'localhost'),
-        user=os.getenv('DB_USER', 'postgres'),
-        password=os.getenv('DB_PASSWORD')
-    )
-    cur = conn.cursor()
-    
-    # Create schemas
-    cur.execute("CREATE SCHEMA IF NOT EXISTS api_ingest;")
-    cur.execute("CREATE SCHEMA IF NOT EXISTS mart;")
-    print("✅ Created schemas")
-    
-    # Create simple table for testing
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS api_ingest.test_table (
-            id SERIAL PRIMARY KEY,
-            data TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    print("✅ Created test table")
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+    # Schemas and tables come from the versioned migrations
+    run_migrations(get_db_engine())
     
     print("✅ Database setup complete!")
     
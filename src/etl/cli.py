@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""Command-line helpers shared by the python -m src.etl.* entry points"""
+
+import sys
+import json
+
+# Sites a multi-site command runs for when it is given no --sites file
+DEFAULT_SITES = [
+    {'name': 'Phoenix', 'lat': 33.4484, 'lon': -112.0740, 'site_id': 'PHOENIX'},
+    {'name': 'Denver', 'lat': 39.7392, 'lon': -104.9903, 'site_id': 'DENVER'},
+    {'name': 'San Francisco', 'lat': 37.7749, 'lon': -122.4194, 'site_id': 'SAN_FRANCISCO'},
+]
+
+
+def arg(name, default, cast=str):
+    """The value after flag `name` in sys.argv, cast; default if the flag is absent"""
+    if name in sys.argv:
+        return cast(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def load_sites(flag='--sites'):
+    """Site dicts from the JSON file named by `flag`, None if it isn't given"""
+    path = arg(flag, None)
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Vectorized data-quality rules for ingest batches
+
+Each rule is a handful of numpy operations over a whole batch and yields a
+violation mask. Violations of 'flag' rules set the rule's bit in the row's
+dq_flags and the row is still written; 'quarantine' rules divert the row to
+api_ingest.dq_quarantine instead. Per-rule violation counts accumulate per
+process and are written to api_ingest.dq_rule_counts by record_counts().
+
+    python -m src.etl.data_quality [rows]   # overhead benchmark vs the upsert
+"""
+
+import sys
+import time
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+IRRADIANCE_COLUMNS = ['ghi', 'dni', 'dhi', 'poa_irradiance']
+IRRADIANCE_TOLERANCE = 5.0          # W/m2; sensors read slightly negative at night
+NIGHT_AC_TOLERANCE = 1.0            # W of AC output allowed with no irradiance (inverter tare)
+STUCK_DURATION = pd.Timedelta(hours=4)
+# Temperatures are left out: integer-rounded readings can legitimately hold for hours
+STUCK_COLUMNS = ['ghi', 'dni', 'dhi', 'poa_irradiance', 'ac_power', 'dc_power']
+TEMPERATURE_RANGE = (-60.0, 60.0)   # degC, ambient
+SOLAR_CONSTANT = 1361.0             # W/m2
+
+
+def _values(df, column):
+    """Column as a float array, NaN for missing"""
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def ghi_upper_limit(timestamps, latitude=None):
+    """BSRN "extremely rare" GHI limit at the day's solar noon
+
+    1.2 * E0 * cos(Z)^1.2 + 50 evaluated at noon is the highest the limit gets
+    that day, so it needs no time zone; without a latitude cos(Z) = 1.
+    """
+    doy = pd.DatetimeIndex(timestamps).dayofyear.to_numpy()
+    e0 = SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * doy / 365))
+    if latitude is None:
+        cos_noon = 1.0
+    else:
+        declination = 23.45 * np.sin(2 * np.pi * (284 + doy) / 365)
+        cos_noon = np.clip(np.cos(np.radians(np.asarray(latitude, dtype=float) - declination)), 0, None)
+    return 1.2 * e0 * cos_noon ** 1.2 + 50
+
+
+def negative_irradiance(df, latitude):
+    mask = np.zeros(len(df), dtype=bool)
+    for column in IRRADIANCE_COLUMNS:
+        if column in df:
+            mask |= _values(df, column) < -IRRADIANCE_TOLERANCE
+    return mask
+
+
+def ghi_above_clear_sky(df, latitude):
+    return _values(df, 'ghi') > ghi_upper_limit(df['timestamp'], latitude)
+
+
+def night_generation(df, latitude):
+    """AC output while the measured irradiance (POA, else GHI) is zero"""
+    irradiance = _values(df, 'poa_irradiance' if 'poa_irradiance' in df else 'ghi')
+    return (irradiance <= 0) & (_values(df, 'ac_power') > NIGHT_AC_TOLERANCE)
+
+
+def stuck_sensor(df, latitude):
+    """Same nonzero reading for STUCK_DURATION or longer at one site (within the batch)"""
+    sites = pd.factorize(df['site_id'])[0]
+    times = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]')
+    order = np.lexsort((times, sites))
+    sites, times = sites[order], times[order]
+    same_site = np.r_[False, sites[1:] == sites[:-1]]
+
+    stuck = np.zeros(len(df), dtype=bool)
+    for column in STUCK_COLUMNS:
+        if column not in df:
+            continue
+        values = _values(df, column)[order]
+        starts = ~(same_site & np.r_[False, values[1:] == values[:-1]])
+        run_ids = np.cumsum(starts) - 1
+        start_idx = np.flatnonzero(starts)
+        end_idx = np.r_[start_idx[1:] - 1, len(values) - 1]
+        span = (times[end_idx] - times[start_idx])[run_ids]
+        stuck |= (span >= STUCK_DURATION.to_timedelta64()) & (values != 0) & ~np.isnan(values)
+
+    mask = np.zeros(len(df), dtype=bool)
+    mask[order] = stuck
+    return mask
+
+
+def temperature_out_of_range(df, latitude):
+    values = _values(df, 'ambient_temp')
+    low, high = TEMPERATURE_RANGE
+    return (values < low) | (values > high)
+
+
+class Rule:
+    """A named check with its dq_flags bit; runs when any of `columns` is present"""
+
+    def __init__(self, name, bit, action, columns, check, requires=('site_id', 'timestamp')):
+        if action not in ('flag', 'quarantine'):
+            raise ValueError("action must be 'flag' or 'quarantine'")
+        self.name = name
+        self.bit = bit
+        self.action = action
+        self.columns = columns
+        self.check = check  # callable(df, latitude) -> bool array
+        self.requires = requires
+
+    def applies(self, df):
+        return all(c in df for c in self.requires) and any(c in df for c in self.columns)
+
+
+# Table -> rules; bits are stored in dq_flags, so never reuse one
+RULES = {
+    'nrel_pvdaq': [
+        Rule('negative_irradiance', 1, 'quarantine', IRRADIANCE_COLUMNS, negative_irradiance),
+        Rule('ghi_above_clear_sky', 2, 'quarantine', ['ghi'], ghi_above_clear_sky),
+        Rule('night_generation', 4, 'flag', ['poa_irradiance', 'ghi'], night_generation,
+             requires=('ac_power',)),
+        Rule('stuck_sensor', 8, 'flag', STUCK_COLUMNS, stuck_sensor),
+        Rule('temperature_out_of_range', 16, 'quarantine', ['ambient_temp'], temperature_out_of_range),
+    ],
+}
+
+
+class DataQuality:
+    """Apply RULES to batches and keep per-rule violation counts"""
+
+    def __init__(self, engine, rules=None):
+        self.engine = engine
+        self.rules = RULES if rules is None else rules
+        self._lock = threading.Lock()
+        self.counters = defaultdict(lambda: {'rows_checked': 0, 'violations': 0})
+
+    def check(self, df, table, latitude=None):
+        """(rows to write with dq_flags, dq_quarantine rows or None)
+
+        Frames for a table with rules always get dq_flags, 0 when no rule
+        applies, so a re-load clears the flags of an earlier one.
+        """
+        if table not in self.rules:
+            return df, None
+        rules = [rule for rule in self.rules[table] if rule.applies(df)]
+        if not rules or df.empty:
+            return df.assign(dq_flags=np.zeros(len(df), dtype=np.int32)), None
+
+        flags = np.zeros(len(df), dtype=np.int32)
+        quarantine = np.zeros(len(df), dtype=bool)
+        counts = {}
+        for rule in rules:
+            mask = rule.check(df, latitude)
+            flags[mask] |= rule.bit
+            if rule.action == 'quarantine':
+                quarantine |= mask
+            counts[rule] = int(mask.sum())
+
+        with self._lock:
+            for rule, violations in counts.items():
+                counter = self.counters[(table, rule.name, rule.action)]
+                counter['rows_checked'] += len(df)
+                counter['violations'] += violations
+
+        if not quarantine.any():
+            return df.assign(dq_flags=flags), None
+
+        keep = ~quarantine
+        bad = df[quarantine]
+        quarantined = pd.DataFrame({
+            'table_name': table,
+            'site_id': bad['site_id'].to_numpy(),
+            'timestamp': bad['timestamp'].to_numpy(),
+            'dq_flags': flags[quarantine],
+            'row_json': bad.to_json(orient='records', lines=True, date_format='iso').splitlines()
+        })
+        return df[keep].assign(dq_flags=flags[keep]), quarantined
+
+    def write(self, writer, df, table, schema='api_ingest', latitude=None):
+        """check() and upsert both parts; returns rows written to the target table"""
+        clean, quarantined = self.check(df, table, latitude)
+        if quarantined is not None:
+            writer.upsert(quarantined, 'dq_quarantine')
+        return writer.upsert(clean, table, schema=schema)
+
+    def stats(self):
+        with self._lock:
+            return {key: dict(counter) for key, counter in self.counters.items()}
+
+    def record_counts(self):
+        """Write the accumulated per-rule counts to api_ingest.dq_rule_counts and reset"""
+        with self._lock:
+            counts = [{'table_name': table, 'rule': rule, 'action': action, **counter}
+                      for (table, rule, action), counter in self.counters.items()]
+            self.counters.clear()
+        if not counts:
+            return 0
+
+        with self.engine.connect() as conn:
+            conn.execute(text("""
+                INSERT INTO api_ingest.dq_rule_counts (table_name, rule, action, rows_checked, violations)
+                VALUES (:table_name, :rule, :action, :rows_checked, :violations)
+            """), counts)
+            conn.commit()
+        return len(counts)
+
+    def print_stats(self):
+        stats = self.stats()
+        if not stats:
+            return
+        print("\n🧪 Data quality:")
+        for (table, rule, action), s in sorted(stats.items()):
+            rate = s['violations'] / s['rows_checked'] * 100 if s['rows_checked'] else 0.0
+            print(f"  {table}.{rule} ({action}): {s['violations']:,} of {s['rows_checked']:,} rows ({rate:.2f}%)")
+
+
+def benchmark(engine, rows=1_000_000):
+    """Time check() on one batch against the upsert of the same batch"""
+    from src.etl.bulk_writer import BulkWriter
+
+    rng = np.random.default_rng(0)
+    hours = np.arange(rows) % 8760
+    sun = np.clip(np.sin(np.radians((hours % 24 - 6) * 15)), 0, None)
+    df = pd.DataFrame({
+        'site_id': 'DQ_BENCH_' + pd.Series(np.arange(rows) // 8760).astype(str),
+        'timestamp': pd.Timestamp('2023-01-01') + pd.to_timedelta(hours, unit='h'),
+        'ac_power': sun * rng.uniform(2000, 4000, rows),
+        'dc_power': sun * rng.uniform(2100, 4200, rows),
+        'poa_irradiance': sun * rng.uniform(200, 1000, rows),
+        'ghi': sun * rng.uniform(200, 800, rows),
+        'ambient_temp': rng.normal(20, 6, rows)
+    })
+    # Seed some violations
+    df.loc[df.index[::997], 'ghi'] = -50
+    df.loc[df.index[::1999], 'ghi'] = 3000
+
+    quality = DataQuality(engine)
+    start = time.perf_counter()
+    clean, quarantined = quality.check(df, 'nrel_pvdaq', latitude=33.45)
+    check_seconds = time.perf_counter() - start
+
+    writer = BulkWriter(engine)
+    try:
+        start = time.perf_counter()
+        writer.upsert(clean, 'nrel_pvdaq')
+        write_seconds = time.perf_counter() - start
+    finally:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM api_ingest.nrel_pvdaq WHERE site_id LIKE 'DQ_BENCH_%%'")
+
+    print(f"⏱️  Data-quality benchmark: {rows:,} rows")
+    print(f"  check:  {check_seconds:.2f}s ({rows / check_seconds:,.0f} rows/sec), "
+          f"{len(quarantined) if quarantined is not None else 0:,} quarantined")
+    print(f"  upsert: {write_seconds:.2f}s ({len(clean) / write_seconds:,.0f} rows/sec)")
+    print(f"  overhead: {check_seconds / write_seconds * 100:.1f}% of write time")
+    quality.print_stats()
+
+
+if __name__ == "__main__":
+    from src.etl.migrations import ensure_schema, get_db_engine
+
+    engine = get_db_engine()
+    ensure_schema(engine)
+    benchmark(engine, int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
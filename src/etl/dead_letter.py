@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Disk-backed dead-letter queue for failed fetches and rejected rows
+
+Failures are appended as JSON lines to segment files under DEAD_LETTER_DIR:
+a 'fetch' entry records the job and the site params it was called with, a
+'rows' entry records a batch that failed validation or insertion. Segments
+are append-only; the one being written ends in .open and is sealed to .jsonl
+when it fills up or the writer closes. Replay drains sealed segments in bulk
+(one ingest run per job, one upsert per table) and deletes them, so a
+transient outage costs a replay of just the failed slice. Batches that never
+got through validation are checked again on replay, like a fresh ingest.
+
+    python -m src.etl.dead_letter status
+    python -m src.etl.dead_letter replay [--workers N]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from collections import defaultdict
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.etl.cli import arg
+
+load_dotenv()
+
+DEAD_LETTER_DIR = os.getenv('DEAD_LETTER_DIR', '.cache/dead_letters')
+DEFAULT_SEGMENT_BYTES = int(os.getenv('DEAD_LETTER_SEGMENT_MB', 64)) * 1024 * 1024
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _site_key(site):
+    return site.get('site_id'), site.get('lat'), site.get('lon')
+
+
+class DeadLetterQueue:
+    """Append-only segment files of failed work, safe to share between threads"""
+
+    def __init__(self, directory=DEAD_LETTER_DIR, segment_bytes=DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._seq = 0
+        self.counters = defaultdict(int)
+        atexit.register(self.close)
+
+    # --- writing ---
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq += 1
+        name = f"segment-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._seq:04d}.open"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, 'a', encoding='utf-8')
+
+    def _seal(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path, self._path[:-len('.open')] + '.jsonl')
+        self._file = self._path = None
+
+    def _append(self, entry):
+        line = json.dumps(entry, default=str, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(line)
+            self._file.flush()
+            self.counters[entry['kind']] += 1
+            if self._file.tell() >= self.segment_bytes:
+                self._seal()
+
+    def put_fetch(self, job, sites, error):
+        """A fetch that raised or came back empty; sites are the params to call it with again"""
+        self._append({'kind': 'fetch', 'failed_at': time.time(), 'job': job,
+                      'sites': list(sites), 'error': str(error)})
+
+    def put_rows(self, df, table, schema='api_ingest', error=None, stage='write', latitude=None):
+        """A batch that failed in `stage`; stored column-wise so dtypes mostly survive
+
+        latitude is the site's, for re-running validation on a 'validate' batch.
+        """
+        if df is None or df.empty:
+            return
+        self._append({'kind': 'rows', 'failed_at': time.time(), 'schema': schema, 'table': table,
+                      'stage': stage, 'latitude': latitude, 'error': str(error), 'row_count': len(df),
+                      'rows': df.to_json(orient='split', index=False, date_format='iso', date_unit='us')})
+
+    def close(self):
+        with self._lock:
+            self._seal()
+
+    # --- reading ---
+
+    def segments(self):
+        """Sealed segments plus .open ones left behind by dead processes, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        paths = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.jsonl'):
+                paths.append(path)
+            elif name.endswith('.open') and path != self._path:
+                pid = int(name.split('-')[2])
+                if pid != os.getpid() and not _pid_alive(pid):
+                    paths.append(path)
+        return paths
+
+    @staticmethod
+    def read_segment(path):
+        entries = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass  # torn last line from a crash mid-write
+        return entries
+
+    def stats(self):
+        summary = {'segments': 0, 'bytes': 0, 'fetch': defaultdict(int), 'rows': defaultdict(int)}
+        for path in self.segments():
+            summary['segments'] += 1
+            summary['bytes'] += os.path.getsize(path)
+            for entry in self.read_segment(path):
+                if entry['kind'] == 'fetch':
+                    summary['fetch'][entry['job']] += len(entry['sites'])
+                else:
+                    summary['rows'][f"{entry['schema']}.{entry['table']}"] += entry['row_count']
+        return summary
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"\n📮 Dead letters: {s['segments']} segments, {s['bytes'] / 1024:.1f} KB")
+        for job, sites in sorted(s['fetch'].items()):
+            print(f"  fetch {job}: {sites} sites")
+        for table, rows in sorted(s['rows'].items()):
+            print(f"  rows {table}: {rows:,}")
+
+
+def rows_frame(entry):
+    return pd.read_json(io.StringIO(entry['rows']), orient='split', convert_dates=True)
+
+
+def _replay_noaa(sites, max_workers):
+    from src.etl.noaa_loader import NOAALoader
+    stats = NOAALoader().load_sites(sites, max_workers=max_workers)
+    return {'api_ingest.noaa_weather': stats['rows_written']}
+
+
+# Fetch jobs that don't run through IngestEngine: name -> callable(sites, max_workers) -> rows per table
+LOADER_REPLAYS = {
+    'noaa_hourly': _replay_noaa,
+}
+
+
+def _replay_upsert(engine, dlq, df, table, schema, written):
+    """Upsert replayed rows, dead-lettering them again if the write fails"""
+    if df is None or df.empty:
+        return
+    try:
+        rows = engine.writer.upsert(df, table, schema=schema)
+    except Exception as e:
+        print(f"❌ Replay of {schema}.{table} rows failed: {e}")
+        dlq.put_rows(df, table, schema=schema, error=e, stage='replay')
+        return
+    written[f"{schema}.{table}"] = written.get(f"{schema}.{table}", 0) + rows
+
+
+def replay(dlq=None, max_workers=None, engine=None):
+    """Drain every sealed segment: re-run failed fetches per job, re-upsert failed rows per table
+
+    Rows that failed in the validate stage were never checked, so they go
+    through the engine's data-quality rules (and quarantine) before the
+    upsert; rows that failed later were already validated and are upserted
+    as they are. Anything that fails again is dead-lettered again by the
+    engine (or here), so drained segments are always deleted.
+    """
+    from src.etl.ingest_engine import IngestEngine, DEFAULT_MAX_WORKERS, job_by_name
+
+    dlq = dlq or get_queue()
+    paths = dlq.segments()
+    if not paths:
+        print("📮 Dead-letter queue is empty")
+        return {'segments': 0, 'fetch_sites': {}, 'rows_written': {}}
+
+    fetches = defaultdict(dict)
+    batches = defaultdict(list)
+    unvalidated = defaultdict(list)
+    for path in paths:
+        for entry in dlq.read_segment(path):
+            if entry['kind'] == 'fetch':
+                for site in entry['sites']:
+                    fetches[entry['job']].setdefault(_site_key(site), site)
+            elif entry.get('stage') == 'validate':
+                unvalidated[(entry['schema'], entry['table'], entry.get('latitude'))].append(entry)
+            else:
+                batches[(entry['schema'], entry['table'])].append(entry)
+
+    failed_rows = sum(e['row_count'] for group in (batches, unvalidated)
+                      for entries in group.values() for e in entries)
+    print(f"📮 Replaying {len(paths)} dead-letter segments: "
+          f"{sum(len(s) for s in fetches.values())} failed fetches, {failed_rows:,} failed rows")
+
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    engine = engine or IngestEngine(max_workers=max_workers, dead_letters=dlq)
+
+    # Rows first: they need no API calls
+    written = {}
+    for (schema, table), entries in batches.items():
+        df = pd.concat([rows_frame(e) for e in entries], ignore_index=True)
+        _replay_upsert(engine, dlq, df, table, schema, written)
+
+    for (schema, table, latitude), entries in unvalidated.items():
+        df = pd.concat([rows_frame(e) for e in entries], ignore_index=True)
+        try:
+            clean, quarantined = engine.quality.check(df, table, latitude=latitude)
+        except Exception as e:
+            print(f"❌ Replay validation of {schema}.{table} rows failed: {e}")
+            dlq.put_rows(df, table, schema=schema, error=e, stage='validate', latitude=latitude)
+            continue
+        _replay_upsert(engine, dlq, quarantined, 'dq_quarantine', 'api_ingest', written)
+        _replay_upsert(engine, dlq, clean, table, schema, written)
+    if unvalidated:
+        engine.quality.record_counts()
+
+    # One run per job over all of its failed sites
+    for name, sites in fetches.items():
+        sites = list(sites.values())
+        if name in LOADER_REPLAYS:
+            rows_written = LOADER_REPLAYS[name](sites, max_workers)
+        else:
+            job = job_by_name(name)
+            if job is None:
+                print(f"⚠️  No job named {name}; dead-lettering its {len(sites)} sites again")
+                dlq.put_fetch(name, sites, 'unknown job')
+                continue
+            rows_written = engine.run(sites, [job])['rows_written']
+        for table, rows in rows_written.items():
+            written[table] = written.get(table, 0) + rows
+
+    dlq.close()
+    for path in paths:
+        os.remove(path)
+
+    print(f"✅ Dead-letter replay complete: {written}")
+    return {'segments': len(paths), 'fetch_sites': {job: len(s) for job, s in fetches.items()},
+            'rows_written': written}
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Process-wide dead-letter queue"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = DeadLetterQueue()
+        return _queue
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'replay':
+        replay(max_workers=arg('--workers', None, int))
+    elif command == 'status':
+        get_queue().print_stats()
+    else:
+        print("Usage: python -m src.etl.dead_letter [status|replay] [--workers N]")
+        sys.exit(1)
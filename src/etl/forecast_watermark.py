@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Per-site watermarks for incremental Tomorrow.io forecast ingestion
+
+Each site keeps the issue time of its last stored forecast run and the
+furthest valid_time already stored. A new run only writes intervals beyond
+that horizon, plus intervals inside it whose values changed since they were
+last stored.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# Forecast values compared against the stored copy of each interval
+VALUE_COLUMNS = [
+    'temperature', 'cloud_cover', 'precipitation_intensity',
+    'humidity', 'wind_speed', 'dew_point', 'solar_ghi', 'solar_dni'
+]
+
+
+def _naive_utc(values):
+    """valid_time as naive UTC, matching the TIMESTAMP columns"""
+    return pd.to_datetime(values, utc=True).dt.tz_localize(None)
+
+
+class ForecastWatermarks:
+    """Read, apply and advance api_ingest.tomorrow_watermarks"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get(self, lat, lon):
+        """(last_forecast_time, valid_time_horizon) or None for a new site"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT last_forecast_time, valid_time_horizon
+                FROM api_ingest.tomorrow_watermarks
+                WHERE location_lat = :lat AND location_lon = :lon
+            """), {'lat': lat, 'lon': lon}).fetchone()
+        if row is None:
+            return None
+        return pd.Timestamp(row.last_forecast_time), pd.Timestamp(row.valid_time_horizon)
+
+    def _stored_values(self, lat, lon, start, end, columns):
+        """Latest stored copy of every interval in [start, end]"""
+        select = ', '.join(columns)
+        return pd.read_sql(text(f"""
+            SELECT DISTINCT ON (valid_time) valid_time, {select}
+            FROM api_ingest.tomorrow_weather
+            WHERE location_lat = :lat AND location_lon = :lon
+              AND valid_time BETWEEN :start AND :end
+            ORDER BY valid_time, forecast_time DESC
+        """), self.engine, params={'lat': lat, 'lon': lon, 'start': start, 'end': end})
+
+    def filter_new_or_changed(self, df, lat, lon):
+        """Drop intervals that are already stored with identical values"""
+        if df.empty:
+            return df
+
+        watermark = self.get(lat, lon)
+        if watermark is None:
+            return df
+        _, horizon = watermark
+
+        valid_time = _naive_utc(df['valid_time'])
+        beyond = (valid_time > horizon).to_numpy()
+        if beyond.all():
+            return df
+
+        columns = [c for c in VALUE_COLUMNS if c in df.columns]
+        stored = self._stored_values(lat, lon, valid_time.min(), horizon, columns)
+        if stored.empty:
+            return df
+
+        # Vectorized compare against the stored copy; NaN == NaN counts as unchanged
+        merged = pd.DataFrame({'valid_time': valid_time.to_numpy()}).merge(
+            stored, on='valid_time', how='left', indicator=True)
+        unchanged = (merged['_merge'] == 'both').to_numpy().copy()
+        for column in columns:
+            new = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+            old = pd.to_numeric(merged[column], errors='coerce').to_numpy(dtype=float)
+            unchanged &= np.isclose(new, old, equal_nan=True)
+
+        return df[beyond | ~unchanged]
+
+    def advance(self, lat, lon, forecast_time, horizon):
+        """Record a stored run; the horizon only ever moves forward"""
+        with self.engine.connect() as conn:
+            conn.execute(text("""
+                INSERT INTO api_ingest.tomorrow_watermarks
+                    (location_lat, location_lon, last_forecast_time, valid_time_horizon, updated_at)
+                VALUES (:lat, :lon, :forecast_time, :horizon, NOW())
+                ON CONFLICT (location_lat, location_lon) DO UPDATE SET
+                    last_forecast_time = GREATEST(api_ingest.tomorrow_watermarks.last_forecast_time,
+                                                  EXCLUDED.last_forecast_time),
+                    valid_time_horizon = GREATEST(api_ingest.tomorrow_watermarks.valid_time_horizon,
+                                                  EXCLUDED.valid_time_horizon),
+                    updated_at = NOW()
+            """), {'lat': lat, 'lon': lon,
+                   'forecast_time': pd.Timestamp(forecast_time).to_pydatetime(),
+                   'horizon': pd.Timestamp(horizon).to_pydatetime()})
+            conn.commit()
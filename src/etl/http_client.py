@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Shared pooled HTTP client for all API loaders
+
+Every loader goes through one requests.Session so TCP+TLS connections are
+kept alive and reused per host instead of being re-opened on each call.
+Rate-limiter waits and response times are recorded per provider as the
+rate_limit_wait and http_wait stages (see metrics).
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from src.etl import metrics, rate_limiter
+
+load_dotenv()
+
+DEFAULT_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 20))  # hosts kept pooled
+DEFAULT_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 32))          # connections per host
+DEFAULT_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+DEFAULT_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.5))
+RETRY_STATUSES = (500, 502, 503, 504)
+THROTTLE_RETRIES = 3  # re-sends after a 429, each one waiting out Retry-After
+
+
+def _wire_bytes(resp, stream=False):
+    """Bytes pulled over the wire (compressed); streamed bodies aren't read yet"""
+    if stream:
+        return int(resp.headers.get('Content-Length') or 0)
+    return resp.raw.tell() if hasattr(resp.raw, 'tell') else len(resp.content)
+
+
+class HttpClient:
+    """Keep-alive session with per-host pools, retries, rate limiting and per-host stats"""
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, scheduler=None,
+                 rate_limited=True, base_url=None):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+            # 429s go back to the scheduler (it pauses the whole bucket), not a blind re-send
+            respect_retry_after_header=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'SolarAnalytics/1.0'
+        })
+        self.mount(self.adapter)
+
+        if rate_limited:
+            self.scheduler = scheduler or rate_limiter.get_scheduler()
+        else:
+            self.scheduler = None
+
+        # MOCK_API_URL points every provider at a local stand-in (see mock_api.py)
+        self.base_url = base_url or os.getenv('MOCK_API_URL')
+
+        self._lock = threading.Lock()
+        self._host_stats = {}
+
+        # API_RECORD / API_REPLAY swap in the fixture transport (see replay.py)
+        from src.etl import replay
+        replay.install_from_env(self)
+
+    def mount(self, adapter):
+        """Route all http(s) traffic through adapter (pooled, recording or replay)"""
+        self.adapter = adapter
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _target(self, url):
+        """url re-rooted at base_url when one is set (path and query kept)"""
+        if not self.base_url:
+            return url
+        base = urlsplit(self.base_url)
+        parts = urlsplit(url)
+        return urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path,
+                           parts.query, parts.fragment))
+
+    def _record(self, host, ttfb_ms=None, nbytes=0, error=False):
+        with self._lock:
+            stats = self._host_stats.setdefault(host, {
+                'requests': 0, 'errors': 0, 'bytes': 0,
+                'ttfb_total_ms': 0.0, 'ttfb_max_ms': 0.0
+            })
+            stats['requests'] += 1
+            if error:
+                stats['errors'] += 1
+                return
+            stats['bytes'] += nbytes
+            stats['ttfb_total_ms'] += ttfb_ms
+            stats['ttfb_max_ms'] = max(stats['ttfb_max_ms'], ttfb_ms)
+
+    def _timed_request(self, provider, method, target, **kwargs):
+        """One session request, recorded as the provider's http_wait (body included unless streamed)"""
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, target, **kwargs)
+        except requests.RequestException:
+            metrics.record(provider, 'http_wait', time.perf_counter() - start, error=True)
+            raise
+        metrics.record(provider, 'http_wait', time.perf_counter() - start,
+                       nbytes=_wire_bytes(resp, kwargs.get('stream')), error=resp.status_code >= 400)
+        return resp
+
+    def _send(self, method, url, priority, **kwargs):
+        """Send once per free token, re-sending after 429s once Retry-After passes"""
+        # Providers are always identified by the original host, even when re-rooted
+        target = self._target(url)
+        provider = rate_limiter.provider_for_url(url) or urlsplit(url).netloc
+        if self.scheduler is None:
+            return self._timed_request(provider, method, target, **kwargs)
+
+        api_key = rate_limiter.api_key_from_params(kwargs.get('params'))
+        for attempt in range(THROTTLE_RETRIES + 1):
+            start = time.perf_counter()
+            self.scheduler.acquire(provider, api_key, priority)
+            metrics.record(provider, 'rate_limit_wait', time.perf_counter() - start)
+            resp = self._timed_request(provider, method, target, **kwargs)
+            if resp.status_code != 429 or attempt == THROTTLE_RETRIES:
+                return resp
+            self.scheduler.report(provider, api_key, resp)
+            resp.close()
+
+    def request(self, method, url, priority=rate_limiter.PRIORITY_REALTIME, **kwargs):
+        """Send a request through the shared pool and record host stats"""
+        host = urlsplit(self._target(url)).netloc
+        try:
+            resp = self._send(method, url, priority, **kwargs)
+        except requests.RequestException:
+            self._record(host, error=True)
+            raise
+
+        # elapsed covers send -> response headers parsed, i.e. time to first byte
+        self._record(host, resp.elapsed.total_seconds() * 1000, _wire_bytes(resp, kwargs.get('stream')))
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def stats(self):
+        """Per-host connection reuse, bytes and time-to-first-byte"""
+        pools = {}
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            opened, sent = pools.get(host, (0, 0))
+            pools[host] = (opened + pool.num_connections, sent + pool.num_requests)
+
+        with self._lock:
+            report = {}
+            for host, stats in self._host_stats.items():
+                opened, sent = pools.get(host, (0, 0))
+                ok = stats['requests'] - stats['errors']
+                report[host] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'connections_opened': opened,
+                    'connections_reused': max(sent - opened, 0),
+                    'bytes': stats['bytes'],
+                    'avg_ttfb_ms': round(stats['ttfb_total_ms'] / ok, 2) if ok else 0.0,
+                    'max_ttfb_ms': round(stats['ttfb_max_ms'], 2)
+                }
+            return report
+
+    def print_stats(self):
+        print("\n🌐 HTTP pool stats:")
+        for host, s in sorted(self.stats().items()):
+            print(f"  {host}: {s['requests']} requests, "
+                  f"{s['connections_opened']} opened / {s['connections_reused']} reused, "
+                  f"{s['bytes'] / 1024:.1f} KB, TTFB avg {s['avg_ttfb_ms']}ms max {s['max_ttfb_ms']}ms")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide shared client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    return get_client().head(url, **kwargs)
+
+
+def host_stats():
+    return get_client().stats()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Concurrent multi-site ingestion engine
+
+Runs per-site fetches as a staged pipeline (fetch -> transform -> validate
+-> write), caps the number of in-flight requests per API provider, and
+writes results in large per-table batches while later fetches are still in
+flight. Jobs that can relabel their rows are fetched once per provider grid
+cell (see spatial_index) and fanned out to the member sites. Failed fetches
+and batches that fail validation or writing go to the dead-letter queue
+(see dead_letter) for replay.
+"""
+
+import time
+import threading
+from itertools import zip_longest
+
+from dotenv import load_dotenv
+
+from src.etl import http_client, rate_limiter, response_cache
+from src.etl.bulk_writer import BulkWriter
+from src.etl.data_quality import DataQuality
+from src.etl.dead_letter import get_queue
+from src.etl.metrics import PipelineRun
+from src.etl.migrations import ensure_schema, get_db_engine
+from src.etl.pipeline import (Pipeline, Stage, BatchWriteStage, BatchWriteError,
+                              DEFAULT_BATCH_ROWS, DEFAULT_QUEUE_SIZE)
+from src.etl.spatial_index import SpatialIndex, cell_degrees
+
+load_dotenv()
+
+# Max in-flight requests per provider (fetches are I/O bound)
+PROVIDER_CONCURRENCY = {
+    'NREL': 4,
+    'Tomorrow.io': 2,
+    'OpenWeather': 8,
+}
+DEFAULT_MAX_WORKERS = 16
+
+
+class IngestJob:
+    """One per-site fetch that produces rows for a single table"""
+
+    def __init__(self, name, provider, table, fetch, schema='api_ingest', fan_out=None):
+        self.name = name
+        self.provider = provider
+        self.table = table
+        self.schema = schema
+        self.fetch = fetch  # callable(site) -> DataFrame
+        self.fan_out = fan_out  # callable(df, site) -> df relabeled for a cell member; None = per site
+
+
+def site_label(site, prefix):
+    """Build the site_id stored for a site (legacy prefix when no site_id given)"""
+    if site.get('site_id'):
+        return f"{prefix}_{site['site_id']}"
+    return prefix
+
+
+def relabel_site_id(prefix):
+    """fan_out for rows identified by site_id only"""
+    return lambda df, site: df.assign(site_id=site_label(site, prefix))
+
+
+def relabel_location(prefix=None):
+    """fan_out for rows carrying the site's coordinates (and site_id with a prefix)"""
+    def fan_out(df, site):
+        df = df.assign(location_lat=site['lat'], location_lon=site['lon'])
+        return df.assign(site_id=site_label(site, prefix)) if prefix else df
+    return fan_out
+
+
+def nrel_monthly_job(loader):
+    """Monthly solar resource averages from NRELLoaderV2"""
+    return IngestJob(
+        'nrel_monthly', 'NREL', 'nrel_pvdaq',
+        lambda site: loader.fetch_solar_resource_monthly(
+            site['lat'], site['lon'], site_id=site_label(site, 'NREL_MONTHLY')),
+        fan_out=relabel_site_id('NREL_MONTHLY')
+    )
+
+
+def pvwatts_hourly_job(loader):
+    """Hourly PVWatts simulation from NRELLoaderV2"""
+    return IngestJob(
+        'pvwatts_hourly', 'NREL', 'nrel_pvdaq',
+        lambda site: loader.fetch_pvwatts_hourly(
+            site['lat'], site['lon'], site_id=site_label(site, 'PVWATTS_SIM')),
+        fan_out=relabel_site_id('PVWATTS_SIM')
+    )
+
+
+def tomorrow_forecast_job(loader, incremental=False):
+    """Hourly forecast from TomorrowLoaderV3 (only new/changed intervals if incremental)
+
+    Incremental runs are fetched per site: watermarks are kept per exact location.
+    """
+    fetch = loader.fetch_forecast_incremental if incremental else loader.fetch_forecast
+    return IngestJob(
+        'tomorrow_forecast', 'Tomorrow.io', 'tomorrow_weather',
+        lambda site: fetch(site['lat'], site['lon']),
+        fan_out=None if incremental else relabel_location()
+    )
+
+
+def openweather_current_job(loader):
+    """Current conditions from OpenWeatherLoader"""
+    return IngestJob(
+        'openweather_current', 'OpenWeather', 'openweather_current',
+        lambda site: loader.fetch_current(site['lat'], site['lon'],
+                                          site_id=site_label(site, 'OPENWEATHER')),
+        fan_out=relabel_location('OPENWEATHER')
+    )
+
+
+def openweather_forecast_job(loader):
+    """5 day / 3 hour forecast from OpenWeatherLoader"""
+    return IngestJob(
+        'openweather_forecast', 'OpenWeather', 'openweather_forecast',
+        lambda site: loader.fetch_forecast(site['lat'], site['lon'],
+                                           site_id=site_label(site, 'OPENWEATHER')),
+        fan_out=relabel_location('OPENWEATHER')
+    )
+
+
+def job_by_name(name):
+    """A job with a fresh loader by name (None if unknown), for runs that pick jobs by name"""
+    from src.etl.nrel_loader_v2 import NRELLoaderV2
+    from src.etl.openweather_loader import OpenWeatherLoader
+    from src.etl.tomorrow_loader_v3 import TomorrowLoaderV3
+
+    factories = {
+        'nrel_monthly': lambda: nrel_monthly_job(NRELLoaderV2()),
+        'pvwatts_hourly': lambda: pvwatts_hourly_job(NRELLoaderV2()),
+        'tomorrow_forecast': lambda: tomorrow_forecast_job(TomorrowLoaderV3()),
+        'openweather_current': lambda: openweather_current_job(OpenWeatherLoader()),
+        'openweather_forecast': lambda: openweather_forecast_job(OpenWeatherLoader()),
+    }
+    factory = factories.get(name)
+    return factory() if factory else None
+
+
+class IngestEngine:
+    """Run ingest jobs for a fleet of sites concurrently"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, provider_concurrency=None, snap_to_cells=True,
+                 batch_rows=DEFAULT_BATCH_ROWS, queue_size=DEFAULT_QUEUE_SIZE, dead_letters=None):
+        self.engine = get_db_engine()
+        ensure_schema(self.engine)
+        self.writer = BulkWriter(self.engine)
+        self.quality = DataQuality(self.engine)
+        self.dead_letters = dead_letters or get_queue()
+        self.max_workers = max_workers
+        self.snap_to_cells = snap_to_cells
+        self.batch_rows = batch_rows
+        self.queue_size = queue_size
+        limits = dict(PROVIDER_CONCURRENCY)
+        limits.update(provider_concurrency or {})
+        self.provider_limits = {
+            provider: threading.BoundedSemaphore(limit)
+            for provider, limit in limits.items()
+        }
+
+    def _run_task(self, site, job):
+        """Fetch one (site, job) pair while holding the provider's slot"""
+        limit = self.provider_limits.get(job.provider)
+        if limit is None:
+            return job.fetch(site)
+        with limit:
+            return job.fetch(site)
+
+    def _plan(self, sites, job):
+        """[(fetch_site, member_sites)] for a job; members is None for per-site fetches"""
+        if not (self.snap_to_cells and job.fan_out and cell_degrees(job.provider)):
+            return [(site, None) for site in sites]
+
+        index = SpatialIndex(job.provider, sites)
+        print(f"   {job.name}: {len(sites)} sites -> {len(index)} {job.provider} cells")
+        return list(index)
+
+    def _fetch_stage(self, failures):
+        """fetch: (fetch_site, members, job) -> (job, members, df)
+
+        Loaders report errors as a frame with no columns; an empty frame that
+        has columns (nothing new for an incremental fetch) is not a failure.
+        """
+        def fetch(task):
+            fetch_site, members, job = task
+            try:
+                df = self._run_task(fetch_site, job)
+                error = 'no data returned'
+            except Exception as e:
+                print(f"❌ {job.name} failed for {fetch_site.get('name', fetch_site)}: {e}")
+                df, error = None, e
+            if df is None or df.columns.empty:
+                with failures['lock']:
+                    failures['count'] += 1
+                # Members, not the cell center, so a replay snaps them the same way
+                self.dead_letters.put_fetch(job.name, members or [fetch_site], error)
+                return None
+            if df.empty:
+                return None
+            return job, members, df, fetch_site
+        return Stage('fetch', fetch, workers=self.max_workers)
+
+    @staticmethod
+    def _transform_stage():
+        """transform: fan cell results out to member sites -> (schema, table, df, site)"""
+        def transform(fetched):
+            job, members, df, fetch_site = fetched
+            if members is None:
+                yield job.schema, job.table, df, fetch_site
+            else:
+                for site in members:
+                    yield job.schema, job.table, job.fan_out(df, site), site
+        return Stage('transform', transform, workers=2)
+
+    def _validate_stage(self):
+        """validate: data-quality rules -> (schema, table, df) plus quarantined rows"""
+        def validate(item):
+            schema, table, df, site = item
+            clean, quarantined = self.quality.check(df, table, latitude=site.get('lat'))
+            yield schema, table, clean
+            if quarantined is not None:
+                yield 'api_ingest', 'dq_quarantine', quarantined
+        return Stage('validate', validate, workers=2)
+
+    def _on_error(self, stage, item, exc):
+        """Dead-letter whatever a failed stage was holding"""
+        print(f"❌ ingest/{stage} failed: {exc}")
+        # A full batch, or one table of the final flush (the other tables are still written)
+        if isinstance(exc, BatchWriteError):
+            self.dead_letters.put_rows(exc.df, exc.table, schema=exc.schema, error=exc.error)
+        elif stage == 'transform':
+            job, members, df, fetch_site = item
+            self.dead_letters.put_fetch(job.name, members or [fetch_site], exc)
+        elif stage == 'validate':
+            schema, table, df, site = item
+            self.dead_letters.put_rows(df, table, schema=schema, error=exc, stage=stage,
+                                       latitude=site.get('lat'))
+
+    def run(self, sites, jobs):
+        """Fetch every job for every site (once per cell where possible), writing as results arrive"""
+        print(f"🚀 Ingesting {len(sites)} sites x {len(jobs)} jobs "
+              f"({self.max_workers} workers)...")
+
+        start = time.perf_counter()
+        # An exception ends the run as failed in the ledger
+        with PipelineRun(self.engine, 'ingest', {
+                'sites': len(sites), 'jobs': [job.name for job in jobs], 'max_workers': self.max_workers,
+                'snap_to_cells': self.snap_to_cells, 'batch_rows': self.batch_rows}) as run:
+            failures = {'count': 0, 'lock': threading.Lock()}
+            dead_before = dict(self.dead_letters.counters)
+
+            # Interleave jobs so every provider has work queued from the start
+            plans = [[(fetch_site, members, job) for fetch_site, members in self._plan(sites, job)]
+                     for job in jobs]
+            tasks = [task for group in zip_longest(*plans) for task in group if task is not None]
+
+            # Fetches keep running while earlier results are written; if the writer
+            # falls behind, the bounded queues hold the fetch workers back
+            write = BatchWriteStage(self.writer, batch_rows=self.batch_rows)
+            pipeline = Pipeline([self._fetch_stage(failures), self._transform_stage(),
+                                 self._validate_stage(), write],
+                                queue_size=self.queue_size, on_error=self._on_error, name='ingest')
+            run.add_pipeline(pipeline)
+            pipeline.run(iter(tasks))
+            self.dead_letters.close()
+            dead_lettered = {kind: n - dead_before.get(kind, 0)
+                             for kind, n in self.dead_letters.counters.items() if n > dead_before.get(kind, 0)}
+
+            written = dict(write.written)
+            failures = failures['count']
+            elapsed = time.perf_counter() - start
+            run.finish(rows_written=sum(write.rows.values()),
+                       errors=failures + sum(s['errors'] for s in pipeline.stats().values()))
+
+        stats = {
+            'sites': len(sites),
+            'tasks': len(tasks),
+            'requests_saved': len(sites) * len(jobs) - len(tasks),
+            'failed_tasks': failures,
+            'dead_letters': dead_lettered,
+            'run_id': run.run_id,
+            'rows_written': written,
+            'elapsed_seconds': round(elapsed, 2),
+            'sites_per_sec': round(len(sites) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+        print(f"✅ Ingest complete in {stats['elapsed_seconds']}s "
+              f"({stats['sites_per_sec']} sites/sec, {len(tasks)} fetches, "
+              f"{stats['requests_saved']} saved by cell snapping, {failures} failed)")
+        for table, rows in written.items():
+            print(f"   {table}: {rows} rows")
+        if dead_lettered:
+            print(f"   📮 dead-lettered: {dead_lettered} "
+                  f"(python -m src.etl.dead_letter replay)")
+        pipeline.print_stats()
+        run.print_stats()
+        self.quality.print_stats()
+        self.quality.record_counts()
+        self.writer.print_stats()
+        http_client.get_client().print_stats()
+        response_cache.get_cache().print_stats()
+        rate_limiter.get_scheduler().print_stats()
+
+        return stats
+
+
+if __name__ == "__main__":
+    from src.etl.nrel_loader_v2 import NRELLoaderV2
+
+    sites = [
+        {'name': 'Phoenix', 'lat': 33.4484, 'lon': -112.0740},
+        {'name': 'Denver', 'lat': 39.7392, 'lon': -104.9903, 'site_id': 'DENVER'},
+        {'name': 'San Francisco', 'lat': 37.7749, 'lon': -122.4194, 'site_id': 'SAN_FRANCISCO'},
+    ]
+
+    loader = NRELLoaderV2()
+    IngestEngine().run(sites, [nrel_monthly_job(loader), pvwatts_hourly_job(loader)])
@@ -9,16 +9,28 @@ from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 import logging
 
+from src.etl.bulk_writer import BulkWriter
+from src.etl.http_client import HttpClient
+from src.etl.migrations import ensure_schema
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# latency_history CHECKs latency_ms < 10000
+MAX_LATENCY_MS = 9999.99
+
 class LatencyCollector:
     """Collect and store API latency metrics"""
     
     def __init__(self):
         self.engine = self._get_db_engine()
+        ensure_schema(self.engine)
+        self.writer = BulkWriter(self.engine)
+        # Pooled keep-alive client; no retries and no rate limiter, so the timer
+        # covers a single round trip and never a token or Retry-After wait
+        self.http = HttpClient(retries=0, rate_limited=False)
         self.apis = {
             'NREL': {
                 'url': 'https://developer.nrel.gov/api/alt-fuel-stations/v1.json',
@@ -43,27 +55,32 @@ class LatencyCollector:
         return create_engine(db_url)
     
     def ping_api(self, api_name, config):
-        """Ping an API and measure latency"""
+        """Ping an API and measure latency; None if the provider throttled the ping"""
         try:
             # Use HEAD request if possible, otherwise lightweight GET
             start = time.perf_counter()
             
             if api_name == 'NREL':
                 # NREL doesn't support HEAD, use minimal GET
-                response = requests.get(config['url'], params=config['params'], timeout=config['timeout'])
+                response = self.http.get(config['url'], params=config['params'], timeout=config['timeout'])
             else:
                 # Try HEAD first
                 try:
-                    response = requests.head(config['url'], params=config['params'], timeout=config['timeout'])
+                    response = self.http.head(config['url'], params=config['params'], timeout=config['timeout'])
                 except:
                     # Fall back to GET
-                    response = requests.get(config['url'], params=config['params'], timeout=config['timeout'])
+                    response = self.http.get(config['url'], params=config['params'], timeout=config['timeout'])
             
             latency_ms = (time.perf_counter() - start) * 1000
             
+            if response.status_code == 429:
+                # Throttled by the provider: not a latency sample
+                logger.warning(f"{api_name} ping throttled (429); skipping sample")
+                return None
+            
             return {
                 'api_name': api_name,
-                'latency_ms': round(latency_ms, 2),
+                'latency_ms': round(min(latency_ms, MAX_LATENCY_MS), 2),
                 'status_code': response.status_code,
                 'success': response.status_code < 400,
                 'timestamp': datetime.utcnow()
@@ -93,19 +110,14 @@ class LatencyCollector:
         
         for api_name, config in self.apis.items():
             result = self.ping_api(api_name, config)
+            if result is None:
+                continue
             results.append(result)
             logger.info(f"{api_name}: {result['latency_ms']}ms (status: {result['status_code']})")
         
         # Store in database
         if results:
-            with self.engine.connect() as conn:
-                for result in results:
-                    conn.execute(text("""
-                        INSERT INTO api_ingest.latency_history 
-                        (timestamp, api_name, latency_ms, status_code, success)
-                        VALUES (:timestamp, :api_name, :latency_ms, :status_code, :success)
-                    """), result)
-                conn.commit()
+            self.writer.write_records(results, 'latency_history')
         
         return results
     
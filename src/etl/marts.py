@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Incremental refresh of mart.pv_system_hourly
+
+Instead of rebuilding the mart from a full scan of api_ingest.nrel_pvdaq, a
+refresh finds the (site_id, hour) pairs with rows loaded or changed since the
+last refresh (bulk upserts stamp ingested_at on both), recomputes just those
+hours and merges them into the mart on its (site_id, hour) key. Everything
+happens in one transaction, so readers keep seeing the previous hours until
+it commits, and the cost follows the amount of new data.
+
+The watermark stored in mart.refresh_watermarks is the start of the oldest
+transaction still open when the refresh began: ingested_at is a transaction's
+start time, so rows committed later than that can still carry an older
+ingested_at, and the next refresh re-reads from there. Rows removed outside
+the upserts (partition retention, manual deletes) leave no trace to follow;
+run with --full after those to drop the hours they emptied.
+
+    python -m src.etl.marts [--full]
+"""
+
+import sys
+import time
+
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+from src.etl import metrics
+from src.etl.migrations import ensure_schema, get_db_engine
+
+load_dotenv()
+
+MART_NAME = 'pv_system_hourly'
+
+MART_COLUMNS = ['avg_ac_power', 'max_ac_power', 'min_ac_power', 'avg_dc_power',
+                'avg_poa_irradiance', 'avg_ambient_temp', 'sample_count',
+                'hour_of_day', 'day_of_week', 'month']
+
+# Start of the oldest open transaction in this database, or now
+HORIZON_SQL = """
+    SELECT LEAST(LOCALTIMESTAMP, (
+        SELECT MIN(xact_start)::TIMESTAMP
+        FROM pg_stat_activity
+        WHERE datname = current_database() AND pid <> pg_backend_pid()
+          AND backend_type = 'client backend' AND xact_start IS NOT NULL
+    ))
+"""
+
+# (site_id, hour) pairs with rows loaded or changed since the watermark
+TOUCHED_SQL = """
+    CREATE TEMP TABLE _mart_touched ON COMMIT DROP AS
+    SELECT DISTINCT site_id, DATE_TRUNC('hour', timestamp) AS hour
+    FROM api_ingest.nrel_pvdaq
+    WHERE timestamp IS NOT NULL AND site_id IS NOT NULL AND ingested_at >= :since
+"""
+
+# Recomputed hours; {source} is every row (full refresh) or only the rows of touched hours
+HOURLY_SQL = """
+    CREATE TEMP TABLE _mart_hourly ON COMMIT DROP AS
+    SELECT
+        p.site_id,
+        DATE_TRUNC('hour', p.timestamp) AS hour,
+        AVG(p.ac_power) AS avg_ac_power,
+        MAX(p.ac_power) AS max_ac_power,
+        MIN(p.ac_power) AS min_ac_power,
+        AVG(p.dc_power) AS avg_dc_power,
+        AVG(p.poa_irradiance) AS avg_poa_irradiance,
+        AVG(p.ambient_temp) AS avg_ambient_temp,
+        COUNT(*) AS sample_count,
+        EXTRACT(HOUR FROM DATE_TRUNC('hour', p.timestamp))::INTEGER AS hour_of_day,
+        EXTRACT(DOW FROM DATE_TRUNC('hour', p.timestamp))::INTEGER AS day_of_week,
+        EXTRACT(MONTH FROM DATE_TRUNC('hour', p.timestamp))::INTEGER AS month
+    {source}
+    GROUP BY p.site_id, DATE_TRUNC('hour', p.timestamp)
+"""
+
+FULL_SOURCE = """
+    FROM api_ingest.nrel_pvdaq p
+    WHERE p.site_id IS NOT NULL AND p.timestamp IS NOT NULL AND p.ac_power IS NOT NULL
+"""
+
+TOUCHED_SOURCE = """
+    FROM _mart_touched t
+    JOIN api_ingest.nrel_pvdaq p
+      ON p.site_id = t.site_id
+     AND p.timestamp >= t.hour AND p.timestamp < t.hour + INTERVAL '1 hour'
+    WHERE p.ac_power IS NOT NULL
+"""
+
+# Unchanged hours are left alone, so an identical rerun writes nothing
+UPSERT_SQL = f"""
+    INSERT INTO mart.pv_system_hourly AS target (site_id, hour, {', '.join(MART_COLUMNS)})
+    SELECT site_id, hour, {', '.join(MART_COLUMNS)}
+    FROM _mart_hourly
+    ON CONFLICT (site_id, hour) DO UPDATE
+    SET {', '.join(f"{c} = EXCLUDED.{c}" for c in MART_COLUMNS)}, refreshed_at = NOW()
+    WHERE ({', '.join(f"target.{c}" for c in MART_COLUMNS)})
+          IS DISTINCT FROM ({', '.join(f"EXCLUDED.{c}" for c in MART_COLUMNS)})
+"""
+
+# Hours in scope that no longer have any rows with ac_power
+DELETE_TOUCHED_SQL = """
+    DELETE FROM mart.pv_system_hourly m
+    USING _mart_touched t
+    WHERE m.site_id = t.site_id AND m.hour = t.hour
+      AND NOT EXISTS (SELECT 1 FROM _mart_hourly h WHERE h.site_id = m.site_id AND h.hour = m.hour)
+"""
+
+DELETE_ALL_SQL = """
+    DELETE FROM mart.pv_system_hourly m
+    WHERE NOT EXISTS (SELECT 1 FROM _mart_hourly h WHERE h.site_id = m.site_id AND h.hour = m.hour)
+"""
+
+
+class MartBuilder:
+    def __init__(self, engine=None):
+        self.engine = engine or get_db_engine()
+        ensure_schema(self.engine)
+
+    def watermark(self, conn=None):
+        """ingested_at the last refresh read up to, None if the mart was never refreshed"""
+        query = text("SELECT watermark FROM mart.refresh_watermarks WHERE mart_name = :name")
+        if conn is not None:
+            return conn.execute(query, {'name': MART_NAME}).scalar()
+        with self.engine.connect() as conn:
+            return conn.execute(query, {'name': MART_NAME}).scalar()
+
+    def refresh(self, full=False):
+        """Recompute the hours loaded since the watermark (every hour if full or never refreshed)"""
+        start = time.perf_counter()
+        with metrics.timed('mart', 'db_write') as m, self.engine.begin() as conn:
+            # One refresh at a time; readers are never blocked
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': f"mart.{MART_NAME}"})
+            since = None if full else self.watermark(conn)
+            horizon = conn.execute(text(HORIZON_SQL)).scalar()
+
+            if since is None:
+                conn.execute(text(HOURLY_SQL.format(source=FULL_SOURCE)))
+                hours = conn.execute(text("SELECT COUNT(*) FROM _mart_hourly")).scalar()
+                delete_sql = DELETE_ALL_SQL
+            else:
+                conn.execute(text(TOUCHED_SQL), {'since': since})
+                conn.execute(text("ANALYZE _mart_touched"))
+                hours = conn.execute(text("SELECT COUNT(*) FROM _mart_touched")).scalar()
+                conn.execute(text(HOURLY_SQL.format(source=TOUCHED_SOURCE)))
+                delete_sql = DELETE_TOUCHED_SQL
+            conn.execute(text("ANALYZE _mart_hourly"))
+
+            upserted = conn.execute(text(UPSERT_SQL)).rowcount
+            deleted = conn.execute(text(delete_sql)).rowcount
+
+            conn.execute(text("""
+                INSERT INTO mart.refresh_watermarks (mart_name, watermark, hours_refreshed, updated_at)
+                VALUES (:name, :watermark, :hours, NOW())
+                ON CONFLICT (mart_name) DO UPDATE
+                SET watermark = EXCLUDED.watermark, hours_refreshed = EXCLUDED.hours_refreshed,
+                    updated_at = EXCLUDED.updated_at
+            """), {'name': MART_NAME, 'watermark': horizon, 'hours': hours})
+            m.rows = upserted
+
+        stats = {'since': since, 'watermark': horizon, 'hours_touched': hours, 'upserted': upserted,
+                 'deleted': deleted, 'seconds': round(time.perf_counter() - start, 2)}
+        scope = 'all hours' if since is None else f"hours loaded since {since:%Y-%m-%d %H:%M:%S}"
+        print(f"✅ Refreshed mart.{MART_NAME}: {hours:,} {scope}, {upserted:,} upserted, "
+              f"{deleted:,} deleted in {stats['seconds']}s")
+        return stats
+
+
+if __name__ == "__main__":
+    MartBuilder().refresh(full='--full' in sys.argv)
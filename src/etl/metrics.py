@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Per-stage ingest timing and the pipeline run ledger
+
+Every loader stage records into process-wide counters keyed by (provider,
+stage): calls, rows, bytes, errors, total seconds and a log-bucketed latency
+histogram. Recording is a lock and a few additions, so it stays on in
+production.
+
+    rate_limit_wait  waiting for a token from the rate limiter
+    http_wait        request sent -> response received (bytes = wire bytes)
+    decode           JSON / CSV parsing of a response body
+    frame_build      turning decoded payloads into DataFrames
+    db_write         COPY + merge into the ingest tables (provider from the table)
+
+A PipelineRun wraps one ingest run: it writes a row to api_ingest.pipeline_runs
+and, when the run ends, one api_ingest.pipeline_stage_metrics row per
+(provider, stage) it recorded, plus the busy/blocked time of each Pipeline
+stage, so throughput regressions and the per-provider bottleneck can be
+tracked over time.
+
+    python -m src.etl.metrics [run_name] [--last N]   # recent runs and their slowest stages
+"""
+
+import sys
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Histogram bucket upper bounds: 0.1 ms doubling up to ~14 minutes
+BUCKET_BOUNDS = [0.0001 * 2 ** i for i in range(24)]
+
+TABLE_PROVIDERS = {
+    'nrel_pvdaq': 'NREL',
+    'tomorrow_weather': 'Tomorrow.io',
+    'openweather_current': 'OpenWeather',
+    'openweather_forecast': 'OpenWeather',
+    'noaa_weather': 'NOAA',
+}
+
+
+def table_provider(table_ref):
+    """Provider a schema.table is loaded from (the table itself if none)"""
+    return TABLE_PROVIDERS.get(table_ref.split('.', 1)[-1], table_ref)
+
+
+def _new_counters():
+    return {'calls': 0, 'rows': 0, 'bytes': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+            'buckets': [0] * (len(BUCKET_BOUNDS) + 1)}
+
+
+def quantile(buckets, q):
+    """Upper bound (seconds) of the bucket holding the q-th observation"""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= rank:
+            return BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else float('inf')
+    return float('inf')
+
+
+def summarize(counters):
+    """Counters -> the flat stats stored per stage"""
+    buckets = counters['buckets']
+
+    def cap(seconds):
+        # Bucket bounds overshoot; never report more than the observed max
+        return min(seconds, counters['max_seconds'])
+
+    return {
+        'calls': counters['calls'],
+        'rows': counters['rows'],
+        'bytes': counters['bytes'],
+        'errors': counters['errors'],
+        'total_seconds': round(counters['seconds'], 4),
+        'p50_ms': round(cap(quantile(buckets, 0.50)) * 1000, 2),
+        'p95_ms': round(cap(quantile(buckets, 0.95)) * 1000, 2),
+        'p99_ms': round(cap(quantile(buckets, 0.99)) * 1000, 2),
+        'max_ms': round(counters['max_seconds'] * 1000, 2),
+        'histogram': {f"{bound * 1000:g}": count
+                      for bound, count in zip(BUCKET_BOUNDS + [float('inf')], buckets) if count},
+    }
+
+
+class Measurement:
+    """Yielded by Metrics.timed(); set rows/bytes once they are known"""
+
+    __slots__ = ('rows', 'bytes', 'error')
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.error = False
+
+
+class Metrics:
+    """Process-wide stage counters; open scopes (runs) get a copy of every record"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self._scopes = []
+
+    def record(self, provider, stage, seconds, rows=0, nbytes=0, error=False):
+        key = (provider or 'unknown', stage)
+        bucket = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            for counters in [self.counters] + self._scopes:
+                c = counters.get(key)
+                if c is None:
+                    c = counters[key] = _new_counters()
+                c['calls'] += 1
+                c['rows'] += rows
+                c['bytes'] += nbytes
+                c['errors'] += error
+                c['seconds'] += seconds
+                if seconds > c['max_seconds']:
+                    c['max_seconds'] = seconds
+                c['buckets'][bucket] += 1
+
+    @contextmanager
+    def timed(self, provider, stage):
+        """Time a block; an exception counts as an error and propagates"""
+        m = Measurement()
+        start = time.perf_counter()
+        try:
+            yield m
+        except Exception:
+            m.error = True
+            raise
+        finally:
+            self.record(provider, stage, time.perf_counter() - start, m.rows, m.bytes, m.error)
+
+    def open_scope(self):
+        scope = {}
+        with self._lock:
+            self._scopes.append(scope)
+        return scope
+
+    def close_scope(self, scope):
+        with self._lock:
+            self._scopes = [s for s in self._scopes if s is not scope]
+
+    def stats(self, counters=None):
+        with self._lock:
+            counters = {key: dict(c, buckets=list(c['buckets']))
+                        for key, c in (self.counters if counters is None else counters).items()}
+        return {key: summarize(c) for key, c in counters.items()}
+
+    def print_stats(self, counters=None):
+        stats = self.stats(counters)
+        if not stats:
+            return
+        print("\n⏱️  Stage timings:")
+        for (provider, stage), s in sorted(stats.items()):
+            print(f"  {provider}/{stage}: {s['calls']} calls, {s['rows']:,} rows, "
+                  f"{s['bytes'] / 1024:.1f} KB, {s['errors']} errors, {s['total_seconds']:.2f}s "
+                  f"(p50 {s['p50_ms']}ms p95 {s['p95_ms']}ms max {s['max_ms']}ms)")
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """The process-wide metrics registry"""
+    return _metrics
+
+
+def record(provider, stage, seconds, rows=0, nbytes=0, error=False):
+    _metrics.record(provider, stage, seconds, rows, nbytes, error)
+
+
+def timed(provider, stage):
+    return _metrics.timed(provider, stage)
+
+
+def decode_json(resp, provider):
+    """resp.json(), timed as the provider's decode stage"""
+    with timed(provider, 'decode') as m:
+        m.bytes = len(resp.content)
+        return resp.json()
+
+
+class PipelineRun:
+    """One ingest run in the ledger; use as a context manager or call start()/finish()
+
+    finish() records the run once; later calls (e.g. __exit__ after an explicit
+    finish) do nothing. Leaving the with block on an exception records the run
+    as failed with the error, so no run is left 'running' with its scope open.
+    """
+
+    def __init__(self, engine, name, params=None):
+        self.engine = engine
+        self.name = name
+        self.params = params or {}
+        self.run_id = None
+        self.pipelines = []
+        self.rows_written = 0
+        self.errors = 0
+        self._scope = None
+        self._start = None
+        self._finished = False
+
+    def start(self):
+        with self.engine.begin() as conn:
+            self.run_id = conn.execute(text("""
+                INSERT INTO api_ingest.pipeline_runs (run_name, status, params)
+                VALUES (:name, 'running', CAST(:params AS JSONB))
+                RETURNING id
+            """), {'name': self.name, 'params': json.dumps(self.params, default=str)}).scalar()
+        # Opened only once the row exists, so a failed start leaves no scope behind
+        self._scope = get_metrics().open_scope()
+        self._start = time.perf_counter()
+        return self
+
+    def add_pipeline(self, pipeline):
+        """Also store this Pipeline's per-stage busy/blocked time when the run ends"""
+        self.pipelines.append(pipeline)
+
+    def _stage_rows(self):
+        rows = []
+        for (provider, stage), s in get_metrics().stats(self._scope).items():
+            rows.append(dict(s, provider=provider, stage=stage, blocked_seconds=None,
+                             histogram=json.dumps(s['histogram'])))
+        for pipeline in self.pipelines:
+            for stage, s in pipeline.stats().items():
+                rows.append({'provider': f"pipeline:{pipeline.name}", 'stage': stage,
+                             'calls': s['in'], 'rows': s['out'], 'bytes': 0, 'errors': s['errors'],
+                             'total_seconds': s['busy_seconds'], 'blocked_seconds': s['blocked_seconds'],
+                             'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None,
+                             'histogram': None})
+        return rows
+
+    def finish(self, status='ok', rows_written=None, errors=None, error=None):
+        """Close the metrics scope and record the run; error is the exception (or message) it failed with"""
+        if self._finished or self._scope is None:
+            return
+        self._finished = True
+        get_metrics().close_scope(self._scope)
+        duration = time.perf_counter() - self._start
+        stages = self._stage_rows()
+        rows_written = self.rows_written if rows_written is None else rows_written
+        errors = self.errors if errors is None else errors
+        fetched = sum(s['bytes'] for s in stages if s['stage'] == 'http_wait')
+
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                UPDATE api_ingest.pipeline_runs
+                SET finished_at = NOW(), duration_seconds = :duration, status = :status,
+                    rows_written = :rows_written, bytes_fetched = :bytes_fetched, errors = :errors,
+                    error = :error
+                WHERE id = :run_id
+            """), {'duration': round(duration, 3), 'status': status, 'rows_written': rows_written,
+                   'bytes_fetched': fetched, 'errors': errors,
+                   'error': None if error is None else str(error), 'run_id': self.run_id})
+            if stages:
+                conn.execute(text("""
+                    INSERT INTO api_ingest.pipeline_stage_metrics
+                        (run_id, provider, stage, calls, rows, bytes, errors, total_seconds,
+                         blocked_seconds, p50_ms, p95_ms, p99_ms, max_ms, histogram)
+                    VALUES (:run_id, :provider, :stage, :calls, :rows, :bytes, :errors, :total_seconds,
+                            :blocked_seconds, :p50_ms, :p95_ms, :p99_ms, :max_ms, CAST(:histogram AS JSONB))
+                """), [dict(s, run_id=self.run_id) for s in stages])
+        print(f"📒 Run {self.run_id} ({self.name}) recorded: {status}, {rows_written:,} rows, "
+              f"{fetched / 1024:.1f} KB fetched, {errors} errors, {duration:.2f}s"
+              + (f" ({error})" if error is not None else ""))
+
+    def print_stats(self):
+        """Stage timings recorded during this run"""
+        get_metrics().print_stats(self._scope)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+            return False
+        try:
+            self.finish(status='failed', error=exc)
+        except Exception as e:
+            # Don't let the ledger write hide the error that ended the run
+            print(f"⚠️  Could not record failed run {self.run_id} ({self.name}): {e}")
+        return False
+
+
+def print_runs(engine, run_name=None, last=10):
+    """Recent runs with their three slowest (provider, stage) pairs"""
+    with engine.connect() as conn:
+        runs = conn.execute(text("""
+            SELECT id, run_name, started_at, duration_seconds, status, rows_written, bytes_fetched, errors, error
+            FROM api_ingest.pipeline_runs
+            WHERE (:run_name IS NULL OR run_name = :run_name)
+            ORDER BY started_at DESC LIMIT :last
+        """), {'run_name': run_name, 'last': last}).fetchall()
+        print(f"📒 Last {len(runs)} pipeline runs:")
+        for run in runs:
+            rate = (run.rows_written or 0) / run.duration_seconds if run.duration_seconds else 0
+            print(f"  #{run.id} {run.run_name} {run.started_at:%Y-%m-%d %H:%M} {run.status}: "
+                  f"{run.rows_written or 0:,} rows in {run.duration_seconds or 0:.1f}s ({rate:,.0f} rows/sec), "
+                  f"{(run.bytes_fetched or 0) / 1024:.0f} KB, {run.errors or 0} errors")
+            if run.error:
+                print(f"      error: {run.error}")
+            slowest = conn.execute(text("""
+                SELECT provider, stage, total_seconds, p95_ms
+                FROM api_ingest.pipeline_stage_metrics
+                WHERE run_id = :run_id AND provider NOT LIKE 'pipeline:%'
+                ORDER BY total_seconds DESC LIMIT 3
+            """), {'run_id': run.id}).fetchall()
+            for s in slowest:
+                print(f"      {s.provider}/{s.stage}: {s.total_seconds:.2f}s (p95 {s.p95_ms}ms)")
+
+
+if __name__ == "__main__":
+    from src.etl.cli import arg
+    from src.etl.migrations import ensure_schema, get_db_engine
+
+    engine = get_db_engine()
+    ensure_schema(engine)
+    name = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith('--') else None
+    print_runs(engine, name, arg('--last', 10, int))
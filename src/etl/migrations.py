@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+"""Versioned schema migrations
+
+All DDL lives here as ordered, numbered migrations recorded in
+public.schema_version. They run once at startup (ensure_schema), so the
+ingest hot path never issues DDL or takes catalog locks.
+
+Every migration is written to be a no-op against a database that was built
+by the old setup scripts, so existing installs can adopt the runner as-is.
+"""
+
+import os
+import threading
+
+from sqlalchemy import create_engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Arbitrary constant; serializes concurrent runners with pg_advisory_lock
+MIGRATION_LOCK_ID = 680682
+
+MIGRATIONS = [
+    (1, 'Create schemas and test table', """
+        CREATE SCHEMA IF NOT EXISTS api_ingest;
+        CREATE SCHEMA IF NOT EXISTS mart;
+
+        CREATE TABLE IF NOT EXISTS api_ingest.test_table (
+            id SERIAL PRIMARY KEY,
+            data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+
+    (2, 'Create ingest and feature tables', """
+        CREATE TABLE IF NOT EXISTS api_ingest.nrel_pvdaq (
+            id SERIAL PRIMARY KEY,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            site_id VARCHAR(50),
+            timestamp TIMESTAMP,
+            dc_power FLOAT,
+            ac_power FLOAT,
+            poa_irradiance FLOAT,
+            ghi FLOAT,
+            dni FLOAT,
+            dhi FLOAT,
+            module_temp FLOAT,
+            ambient_temp FLOAT,
+            wind_speed FLOAT,
+            raw_json JSONB
+        );
+
+        CREATE TABLE IF NOT EXISTS api_ingest.noaa_weather (
+            id SERIAL PRIMARY KEY,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            station_id VARCHAR(50),
+            forecast_time TIMESTAMP,
+            valid_time TIMESTAMP,
+            temperature FLOAT,
+            wind_speed FLOAT,
+            wind_direction FLOAT,
+            cloud_cover INTEGER,
+            precipitation_prob FLOAT,
+            raw_json JSONB
+        );
+
+        CREATE TABLE IF NOT EXISTS api_ingest.tomorrow_weather (
+            id SERIAL PRIMARY KEY,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            location_lat FLOAT,
+            location_lon FLOAT,
+            forecast_time TIMESTAMP,
+            valid_time TIMESTAMP,
+            temperature FLOAT,
+            solar_ghi FLOAT,
+            solar_dni FLOAT,
+            cloud_cover FLOAT,
+            precipitation_intensity FLOAT,
+            raw_json JSONB
+        );
+
+        CREATE TABLE IF NOT EXISTS mart.solar_forecast_features (
+            id SERIAL PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            site_id VARCHAR(50),
+            timestamp TIMESTAMP,
+            hour INTEGER,
+            day_of_year INTEGER,
+            actual_power FLOAT,
+            actual_irradiance FLOAT,
+            forecast_temperature FLOAT,
+            forecast_cloud_cover FLOAT,
+            forecast_ghi FLOAT,
+            temperature_error FLOAT,
+            irradiance_error FLOAT
+        );
+    """),
+
+    (3, 'Add Tomorrow.io humidity, wind speed and dew point', """
+        ALTER TABLE api_ingest.tomorrow_weather
+            ADD COLUMN IF NOT EXISTS humidity FLOAT,
+            ADD COLUMN IF NOT EXISTS wind_speed FLOAT,
+            ADD COLUMN IF NOT EXISTS dew_point FLOAT;
+    """),
+
+    (4, 'Create latency tracking table and views', """
+        CREATE TABLE IF NOT EXISTS api_ingest.latency_history (
+            id SERIAL PRIMARY KEY,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            api_name VARCHAR(50) NOT NULL,
+            latency_ms FLOAT NOT NULL CHECK (latency_ms >= 0 AND latency_ms < 10000),
+            status_code INTEGER,
+            success BOOLEAN DEFAULT TRUE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_latency_timestamp
+        ON api_ingest.latency_history(timestamp DESC);
+
+        CREATE INDEX IF NOT EXISTS idx_latency_api_name
+        ON api_ingest.latency_history(api_name, timestamp DESC);
+
+        CREATE OR REPLACE VIEW api_ingest.latency_24h AS
+        SELECT
+            api_name,
+            timestamp,
+            latency_ms,
+            status_code,
+            success
+        FROM api_ingest.latency_history
+        WHERE timestamp > NOW() - INTERVAL '24 hours'
+        ORDER BY api_name, timestamp DESC;
+
+        CREATE OR REPLACE VIEW api_ingest.latency_sparkline AS
+        SELECT
+            api_name,
+            ARRAY_AGG(latency_ms ORDER BY timestamp DESC)
+                FILTER (WHERE timestamp > NOW() - INTERVAL '4 hours') AS sparkline_4h,
+            AVG(latency_ms)
+                FILTER (WHERE timestamp > NOW() - INTERVAL '4 hours') AS avg_4h,
+            MAX(latency_ms)
+                FILTER (WHERE timestamp > NOW() - INTERVAL '4 hours') AS max_4h,
+            MIN(latency_ms)
+                FILTER (WHERE timestamp > NOW() - INTERVAL '4 hours') AS min_4h,
+            COUNT(*)
+                FILTER (WHERE timestamp > NOW() - INTERVAL '4 hours' AND success = TRUE) AS success_count_4h,
+            COUNT(*)
+                FILTER (WHERE timestamp > NOW() - INTERVAL '4 hours') AS total_count_4h
+        FROM api_ingest.latency_history
+        WHERE timestamp > NOW() - INTERVAL '4 hours'
+        GROUP BY api_name;
+    """),
+
+    (5, 'Create OpenWeather test table', """
+        CREATE TABLE IF NOT EXISTS api_ingest.weather_test (
+            id SERIAL PRIMARY KEY,
+            timestamp TIMESTAMP,
+            temperature FLOAT,
+            humidity FLOAT,
+            wind_speed FLOAT,
+            description TEXT
+        );
+    """),
+
+    (6, 'Create Tomorrow.io forecast watermarks', """
+        CREATE TABLE IF NOT EXISTS api_ingest.tomorrow_watermarks (
+            location_lat FLOAT NOT NULL,
+            location_lon FLOAT NOT NULL,
+            last_forecast_time TIMESTAMP NOT NULL,
+            valid_time_horizon TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (location_lat, location_lon)
+        );
+    """),
+
+    (7, 'Add natural unique keys to ingest tables', """
+        DELETE FROM api_ingest.nrel_pvdaq a
+        USING api_ingest.nrel_pvdaq b
+        WHERE a.site_id = b.site_id AND a.timestamp = b.timestamp AND a.id < b.id;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_nrel_pvdaq_site_timestamp
+        ON api_ingest.nrel_pvdaq(site_id, timestamp);
+
+        DELETE FROM api_ingest.tomorrow_weather a
+        USING api_ingest.tomorrow_weather b
+        WHERE a.location_lat = b.location_lat AND a.location_lon = b.location_lon
+          AND a.forecast_time = b.forecast_time AND a.valid_time = b.valid_time
+          AND a.id < b.id;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_tomorrow_weather_location_times
+        ON api_ingest.tomorrow_weather(location_lat, location_lon, forecast_time, valid_time);
+    """),
+
+    (8, 'Create backfill ledger', """
+        CREATE TABLE IF NOT EXISTS api_ingest.backfill_ledger (
+            source VARCHAR(50) NOT NULL,
+            site_id VARCHAR(50) NOT NULL,
+            year INTEGER NOT NULL,
+            status VARCHAR(10) NOT NULL CHECK (status IN ('done', 'failed')),
+            rows INTEGER DEFAULT 0,
+            seconds FLOAT,
+            attempts INTEGER DEFAULT 1,
+            error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, site_id, year)
+        );
+    """),
+
+    (9, 'Create content-addressed raw payload store', """
+        CREATE TABLE IF NOT EXISTS api_ingest.raw_payloads (
+            payload_hash CHAR(64) PRIMARY KEY,
+            source VARCHAR(50) NOT NULL,
+            content_type VARCHAR(100),
+            raw_bytes INTEGER NOT NULL,
+            stored_bytes INTEGER NOT NULL,
+            payload BYTEA NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Already compressed with zlib; skip TOAST's own compression attempt
+        ALTER TABLE api_ingest.raw_payloads ALTER COLUMN payload SET STORAGE EXTERNAL;
+
+        ALTER TABLE api_ingest.nrel_pvdaq ADD COLUMN IF NOT EXISTS raw_payload_hash CHAR(64);
+        ALTER TABLE api_ingest.tomorrow_weather ADD COLUMN IF NOT EXISTS raw_payload_hash CHAR(64);
+        ALTER TABLE api_ingest.noaa_weather ADD COLUMN IF NOT EXISTS raw_payload_hash CHAR(64);
+    """),
+
+    (10, 'Add remaining Tomorrow.io hourly fields to tomorrow_weather', """
+        ALTER TABLE api_ingest.tomorrow_weather
+            ADD COLUMN IF NOT EXISTS temperature_apparent FLOAT,
+            ADD COLUMN IF NOT EXISTS wind_gust FLOAT,
+            ADD COLUMN IF NOT EXISTS wind_direction FLOAT,
+            ADD COLUMN IF NOT EXISTS cloud_base FLOAT,
+            ADD COLUMN IF NOT EXISTS cloud_ceiling FLOAT,
+            ADD COLUMN IF NOT EXISTS precipitation_probability FLOAT,
+            ADD COLUMN IF NOT EXISTS rain_intensity FLOAT,
+            ADD COLUMN IF NOT EXISTS snow_intensity FLOAT,
+            ADD COLUMN IF NOT EXISTS sleet_intensity FLOAT,
+            ADD COLUMN IF NOT EXISTS freezing_rain_intensity FLOAT,
+            ADD COLUMN IF NOT EXISTS rain_accumulation FLOAT,
+            ADD COLUMN IF NOT EXISTS snow_accumulation FLOAT,
+            ADD COLUMN IF NOT EXISTS sleet_accumulation FLOAT,
+            ADD COLUMN IF NOT EXISTS ice_accumulation FLOAT,
+            ADD COLUMN IF NOT EXISTS snow_depth FLOAT,
+            ADD COLUMN IF NOT EXISTS evapotranspiration FLOAT,
+            ADD COLUMN IF NOT EXISTS pressure_surface_level FLOAT,
+            ADD COLUMN IF NOT EXISTS pressure_sea_level FLOAT,
+            ADD COLUMN IF NOT EXISTS altimeter_setting FLOAT,
+            ADD COLUMN IF NOT EXISTS visibility FLOAT,
+            ADD COLUMN IF NOT EXISTS uv_index INTEGER,
+            ADD COLUMN IF NOT EXISTS uv_health_concern INTEGER,
+            ADD COLUMN IF NOT EXISTS weather_code INTEGER,
+            ADD COLUMN IF NOT EXISTS solar_dhi FLOAT;
+    """),
+
+    (11, 'Create OpenWeather observation and forecast tables', """
+        CREATE TABLE IF NOT EXISTS api_ingest.openweather_current (
+            id SERIAL PRIMARY KEY,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            site_id VARCHAR(50) NOT NULL,
+            location_lat FLOAT,
+            location_lon FLOAT,
+            observed_at TIMESTAMP NOT NULL,
+            temperature FLOAT,
+            feels_like FLOAT,
+            humidity FLOAT,
+            pressure FLOAT,
+            wind_speed FLOAT,
+            wind_direction FLOAT,
+            wind_gust FLOAT,
+            cloud_cover FLOAT,
+            visibility FLOAT,
+            rain_1h FLOAT,
+            snow_1h FLOAT,
+            weather_id INTEGER,
+            weather_main VARCHAR(50),
+            description VARCHAR(100),
+            raw_payload_hash CHAR(64)
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_openweather_current_site_observed
+        ON api_ingest.openweather_current(site_id, observed_at);
+
+        -- Latest forecast per valid time; forecast_time is when it was fetched
+        CREATE TABLE IF NOT EXISTS api_ingest.openweather_forecast (
+            id SERIAL PRIMARY KEY,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            site_id VARCHAR(50) NOT NULL,
+            location_lat FLOAT,
+            location_lon FLOAT,
+            forecast_time TIMESTAMP NOT NULL,
+            valid_time TIMESTAMP NOT NULL,
+            temperature FLOAT,
+            feels_like FLOAT,
+            humidity FLOAT,
+            pressure FLOAT,
+            wind_speed FLOAT,
+            wind_direction FLOAT,
+            wind_gust FLOAT,
+            cloud_cover FLOAT,
+            visibility FLOAT,
+            precipitation_probability FLOAT,
+            rain_3h FLOAT,
+            snow_3h FLOAT,
+            weather_id INTEGER,
+            weather_main VARCHAR(50),
+            description VARCHAR(100),
+            raw_payload_hash CHAR(64)
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_openweather_forecast_site_valid
+        ON api_ingest.openweather_forecast(site_id, valid_time);
+    """),
+
+    (12, 'Key noaa_weather by grid cell and add humidity fields', """
+        -- station_id holds the NWS grid cell (office/x,y) the forecast is for
+        ALTER TABLE api_ingest.noaa_weather
+            ADD COLUMN IF NOT EXISTS humidity FLOAT,
+            ADD COLUMN IF NOT EXISTS dew_point FLOAT,
+            ADD COLUMN IF NOT EXISTS short_forecast VARCHAR(100);
+
+        DELETE FROM api_ingest.noaa_weather a
+        USING api_ingest.noaa_weather b
+        WHERE a.station_id = b.station_id
+          AND a.forecast_time = b.forecast_time AND a.valid_time = b.valid_time
+          AND a.id < b.id;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_noaa_weather_station_times
+        ON api_ingest.noaa_weather(station_id, forecast_time, valid_time);
+    """),
+
+    (13, 'Add data-quality flags, quarantine and rule counts', """
+        -- Bitmask of the 'flag' rules a row violated (see data_quality.RULES)
+        ALTER TABLE api_ingest.nrel_pvdaq ADD COLUMN IF NOT EXISTS dq_flags INTEGER DEFAULT 0;
+
+        CREATE TABLE IF NOT EXISTS api_ingest.dq_quarantine (
+            id SERIAL PRIMARY KEY,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            table_name VARCHAR(100) NOT NULL,
+            site_id VARCHAR(50),
+            timestamp TIMESTAMP,
+            dq_flags INTEGER NOT NULL,
+            row_json JSONB NOT NULL
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_dq_quarantine_row
+        ON api_ingest.dq_quarantine(table_name, site_id, timestamp);
+
+        CREATE TABLE IF NOT EXISTS api_ingest.dq_rule_counts (
+            id SERIAL PRIMARY KEY,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            table_name VARCHAR(100) NOT NULL,
+            rule VARCHAR(50) NOT NULL,
+            action VARCHAR(10) NOT NULL,
+            rows_checked BIGINT NOT NULL,
+            violations BIGINT NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_dq_rule_counts_rule
+        ON api_ingest.dq_rule_counts(table_name, rule, checked_at DESC);
+    """),
+
+    (14, 'Create pipeline run ledger and stage metrics', """
+        CREATE TABLE IF NOT EXISTS api_ingest.pipeline_runs (
+            id SERIAL PRIMARY KEY,
+            run_name VARCHAR(100) NOT NULL,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            duration_seconds FLOAT,
+            status VARCHAR(20) NOT NULL,
+            rows_written BIGINT,
+            bytes_fetched BIGINT,
+            errors INTEGER,
+            params JSONB
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_pipeline_runs_name_started
+        ON api_ingest.pipeline_runs(run_name, started_at DESC);
+
+        -- provider is 'pipeline:<name>' for Pipeline stage rows (calls = items in,
+        -- rows = items out, total_seconds = busy); histogram is {bucket upper ms: count}
+        CREATE TABLE IF NOT EXISTS api_ingest.pipeline_stage_metrics (
+            id SERIAL PRIMARY KEY,
+            run_id INTEGER NOT NULL REFERENCES api_ingest.pipeline_runs(id) ON DELETE CASCADE,
+            provider VARCHAR(100) NOT NULL,
+            stage VARCHAR(50) NOT NULL,
+            calls BIGINT NOT NULL,
+            rows BIGINT,
+            bytes BIGINT,
+            errors INTEGER,
+            total_seconds FLOAT,
+            blocked_seconds FLOAT,
+            p50_ms FLOAT,
+            p95_ms FLOAT,
+            p99_ms FLOAT,
+            max_ms FLOAT,
+            histogram JSONB
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_pipeline_stage_metrics_run
+        ON api_ingest.pipeline_stage_metrics(run_id);
+
+        CREATE INDEX IF NOT EXISTS idx_pipeline_stage_metrics_stage
+        ON api_ingest.pipeline_stage_metrics(provider, stage, run_id DESC);
+    """),
+    (15, 'Partition nrel_pvdaq and tomorrow_weather by month', """
+        -- Creates api_ingest.<parent>_YYYY_MM for the month holding month_start.
+        -- Rows already sitting in <parent>_default for that month are moved
+        -- into it first, so it can always be attached (see partitions.py).
+        CREATE OR REPLACE FUNCTION api_ingest.ensure_month_partition(parent TEXT, key_column TEXT, month_start DATE)
+        RETURNS TEXT LANGUAGE plpgsql AS $$
+        DECLARE
+            lo TIMESTAMP := date_trunc('month', month_start);
+            hi TIMESTAMP := date_trunc('month', month_start) + INTERVAL '1 month';
+            part TEXT := parent || '_' || to_char(month_start, 'YYYY_MM');
+        BEGIN
+            IF to_regclass(format('api_ingest.%I', part)) IS NOT NULL THEN
+                RETURN part;
+            END IF;
+            EXECUTE format('CREATE TABLE api_ingest.%I (LIKE api_ingest.%I INCLUDING DEFAULTS)', part, parent);
+            EXECUTE format('WITH moved AS (DELETE FROM api_ingest.%I WHERE %I >= %L AND %I < %L RETURNING *) '
+                           'INSERT INTO api_ingest.%I SELECT * FROM moved',
+                           parent || '_default', key_column, lo, key_column, hi, part);
+            EXECUTE format('ALTER TABLE api_ingest.%I ATTACH PARTITION api_ingest.%I FOR VALUES FROM (%L) TO (%L)',
+                           parent, part, lo, hi);
+            RETURN part;
+        END $$;
+
+        -- Partitioned tables can't keep a primary key on id alone; the natural
+        -- unique keys include the partition column and identify rows instead.
+        -- Rows with a NULL timestamp go to the default partition.
+        ALTER TABLE api_ingest.nrel_pvdaq RENAME TO nrel_pvdaq_unpartitioned;
+        ALTER TABLE api_ingest.nrel_pvdaq_unpartitioned
+            RENAME CONSTRAINT nrel_pvdaq_pkey TO nrel_pvdaq_unpartitioned_pkey;
+        ALTER INDEX api_ingest.uq_nrel_pvdaq_site_timestamp RENAME TO uq_nrel_pvdaq_site_timestamp_unpartitioned;
+
+        CREATE TABLE api_ingest.nrel_pvdaq (LIKE api_ingest.nrel_pvdaq_unpartitioned INCLUDING DEFAULTS)
+        PARTITION BY RANGE (timestamp);
+        ALTER SEQUENCE api_ingest.nrel_pvdaq_id_seq OWNED BY api_ingest.nrel_pvdaq.id;
+        CREATE TABLE api_ingest.nrel_pvdaq_default PARTITION OF api_ingest.nrel_pvdaq DEFAULT;
+        CREATE UNIQUE INDEX uq_nrel_pvdaq_site_timestamp
+        ON api_ingest.nrel_pvdaq(site_id, timestamp);
+
+        SELECT api_ingest.ensure_month_partition('nrel_pvdaq', 'timestamp', month::DATE)
+        FROM (
+            SELECT DISTINCT date_trunc('month', timestamp) AS month
+            FROM api_ingest.nrel_pvdaq_unpartitioned WHERE timestamp IS NOT NULL
+            UNION
+            SELECT generate_series(date_trunc('month', NOW()), date_trunc('month', NOW()) + INTERVAL '3 months',
+                                   INTERVAL '1 month')
+        ) months
+        ORDER BY month;
+
+        INSERT INTO api_ingest.nrel_pvdaq SELECT * FROM api_ingest.nrel_pvdaq_unpartitioned;
+        DROP TABLE api_ingest.nrel_pvdaq_unpartitioned;
+        ANALYZE api_ingest.nrel_pvdaq;
+
+        ALTER TABLE api_ingest.tomorrow_weather RENAME TO tomorrow_weather_unpartitioned;
+        ALTER TABLE api_ingest.tomorrow_weather_unpartitioned
+            RENAME CONSTRAINT tomorrow_weather_pkey TO tomorrow_weather_unpartitioned_pkey;
+        ALTER INDEX api_ingest.uq_tomorrow_weather_location_times
+            RENAME TO uq_tomorrow_weather_location_times_unpartitioned;
+
+        CREATE TABLE api_ingest.tomorrow_weather (LIKE api_ingest.tomorrow_weather_unpartitioned INCLUDING DEFAULTS)
+        PARTITION BY RANGE (valid_time);
+        ALTER SEQUENCE api_ingest.tomorrow_weather_id_seq OWNED BY api_ingest.tomorrow_weather.id;
+        CREATE TABLE api_ingest.tomorrow_weather_default PARTITION OF api_ingest.tomorrow_weather DEFAULT;
+        CREATE UNIQUE INDEX uq_tomorrow_weather_location_times
+        ON api_ingest.tomorrow_weather(location_lat, location_lon, forecast_time, valid_time);
+
+        SELECT api_ingest.ensure_month_partition('tomorrow_weather', 'valid_time', month::DATE)
+        FROM (
+            SELECT DISTINCT date_trunc('month', valid_time) AS month
+            FROM api_ingest.tomorrow_weather_unpartitioned WHERE valid_time IS NOT NULL
+            UNION
+            SELECT generate_series(date_trunc('month', NOW()), date_trunc('month', NOW()) + INTERVAL '3 months',
+                                   INTERVAL '1 month')
+        ) months
+        ORDER BY month;
+
+        INSERT INTO api_ingest.tomorrow_weather SELECT * FROM api_ingest.tomorrow_weather_unpartitioned;
+        DROP TABLE api_ingest.tomorrow_weather_unpartitioned;
+        ANALYZE api_ingest.tomorrow_weather;
+    """),
+
+    (16, 'Add time-series indexes for dashboard and mart queries', """
+        -- Checked by query_plans.py; indexes on the partitioned parents are
+        -- created on every partition, present and future.
+
+        -- BRIN on the append-ordered load time: a few pages per partition, for the
+        -- "rows loaded since the last refresh" scans of incremental consumers.
+        -- Event time is not physically ordered (backfills arrive site by site);
+        -- month partition pruning covers those ranges instead.
+        CREATE INDEX IF NOT EXISTS brin_nrel_pvdaq_ingested_at
+        ON api_ingest.nrel_pvdaq USING BRIN (ingested_at);
+
+        CREATE INDEX IF NOT EXISTS brin_tomorrow_weather_ingested_at
+        ON api_ingest.tomorrow_weather USING BRIN (ingested_at);
+
+        -- Per-site series in time order (PV dashboard, capacity factor) as index-only scans
+        CREATE INDEX IF NOT EXISTS idx_nrel_pvdaq_site_timestamp_power
+        ON api_ingest.nrel_pvdaq(site_id, timestamp) INCLUDE (ac_power, dc_power, poa_irradiance);
+
+        -- Latest forecast for each hour at a location
+        CREATE INDEX IF NOT EXISTS idx_tomorrow_weather_location_valid_forecast
+        ON api_ingest.tomorrow_weather(location_lat, location_lon, valid_time, forecast_time DESC);
+
+        -- Next-48-hours forecast chart: ordered, index-only, stops after the LIMIT
+        CREATE INDEX IF NOT EXISTS idx_tomorrow_weather_valid_time_chart
+        ON api_ingest.tomorrow_weather(valid_time) INCLUDE (temperature, cloud_cover, humidity);
+    """),
+
+    (17, 'Key mart.pv_system_hourly on (site_id, hour) for incremental refresh', """
+        CREATE TABLE IF NOT EXISTS mart.pv_system_hourly (
+            site_id VARCHAR(50) NOT NULL,
+            hour TIMESTAMP NOT NULL,
+            avg_ac_power FLOAT,
+            max_ac_power FLOAT,
+            min_ac_power FLOAT,
+            avg_dc_power FLOAT,
+            avg_poa_irradiance FLOAT,
+            avg_ambient_temp FLOAT,
+            sample_count BIGINT,
+            hour_of_day INTEGER,
+            day_of_week INTEGER,
+            month INTEGER
+        );
+
+        -- Tables built by the old CREATE TABLE AS scripts: missing columns,
+        -- and load_more_data.py grouped by raw timestamp so hours could repeat.
+        -- The first refresh has no watermark and recomputes every hour anyway.
+        ALTER TABLE mart.pv_system_hourly
+            ADD COLUMN IF NOT EXISTS min_ac_power FLOAT,
+            ADD COLUMN IF NOT EXISTS avg_dc_power FLOAT,
+            ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+        DELETE FROM mart.pv_system_hourly WHERE site_id IS NULL OR hour IS NULL;
+
+        DELETE FROM mart.pv_system_hourly a
+        USING mart.pv_system_hourly b
+        WHERE a.site_id = b.site_id AND a.hour = b.hour AND a.ctid < b.ctid;
+
+        DROP INDEX IF EXISTS mart.idx_pv_hourly_site_hour;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_pv_system_hourly_site_hour
+        ON mart.pv_system_hourly(site_id, hour);
+
+        -- How far into api_ingest each incrementally refreshed mart has read (by ingested_at)
+        CREATE TABLE IF NOT EXISTS mart.refresh_watermarks (
+            mart_name VARCHAR(100) PRIMARY KEY,
+            watermark TIMESTAMP NOT NULL,
+            hours_refreshed BIGINT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+
+    (18, 'Record the error that failed a pipeline run', """
+        ALTER TABLE api_ingest.pipeline_runs ADD COLUMN IF NOT EXISTS error TEXT;
+
+        -- Runs that died before the ledger could close them
+        UPDATE api_ingest.pipeline_runs
+        SET status = 'failed', error = 'run ended without finishing'
+        WHERE status = 'running' AND finished_at IS NULL;
+    """),
+
+    (19, 'Cover the nrel_pvdaq power columns in its unique key index', """
+        -- One (site_id, timestamp) btree per partition instead of two: the unique
+        -- key index carries the dashboard columns for index-only scans and
+        -- replaces idx_nrel_pvdaq_site_timestamp_power from migration 16.
+        -- CREATE UNIQUE INDEX blocks writes to nrel_pvdaq while it builds (one
+        -- full scan of every partition), so apply this outside load windows.
+        DROP INDEX IF EXISTS api_ingest.idx_nrel_pvdaq_site_timestamp_power;
+
+        CREATE UNIQUE INDEX uq_nrel_pvdaq_site_timestamp_covering
+        ON api_ingest.nrel_pvdaq(site_id, timestamp) INCLUDE (ac_power, dc_power, poa_irradiance);
+
+        DROP INDEX api_ingest.uq_nrel_pvdaq_site_timestamp;
+        ALTER INDEX api_ingest.uq_nrel_pvdaq_site_timestamp_covering RENAME TO uq_nrel_pvdaq_site_timestamp;
+    """),
+]
+
+
+def get_db_engine():
+    db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/solar_analytics"
+    return create_engine(db_url)
+
+
+def run_migrations(engine, verbose=True):
+    """Apply every migration newer than schema_version; returns the versions applied"""
+    applied = []
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS public.schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            raw.commit()
+
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM public.schema_version")
+            current = cur.fetchone()[0]
+
+            for version, description, sql in MIGRATIONS:
+                if version <= current:
+                    continue
+                # One transaction per migration, including its version row
+                cur.execute(sql)
+                cur.execute("INSERT INTO public.schema_version (version, description) VALUES (%s, %s)",
+                            (version, description))
+                raw.commit()
+                applied.append(version)
+                if verbose:
+                    print(f"✅ Applied migration {version:03d}: {description}")
+
+            if verbose and not applied:
+                print(f"✅ Schema up to date (version {current})")
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        try:
+            with raw.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            raw.commit()
+        finally:
+            raw.close()
+
+    return applied
+
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def ensure_schema(engine):
+    """Run migrations once per database per process (cheap to call from every loader)"""
+    key = str(engine.url)
+    with _migrated_lock:
+        if key in _migrated:
+            return
+        run_migrations(engine, verbose=False)
+        _migrated.add(key)
+
+
+if __name__ == "__main__":
+    print("Running schema migrations...")
+    run_migrations(get_db_engine())
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""Local mock of the NREL, Tomorrow.io, OpenWeather and NOAA APIs for load testing
+
+Serves the endpoints our loaders call with synthetic (but deterministic per
+lat/lon) payloads, behind configurable latency, error rates and 429
+throttling. Point the loaders at it with MOCK_API_URL; HttpClient keeps
+identifying providers by the original host, so client-side rate limiting and
+stats still line up per provider.
+
+    python -m src.etl.mock_api serve --port 8765 --latency-ms 80 --error-rate 0.01
+    MOCK_API_URL=http://127.0.0.1:8765 python load_more_data.py
+
+    python -m src.etl.mock_api loadtest --sites 10000 --throttle-rps 50
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from src.etl.cli import arg
+from src.etl.rate_limiter import TokenBucket
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+          'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+class MockConfig:
+    """Latency, failure and payload knobs for MockApiServer"""
+
+    def __init__(self, latency_ms=50.0, latency_dist='lognormal', latency_sigma=0.5,
+                 error_rate=0.0, throttle=None, forecast_hours=120, minutely=60, forecast_days=6):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {LATENCY_DISTRIBUTIONS}")
+        self.latency_ms = latency_ms        # median for lognormal, mean otherwise
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma  # lognormal shape
+        self.error_rate = error_rate        # fraction of requests answered 500/503
+        self.throttle = throttle or {}      # provider -> (requests/sec, burst), 429 beyond it
+        self.forecast_hours = forecast_hours
+        self.minutely = minutely
+        self.forecast_days = forecast_days
+
+
+def _site_rng(lat, lon, salt=0):
+    """Deterministic generator per location so repeated calls return the same data"""
+    seed = zlib.crc32(f"{float(lat):.4f},{float(lon):.4f},{salt}".encode('utf-8'))
+    return np.random.default_rng(seed)
+
+
+def _location(query):
+    """(lat, lon) from lat/lon params or Tomorrow.io's location=lat,lon"""
+    if 'location' in query:
+        lat, lon = query['location'][0].split(',')[:2]
+        return float(lat), float(lon)
+    return float(query.get('lat', ['33.4484'])[0]), float(query.get('lon', ['-112.0740'])[0])
+
+
+def _clear_sky(hours, lat):
+    """Rough clear-sky irradiance shape (W/m2) for hour-of-year values"""
+    day = hours // 24
+    hour = hours % 24
+    declination = 23.45 * np.sin(np.radians(360 * (284 + day) / 365))
+    hour_angle = 15 * (hour - 12)
+    elevation = np.degrees(np.arcsin(
+        np.sin(np.radians(lat)) * np.sin(np.radians(declination)) +
+        np.cos(np.radians(lat)) * np.cos(np.radians(declination)) * np.cos(np.radians(hour_angle))))
+    return np.clip(1000 * np.sin(np.radians(elevation)), 0, None)
+
+
+def solar_resource_payload(query, config):
+    lat, lon = _location(query)
+    rng = _site_rng(lat, lon)
+    seasonal = 1 + 0.3 * np.cos(np.radians((np.arange(12) - 5.5) * 30))
+    base = max(2.0, 7.5 - abs(lat - 30) * 0.08)
+    ghi = np.round(base * seasonal * rng.uniform(0.9, 1.1, 12), 2)
+    dni = np.round(ghi * rng.uniform(1.1, 1.3, 12), 2)
+    tilt = np.round(ghi * rng.uniform(1.05, 1.15, 12), 2)
+
+    def block(values):
+        return {'annual': round(float(values.mean()), 2),
+                'monthly': dict(zip(MONTHS, values.tolist()))}
+
+    return {
+        'version': '1.0.0',
+        'inputs': {'lat': str(lat), 'lon': str(lon)},
+        'outputs': {'avg_dni': block(dni), 'avg_ghi': block(ghi), 'avg_lat_tilt': block(tilt)}
+    }
+
+
+def pvwatts_payload(query, config):
+    lat, lon = _location(query)
+    rng = _site_rng(lat, lon, 'pvwatts')
+    hours = np.arange(8760)
+    poa = _clear_sky(hours, lat) * rng.uniform(0.6, 1.0, 8760)
+    tamb = 15 + 12 * np.sin(np.radians((hours / 24 - 105) * 360 / 365)) + rng.normal(0, 2, 8760)
+    tcell = tamb + poa * 0.03
+    dc = poa * 4.0 * (1 - 0.004 * (tcell - 25))
+    ac = dc * 0.96
+    return {
+        'version': '8.0.0',
+        'inputs': {'lat': str(lat), 'lon': str(lon), 'system_capacity': '4'},
+        'outputs': {
+            'ac': np.round(ac, 3).tolist(), 'dc': np.round(dc, 3).tolist(),
+            'poa': np.round(poa, 3).tolist(), 'tamb': np.round(tamb, 2).tolist(),
+            'tcell': np.round(tcell, 2).tolist(),
+            'ac_annual': round(float(ac.sum() / 1000), 1)
+        }
+    }
+
+
+def nsrdb_request_payload(query, config, base_url):
+    lat, lon = _location(query)
+    year = query.get('year', ['2022'])[0]
+    interval = query.get('interval', ['60'])[0]
+    return {
+        'inputs': {'lat': str(lat), 'lon': str(lon), 'year': year, 'interval': interval},
+        'outputs': {'downloadUrl': f"{base_url}/mock/nsrdb/download.csv"
+                                   f"?lat={lat}&lon={lon}&year={year}&interval={interval}"}
+    }
+
+
+def nsrdb_csv(query, config):
+    """NSRDB CSV: 2 metadata lines, then one row per interval of the year"""
+    lat, lon = _location(query)
+    year = int(query.get('year', ['2022'])[0])
+    interval = int(query.get('interval', ['60'])[0])
+    rng = _site_rng(lat, lon, f'nsrdb{year}')
+
+    index = pd.date_range(f'{year}-01-01', f'{year}-12-31 23:59', freq=f'{interval}min')
+    hours = (index.dayofyear.to_numpy() - 1) * 24 + index.hour.to_numpy() + index.minute.to_numpy() / 60
+    n = len(index)
+    ghi = _clear_sky(hours, lat) * rng.uniform(0.5, 1.0, n)
+    df = pd.DataFrame({
+        'Year': index.year, 'Month': index.month, 'Day': index.day,
+        'Hour': index.hour, 'Minute': index.minute,
+        'GHI': ghi.round().astype(int),
+        'DNI': (ghi * rng.uniform(0.8, 1.2, n)).round().astype(int),
+        'DHI': (ghi * rng.uniform(0.1, 0.3, n)).round().astype(int),
+        'Temperature': (15 + 12 * np.sin(np.radians((hours / 24 - 105) * 360 / 365))).round(1),
+        'Wind Speed': rng.uniform(0, 8, n).round(1)
+    })
+    meta = (f"Source,Location ID,Latitude,Longitude,Time Zone\n"
+            f"NSRDB,{zlib.crc32(f'{lat},{lon}'.encode()) % 10**6},{lat},{lon},-7\n")
+    return meta + df.to_csv(index=False)
+
+
+def _timeline(rng, start, periods, freq, lat):
+    """Tomorrow.io timeline entries with the full default field set"""
+    index = pd.date_range(start, periods=periods, freq=freq)
+    hours = (index.dayofyear.to_numpy() - 1) * 24 + index.hour.to_numpy()
+    temperature = 15 + 10 * np.sin(np.radians((index.hour.to_numpy() - 9) * 15)) + rng.normal(0, 1, periods)
+    cloud = np.clip(rng.normal(30, 25, periods), 0, 100)
+    humidity = np.clip(rng.normal(40, 15, periods), 0, 100)
+    values = pd.DataFrame({
+        'temperature': temperature.round(1),
+        'temperatureApparent': (temperature - rng.uniform(0, 2, periods)).round(1),
+        'humidity': humidity.round(),
+        'dewPoint': (temperature - (100 - humidity) / 5).round(1),
+        'windSpeed': rng.uniform(0, 10, periods).round(1),
+        'windGust': rng.uniform(0, 15, periods).round(1),
+        'windDirection': rng.uniform(0, 360, periods).round(),
+        'cloudCover': cloud.round(),
+        'cloudBase': rng.uniform(0, 5, periods).round(1),
+        'precipitationProbability': np.where(cloud > 70, rng.uniform(0, 60, periods), 0).round(),
+        'rainIntensity': np.where(cloud > 85, rng.uniform(0, 3, periods), 0).round(2),
+        'pressureSurfaceLevel': rng.normal(1013, 5, periods).round(1),
+        'visibility': rng.uniform(10, 16, periods).round(1),
+        'uvIndex': (_clear_sky(hours, lat) / 100).round().astype(int),
+        'weatherCode': np.where(cloud > 50, 1102, 1000)
+    })
+    times = index.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [{'time': t, 'values': v} for t, v in zip(times, values.to_dict('records'))]
+
+
+def tomorrow_forecast_payload(query, config):
+    lat, lon = _location(query)
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    # Same data for a location for the whole hour, like a real model run
+    rng = _site_rng(lat, lon, now.strftime('%Y%m%d%H'))
+    timelines = {
+        'minutely': _timeline(rng, now.floor('min'), config.minutely, 'min', lat),
+        'hourly': _timeline(rng, now.floor('h'), config.forecast_hours, 'h', lat),
+        'daily': _timeline(rng, now.floor('D'), config.forecast_days, 'D', lat)
+    }
+    return {'timelines': timelines, 'location': {'lat': lat, 'lon': lon}}
+
+
+def tomorrow_realtime_payload(query, config):
+    lat, lon = _location(query)
+    now = pd.Timestamp.now(tz='UTC').floor('min')
+    entry = _timeline(_site_rng(lat, lon, now.strftime('%Y%m%d%H%M')), now.tz_localize(None), 1, 'min', lat)[0]
+    return {'data': entry, 'location': {'lat': lat, 'lon': lon}}
+
+
+def _openweather_conditions(rng, n):
+    """OpenWeather main/wind/clouds/weather blocks for n observations"""
+    temp = rng.normal(22, 6, n).round(2)
+    clouds = rng.integers(0, 100, n)
+    return [{
+        'main': {'temp': float(t), 'feels_like': round(float(t) - 1, 2), 'temp_min': round(float(t) - 2, 2),
+                 'temp_max': round(float(t) + 2, 2), 'pressure': 1013, 'humidity': int(h)},
+        'weather': [{'id': 804, 'main': 'Clouds', 'description': 'overcast clouds', 'icon': '04d'}
+                    if c > 85 else {'id': 800, 'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+        'clouds': {'all': int(c)},
+        'wind': {'speed': float(w), 'deg': int(d), 'gust': round(float(w) * 1.5, 2)},
+        'visibility': 10000
+    } for t, h, c, w, d in zip(temp, rng.integers(10, 90, n), clouds,
+                               rng.uniform(0, 10, n).round(2), rng.integers(0, 360, n))]
+
+
+def openweather_payload(query, config):
+    lat, lon = _location(query)
+    rng = _site_rng(lat, lon, int(time.time() // 600))
+    return dict(_openweather_conditions(rng, 1)[0],
+                coord={'lon': lon, 'lat': lat}, dt=int(time.time() // 600 * 600), name='Mock')
+
+
+def openweather_forecast_payload(query, config):
+    """5 day / 3 hour forecast: 40 entries starting at the next 3-hour boundary"""
+    lat, lon = _location(query)
+    start = int(time.time() // 10800 * 10800) + 10800
+    rng = _site_rng(lat, lon, start)
+    entries = _openweather_conditions(rng, 40)
+    for i, entry in enumerate(entries):
+        entry['dt'] = start + i * 10800
+        entry['pop'] = round(entry['clouds']['all'] / 100 * 0.5, 2)
+        if entry['clouds']['all'] > 85:
+            entry['rain'] = {'3h': round(float(rng.uniform(0, 4)), 2)}
+    return {'cod': '200', 'cnt': len(entries), 'list': entries,
+            'city': {'coord': {'lat': lat, 'lon': lon}, 'name': 'Mock', 'timezone': 0}}
+
+
+# NWS forecast grid: ~2.5 km cells, one mock forecast office per 5x5 degree block
+NWS_CELL_DEGREES = 0.025
+NWS_COMPASS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+               'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+NWS_SKY = ['Sunny', 'Mostly Sunny', 'Partly Cloudy', 'Mostly Cloudy', 'Cloudy']
+
+
+def noaa_points_payload(path, config):
+    """/points/{lat},{lon}: the forecast office and grid cell covering a point"""
+    lat, lon = (float(v) for v in path.rsplit('/', 1)[1].split(','))
+    office = f"M{int((lat - 20) // 5)}{int((lon + 130) // 5):02d}"
+    x = int(((lon + 130) % 5) / NWS_CELL_DEGREES)
+    y = int(((lat - 20) % 5) / NWS_CELL_DEGREES)
+    grid = f"https://api.weather.gov/gridpoints/{office}/{x},{y}"
+    return {'properties': {'gridId': office, 'gridX': x, 'gridY': y,
+                           'forecast': f"{grid}/forecast", 'forecastHourly': f"{grid}/forecast/hourly",
+                           'forecastGridData': grid}}
+
+
+def noaa_hourly_forecast_payload(path, config):
+    """/gridpoints/{office}/{x},{y}/forecast/hourly in SI units (156 hourly periods)"""
+    rng = _site_rng(0, 0, path)
+    now = pd.Timestamp.now(tz='UTC')
+    index = pd.date_range(now.floor('h'), periods=156, freq='h')
+    temperature = (15 + 10 * np.sin(np.radians((index.hour.to_numpy() - 9) * 15))
+                   + rng.normal(0, 1, len(index))).round()
+    sky = rng.integers(0, len(NWS_SKY), len(index))
+    periods = [{
+        'number': i + 1,
+        'startTime': start.isoformat(),
+        'endTime': (start + pd.Timedelta(hours=1)).isoformat(),
+        'isDaytime': 6 <= start.hour < 18,
+        'temperature': int(t),
+        'temperatureUnit': 'C',
+        'probabilityOfPrecipitation': {'unitCode': 'wmoUnit:percent', 'value': int(s * 10)},
+        'dewpoint': {'unitCode': 'wmoUnit:degC', 'value': round(float(t) - 10, 1)},
+        'relativeHumidity': {'unitCode': 'wmoUnit:percent', 'value': int(rng.integers(10, 90))},
+        'windSpeed': f"{int(rng.integers(0, 30))} km/h",
+        'windDirection': NWS_COMPASS[int(rng.integers(0, 16))],
+        'shortForecast': NWS_SKY[s]
+    } for i, (start, t, s) in enumerate(zip(index, temperature, sky))]
+    return {'properties': {'units': 'si', 'updateTime': now.floor('h').isoformat(),
+                           'generatedAt': now.isoformat(), 'periods': periods}}
+
+
+def alt_fuel_payload(query, config):
+    return {'station_locator_url': 'https://afdc.energy.gov/stations/', 'total_results': 1,
+            'fuel_stations': [{'id': 1, 'station_name': 'Mock Station'}]}
+
+
+# Path -> (provider, payload builder). The NSRDB request endpoints also answer
+# with a downloadUrl that points back at this server.
+ROUTES = {
+    '/api/solar/solar_resource/v1.json': ('NREL', solar_resource_payload),
+    '/api/pvwatts/v8.json': ('NREL', pvwatts_payload),
+    '/api/nsrdb/v2/solar/psm3-download.json': ('NREL', nsrdb_request_payload),
+    '/api/nsrdb/v2/solar/psm3-5min-download.json': ('NREL', nsrdb_request_payload),
+    '/mock/nsrdb/download.csv': ('NREL', nsrdb_csv),
+    '/api/alt-fuel-stations/v1.json': ('NREL', alt_fuel_payload),
+    '/v4/weather/forecast': ('Tomorrow.io', tomorrow_forecast_payload),
+    '/v4/weather/realtime': ('Tomorrow.io', tomorrow_realtime_payload),
+    '/data/2.5/weather': ('OpenWeather', openweather_payload),
+    '/data/2.5/forecast': ('OpenWeather', openweather_forecast_payload),
+}
+
+# Path prefix -> (provider, payload builder) for APIs with parameters in the path
+PATH_ROUTES = {
+    '/points/': ('NOAA', noaa_points_payload),
+    '/gridpoints/': ('NOAA', noaa_hourly_forecast_payload),
+}
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so client connection pooling is exercised
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = (body if isinstance(body, str) else json.dumps(body)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+        return len(body)
+
+    def _handle(self):
+        mock = self.server
+        parts = urlsplit(self.path)
+        route = ROUTES.get(parts.path)
+        if route is None:
+            route = next((r for prefix, r in PATH_ROUTES.items() if parts.path.startswith(prefix)), None)
+        if route is None:
+            self._send(404, {'error': f"no mock for {parts.path}"})
+            return
+        provider, build = route
+
+        time.sleep(mock.sample_latency())
+
+        retry_after = mock.throttle_wait(provider)
+        if retry_after:
+            mock.count(provider, 'throttled')
+            self._send(429, {'message': 'Too Many Requests'},
+                       headers={'Retry-After': str(math.ceil(retry_after))})
+            return
+
+        status = mock.failure_status()
+        if status:
+            mock.count(provider, 'errors')
+            self._send(status, {'error': 'mock upstream failure'})
+            return
+
+        query = parse_qs(parts.query)
+        if build is nsrdb_request_payload:
+            body = build(query, mock.config, f"http://{self.headers.get('Host')}")
+        elif route in PATH_ROUTES.values():
+            body = build(parts.path, mock.config)
+        else:
+            body = build(query, mock.config)
+        content_type = 'text/csv' if isinstance(body, str) else 'application/json'
+        mock.count(provider, 'ok', self._send(200, body, content_type))
+
+    do_GET = _handle
+    do_HEAD = _handle
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """Threaded mock API server; start() runs it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), MockRequestHandler)
+        self.config = config or MockConfig()
+        self.rng = np.random.default_rng()
+        self._lock = threading.Lock()
+        self._buckets = {provider: TokenBucket(rate, burst)
+                         for provider, (rate, burst) in self.config.throttle.items()}
+        self._stats = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sample_latency(self):
+        """Seconds to wait before answering, from the configured distribution"""
+        c = self.config
+        with self._lock:
+            if c.latency_dist == 'fixed':
+                ms = c.latency_ms
+            elif c.latency_dist == 'uniform':
+                ms = self.rng.uniform(0, 2 * c.latency_ms)
+            else:
+                ms = c.latency_ms * self.rng.lognormal(0, c.latency_sigma)
+        return max(ms, 0) / 1000
+
+    def failure_status(self):
+        """500/503 for the configured fraction of requests, else 0"""
+        with self._lock:
+            if self.config.error_rate > 0 and self.rng.random() < self.config.error_rate:
+                return int(self.rng.choice([500, 503]))
+            return 0
+
+    def throttle_wait(self, provider):
+        """0 if the request may proceed, else seconds until the provider has capacity"""
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return 0
+        with self._lock:
+            return bucket.try_take(time.monotonic())
+
+    def count(self, provider, outcome, nbytes=0):
+        with self._lock:
+            stats = self._stats.setdefault(provider, {'ok': 0, 'errors': 0, 'throttled': 0, 'bytes': 0})
+            stats[outcome] += 1
+            stats['bytes'] += nbytes
+
+    def stats(self):
+        with self._lock:
+            return {provider: dict(s) for provider, s in self._stats.items()}
+
+    def print_stats(self):
+        print("\n🧪 Mock API server:")
+        for provider, s in sorted(self.stats().items()):
+            print(f"  {provider}: {s['ok']} ok, {s['errors']} errors, {s['throttled']} throttled, "
+                  f"{s['bytes'] / 1024 / 1024:.1f} MB served")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def fleet_sites(n, clusters=None, radius=0.05):
+    """n synthetic sites spread over the continental US
+
+    With clusters, sites are scattered within +/- radius degrees of that many
+    evenly spread centers instead (a fleet of rooftop systems around a few cities).
+    """
+    centers = clusters or n
+    side = math.ceil(math.sqrt(centers))
+    lats = np.linspace(25.0, 49.0, side)
+    lons = np.linspace(-124.0, -67.0, side)
+    jitter = (np.random.default_rng(0).uniform(-radius, radius, (n, 2)) if clusters
+              else np.zeros((n, 2)))
+    return [
+        {'name': f'Mock {i}', 'lat': round(float(lats[i % centers // side] + jitter[i, 0]), 4),
+         'lon': round(float(lons[i % centers % side] + jitter[i, 1]), 4), 'site_id': f'MOCK_{i:05d}'}
+        for i in range(n)
+    ]
+
+
+def run_load_test(config, sites=1000, jobs=('nrel_monthly', 'tomorrow_forecast'),
+                  max_workers=64, client_limits=False, latency_rounds=1, clusters=None,
+                  snap_to_cells=True):
+    """Run the ingest engine and LatencyCollector against an in-process mock server"""
+    server = MockApiServer(config).start()
+    os.environ['MOCK_API_URL'] = server.url
+
+    # Imported after MOCK_API_URL is set so every HttpClient picks it up
+    from src.etl import rate_limiter, replay
+    from src.etl.ingest_engine import (IngestEngine, nrel_monthly_job, pvwatts_hourly_job,
+                                       tomorrow_forecast_job, openweather_current_job,
+                                       openweather_forecast_job)
+    from src.etl.latency_collector import LatencyCollector
+    from src.etl.nrel_loader_v2 import NRELLoaderV2
+    from src.etl.openweather_loader import OpenWeatherLoader
+    from src.etl.tomorrow_loader_v3 import TomorrowLoaderV3
+
+    replay.disable_response_cache()
+    if not client_limits:
+        # Production limits would cap a 10k-site run at a few requests/hour;
+        # keep the scheduler (it handles the mock's 429s) but lift the rates
+        rate_limiter.get_scheduler().limits.update(
+            {provider: (1e6, 1e6) for provider in rate_limiter.PROVIDER_LIMITS})
+
+    print(f"🧪 Mock API at {server.url}: latency {config.latency_dist} {config.latency_ms}ms, "
+          f"error rate {config.error_rate:.1%}, throttle {config.throttle or 'off'}")
+
+    nrel = NRELLoaderV2()
+    factories = {
+        'nrel_monthly': lambda: nrel_monthly_job(nrel),
+        'pvwatts_hourly': lambda: pvwatts_hourly_job(nrel),
+        'tomorrow_forecast': lambda: tomorrow_forecast_job(TomorrowLoaderV3()),
+        'openweather_current': lambda: openweather_current_job(OpenWeatherLoader()),
+        'openweather_forecast': lambda: openweather_forecast_job(OpenWeatherLoader()),
+    }
+    try:
+        stats = IngestEngine(max_workers=max_workers, provider_concurrency={
+            'NREL': max_workers, 'Tomorrow.io': max_workers, 'OpenWeather': max_workers
+        }, snap_to_cells=snap_to_cells).run(fleet_sites(sites, clusters),
+                                            [factories[name]() for name in jobs])
+
+        collector = LatencyCollector()
+        for _ in range(latency_rounds):
+            collector.collect_all_latencies()
+        collector.http.print_stats()
+    finally:
+        server.print_stats()
+        server.stop()
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('serve', 'loadtest'):
+        print("Usage: python -m src.etl.mock_api serve|loadtest [--port N] [--latency-ms MS] "
+              "[--latency-dist fixed|uniform|lognormal] [--latency-sigma S] [--error-rate P] "
+              "[--throttle-rps N] [--forecast-hours N] [--sites N] [--jobs a,b] [--workers N] "
+              "[--clusters N] [--no-snap] [--client-limits]")
+        sys.exit(1)
+
+    rps = arg('--throttle-rps', None, float)
+    config = MockConfig(
+        latency_ms=arg('--latency-ms', 50.0, float),
+        latency_dist=arg('--latency-dist', 'lognormal'),
+        latency_sigma=arg('--latency-sigma', 0.5, float),
+        error_rate=arg('--error-rate', 0.0, float),
+        throttle={p: (rps, max(int(rps), 1)) for p in ('NREL', 'Tomorrow.io', 'OpenWeather', 'NOAA')} if rps else None,
+        forecast_hours=arg('--forecast-hours', 120, int)
+    )
+
+    if sys.argv[1] == 'serve':
+        server = MockApiServer(config, host=arg('--host', '127.0.0.1'), port=arg('--port', 8765, int))
+        print(f"🧪 Mock API listening on {server.url} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.print_stats()
+    else:
+        run_load_test(config, sites=arg('--sites', 1000, int),
+                      jobs=tuple(arg('--jobs', 'nrel_monthly,tomorrow_forecast').split(',')),
+                      max_workers=arg('--workers', 64, int),
+                      clusters=arg('--clusters', None, int),
+                      snap_to_cells='--no-snap' not in sys.argv,
+                      client_limits='--client-limits' in sys.argv)
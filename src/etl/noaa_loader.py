@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""NOAA / National Weather Service hourly forecast loader
+
+Each site's lat/lon is resolved to its NWS forecast grid cell with
+/points once; the answer never changes, so it is kept in the response cache
+with no expiry. Sites in the same ~2.5 km cell share one hourly forecast
+fetch, the per-cell fetches run concurrently, and everything is written to
+api_ingest.noaa_weather in one upsert keyed by cell (station_id). Sites whose
+cell could not be resolved or fetched, and a batch that fails to write, go
+to the dead-letter queue as 'noaa_hourly'.
+
+    python -m src.etl.noaa_loader [--sites sites.json] [--workers N]
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.etl import http_client, metrics, response_cache
+from src.etl.bulk_writer import BulkWriter
+from src.etl.cli import DEFAULT_SITES, arg, load_sites
+from src.etl.dead_letter import get_queue
+from src.etl.metrics import PipelineRun
+from src.etl.migrations import ensure_schema, get_db_engine
+from src.etl.payload_store import PayloadStore
+
+load_dotenv()
+
+POINTS_URL = 'https://api.weather.gov/points/{lat:.4f},{lon:.4f}'  # NWS rejects > 4 decimals
+DEFAULT_MAX_WORKERS = 8
+DEAD_LETTER_JOB = 'noaa_hourly'
+
+COMPASS_DEGREES = {name: i * 22.5 for i, name in enumerate(
+    ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+     'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW'])}
+
+# The hourly forecast has no sky cover; map the NWS sky wording to the
+# midpoint of its oktas range (checked in order, "mostly" before the bare word)
+SKY_COVER = [
+    ('mostly sunny|mostly clear', 19),
+    ('mostly cloudy', 81),
+    ('partly sunny|partly cloudy', 50),
+    ('sunny|clear', 6),
+    ('cloudy|overcast', 100),
+]
+
+def hourly_forecast_frame(properties, grid_id, payload_hash=None):
+    """api_ingest.noaa_weather rows from a /forecast/hourly response"""
+    periods = pd.json_normalize(properties.get('periods') or [])
+    if periods.empty:
+        return pd.DataFrame()
+
+    temperature = periods['temperature'].astype(float)
+    if 'temperatureUnit' in periods:
+        temperature = temperature.where(periods['temperatureUnit'] != 'F', (temperature - 32) * 5 / 9)
+
+    # "18 km/h", "10 mph" or "5 to 10 mph" -> m/s (mean of a range)
+    wind = periods['windSpeed'].fillna('')
+    speeds = wind.str.extractall(r'(\d+(?:\.\d+)?)')[0].astype(float).groupby(level=0).mean()
+    speeds = speeds.reindex(periods.index) * np.where(wind.str.contains('mph'), 0.44704, 1 / 3.6)
+
+    sky = periods['shortForecast'].fillna('').str.lower()
+    cloud_cover = np.select([sky.str.contains(pattern) for pattern, _ in SKY_COVER],
+                            [cover for _, cover in SKY_COVER], default=-1)
+
+    forecast_time = pd.to_datetime(properties.get('updateTime') or properties.get('generatedAt'), utc=True)
+    return pd.DataFrame({
+        'station_id': grid_id,
+        'forecast_time': forecast_time.tz_localize(None),
+        'valid_time': pd.to_datetime(periods['startTime'], utc=True).dt.tz_localize(None),
+        'temperature': temperature.round(2),
+        'wind_speed': speeds.round(2),
+        'wind_direction': periods['windDirection'].map(COMPASS_DEGREES),
+        'cloud_cover': pd.array(np.where(cloud_cover < 0, None, cloud_cover), dtype='Int64'),
+        'precipitation_prob': periods.get('probabilityOfPrecipitation.value'),
+        'humidity': periods.get('relativeHumidity.value'),
+        'dew_point': periods.get('dewpoint.value'),
+        'short_forecast': periods['shortForecast'],
+        'raw_payload_hash': payload_hash
+    })
+
+
+class NOAALoader:
+    def __init__(self):
+        self.engine = get_db_engine()
+        ensure_schema(self.engine)
+        self.writer = BulkWriter(self.engine)
+        self.payloads = PayloadStore(self.engine)
+        self.dead_letters = get_queue()
+
+    def resolve_grid(self, lat, lon):
+        """{'grid_id': 'PSR/158,57', 'forecast_url': ...} for a point, or None outside NWS coverage"""
+        try:
+            resp = response_cache.get(POINTS_URL.format(lat=lat, lon=lon), timeout=30)
+            if resp.status_code != 200:
+                print(f"❌ NOAA points error for {lat}, {lon}: {resp.status_code}")
+                return None
+
+            props = metrics.decode_json(resp, 'NOAA')['properties']
+            return {'grid_id': f"{props['gridId']}/{props['gridX']},{props['gridY']}",
+                    'forecast_url': props['forecastHourly']}
+
+        except Exception as e:
+            print(f"❌ Error resolving NOAA grid for {lat}, {lon}: {e}")
+            return None
+
+    def fetch_hourly_forecast(self, grid):
+        """Hourly forecast for one grid cell as a DataFrame (no database write)"""
+        try:
+            resp = http_client.get(grid['forecast_url'], params={'units': 'si'}, timeout=30)
+            if resp.status_code != 200:
+                print(f"❌ NOAA forecast error for {grid['grid_id']}: {resp.status_code}")
+                return pd.DataFrame()
+
+            payload_hash = self.payloads.put(resp.content, 'noaa_forecast_hourly')
+            properties = metrics.decode_json(resp, 'NOAA')['properties']
+            with metrics.timed('NOAA', 'frame_build') as m:
+                df = hourly_forecast_frame(properties, grid['grid_id'], payload_hash)
+                m.rows = len(df)
+            return df
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return pd.DataFrame()
+
+    def load_sites(self, sites=None, max_workers=DEFAULT_MAX_WORKERS):
+        """Resolve every site's grid cell, fetch each distinct cell once, write one batch"""
+        sites = sites or DEFAULT_SITES
+        print(f"Loading NOAA hourly forecasts for {len(sites)} sites...")
+        start = time.perf_counter()
+        # An exception ends the run as failed in the ledger
+        with PipelineRun(self.engine, 'noaa_hourly', {'sites': len(sites), 'max_workers': max_workers}) as run:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                grids = list(pool.map(lambda site: self.resolve_grid(site['lat'], site['lon']), sites))
+
+                cells, members = {}, {}
+                for site, grid in zip(sites, grids):
+                    if grid is not None:
+                        cells.setdefault(grid['grid_id'], grid)
+                        members.setdefault(grid['grid_id'], []).append(site)
+
+                frames = []
+                for grid_id, df in zip(cells, pool.map(self.fetch_hourly_forecast, cells.values())):
+                    if df.empty:
+                        self.dead_letters.put_fetch(DEAD_LETTER_JOB, members[grid_id], 'no forecast returned')
+                    else:
+                        frames.append(df)
+
+            unresolved = [site for site, grid in zip(sites, grids) if grid is None]
+            if unresolved:
+                self.dead_letters.put_fetch(DEAD_LETTER_JOB, unresolved, 'grid not resolved')
+
+            rows = 0
+            if frames:
+                df = pd.concat(frames, ignore_index=True)
+                try:
+                    rows = self.writer.upsert(df, 'noaa_weather')
+                except Exception as e:
+                    print(f"❌ Error writing NOAA forecasts: {e}")
+                    self.dead_letters.put_rows(df, 'noaa_weather', error=e)
+            self.dead_letters.close()
+            elapsed = time.perf_counter() - start
+            run.finish(rows_written=rows, errors=len(unresolved) + len(cells) - len(frames))
+
+        stats = {
+            'sites': len(sites),
+            'unresolved_sites': len(unresolved),
+            'grid_cells': len(cells),
+            'failed_cells': len(cells) - len(frames),
+            'rows_written': rows,
+            'elapsed_seconds': round(elapsed, 2),
+        }
+        print(f"✅ Loaded {rows} NOAA forecast records: {len(sites)} sites -> {len(cells)} grid cells "
+              f"({stats['unresolved_sites']} unresolved, {stats['failed_cells']} failed) "
+              f"in {stats['elapsed_seconds']}s")
+        return stats
+
+
+if __name__ == "__main__":
+    loader = NOAALoader()
+    loader.load_sites(load_sites(), max_workers=arg('--workers', DEFAULT_MAX_WORKERS, int))
+    response_cache.get_cache().print_stats()
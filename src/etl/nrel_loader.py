@@ -6,22 +6,93 @@ import pandas as pd
 from datetime import datetime, timedelta
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
-import requests
+from src.etl import http_client, metrics, rate_limiter
+from src.etl.bulk_writer import BulkWriter
+from src.etl.data_quality import DataQuality
+from src.etl.dead_letter import get_queue
+from src.etl.metrics import PipelineRun
+from src.etl.migrations import ensure_schema
+from src.etl.pipeline import Pipeline, Stage, BatchWriteStage, BatchWriteError
 import json
 
 load_dotenv()
 
+# NSRDB CSV header -> api_ingest.nrel_pvdaq column
+NSRDB_COLUMNS = {
+    'GHI': 'ghi',
+    'DNI': 'dni',
+    'DHI': 'dhi',
+    'Temperature': 'ambient_temp',
+    'Wind Speed': 'wind_speed'
+}
+NSRDB_TIME_COLUMNS = ['Year', 'Month', 'Day', 'Hour', 'Minute']
+DEFAULT_CHUNKSIZE = 50000
+PIPELINE_QUEUE_SIZE = 2  # chunks buffered between stages
+
+def nsrdb_chunk_frame(chunk, site_id, raw_json):
+    """Turn one parsed NSRDB CSV chunk into nrel_pvdaq rows"""
+    times = chunk[NSRDB_TIME_COLUMNS].copy()
+    times.columns = [c.lower() for c in NSRDB_TIME_COLUMNS]
+    
+    df = pd.DataFrame({
+        'site_id': site_id,
+        'timestamp': pd.to_datetime(times)
+    })
+    for source, column in NSRDB_COLUMNS.items():
+        df[column] = chunk[source].to_numpy() if source in chunk else None
+    
+    # Irradiance gaps were stored as 0 by the original loader
+    df[['ghi', 'dni', 'dhi']] = df[['ghi', 'dni', 'dhi']].fillna(0)
+    df['raw_json'] = raw_json
+    return df
+
 class NRELLoader:
     def __init__(self):
         self.api_key = os.getenv('NREL_API_KEY')
         self.engine = self._get_db_engine()
+        ensure_schema(self.engine)
+        self.writer = BulkWriter(self.engine)
+        self.quality = DataQuality(self.engine)
     
     def _get_db_engine(self):
         db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/solar_analytics"
         return create_engine(db_url)
     
-    def load_solar_resource_data(self, lat=33.4484, lon=-112.0740, year=2022):
-        """Load solar resource data from NREL NSRDB"""
+    def _validate(self, df, lat):
+        """Data-quality rules on one chunk -> write-stage items"""
+        clean, quarantined = self.quality.check(df, 'nrel_pvdaq', latitude=lat)
+        yield 'api_ingest', 'nrel_pvdaq', clean
+        if quarantined is not None:
+            yield 'api_ingest', 'dq_quarantine', quarantined
+    
+    def stream_nsrdb_csv(self, download_url, chunksize=DEFAULT_CHUNKSIZE,
+                         priority=rate_limiter.PRIORITY_REALTIME):
+        """Yield parsed chunks of an NSRDB CSV download without buffering the file"""
+        with http_client.get(download_url, stream=True, timeout=60, priority=priority) as data_resp:
+            if data_resp.status_code != 200:
+                print(f"❌ NSRDB download error: {data_resp.status_code}")
+                return
+            
+            # Let urllib3 undo any gzip transfer encoding while we read
+            data_resp.raw.decode_content = True
+            
+            # Skip metadata rows (first 2 rows), then read column blocks
+            wanted = set(NSRDB_TIME_COLUMNS) | set(NSRDB_COLUMNS)
+            reader = iter(pd.read_csv(data_resp.raw, skiprows=2, chunksize=chunksize,
+                                      usecols=lambda c: c in wanted))
+            while True:
+                # Streamed: parse time includes reading the chunk off the wire
+                with metrics.timed('NREL', 'decode') as m:
+                    chunk = next(reader, None)
+                    m.rows = 0 if chunk is None else len(chunk)
+                if chunk is None:
+                    return
+                yield chunk
+    
+    def load_solar_resource_data(self, lat=33.4484, lon=-112.0740, year=2022,
+                                 site_id='NREL_TEST', interval=60, chunksize=DEFAULT_CHUNKSIZE,
+                                 priority=rate_limiter.PRIORITY_REALTIME):
+        """Load solar resource data from NREL NSRDB, one chunk at a time"""
         print(f"Loading NREL solar data for {lat}, {lon}...")
         
         # NSRDB API endpoint
@@ -32,7 +103,7 @@ class NRELLoader:
             'lat': lat,
             'lon': lon,
             'year': year,
-            'interval': 60,  # 60-minute intervals
+            'interval': interval,
             'attributes': 'ghi,dni,dhi,air_temperature,wind_speed',
             'name': 'Test+Site',
             'email': 'test@example.com'
@@ -40,59 +111,60 @@ class NRELLoader:
         
         try:
             # This returns a download URL
-            resp = requests.get(url, params=params)
-            if resp.status_code == 200:
-                data = resp.json()
-                
-                # Get the download URL
-                if 'outputs' in data and 'downloadUrl' in data['outputs']:
-                    download_url = data['outputs']['downloadUrl']
-                    
-                    # Download the actual data
-                    print("Downloading solar data...")
-                    data_resp = requests.get(download_url)
-                    
-                    if data_resp.status_code == 200:
-                        # Parse CSV data
-                        lines = data_resp.text.split('\n')
-                        
-                        # Skip metadata rows (first 2 rows)
-                        data_lines = [line for line in lines[2:] if line.strip()]
-                        
-                        # Create DataFrame
-                        if data_lines:
-                            # Parse header
-                            header = data_lines[0].split(',')
-                            
-                            # Sample just first 24 hours for testing
-                            records = []
-                            for line in data_lines[1:25]:  # Just first day
-                                values = line.split(',')
-                                if len(values) >= 8:
-                                    record = {
-                                        'site_id': 'NREL_TEST',
-                                        'timestamp': pd.to_datetime(f"{values[0]}-{values[1]:0>2}-{values[2]:0>2} {values[3]:0>2}:{values[4]:0>2}"),
-                                        'ghi': float(values[5]) if values[5] else 0,
-                                        'dni': float(values[6]) if values[6] else 0,
-                                        'dhi': float(values[7]) if values[7] else 0,
-                                        'ambient_temp': float(values[8]) if len(values) > 8 and values[8] else None,
-                                        'wind_speed': float(values[9]) if len(values) > 9 and values[9] else None,
-                                        'raw_json': json.dumps({'lat': lat, 'lon': lon})
-                                    }
-                                    records.append(record)
-                            
-                            if records:
-                                df = pd.DataFrame(records)
-                                df.to_sql('nrel_pvdaq', self.engine, schema='api_ingest', 
-                                         if_exists='append', index=False)
-                                print(f"✅ Loaded {len(records)} NREL records")
-                                return len(records)
-                
-                print(f"❌ No download URL in response")
-                return 0
-            else:
+            resp = http_client.get(url, params=params, priority=priority)
+            if resp.status_code != 200:
                 print(f"❌ NREL API error: {resp.status_code}")
                 return 0
+            
+            data = metrics.decode_json(resp, 'NREL')
+            
+            # Get the download URL
+            if 'outputs' not in data or 'downloadUrl' not in data['outputs']:
+                print(f"❌ No download URL in response")
+                return 0
+            
+            download_url = data['outputs']['downloadUrl']
+            raw_json = json.dumps({'lat': lat, 'lon': lon})
+            
+            # Download, parse and write overlap; at most a few chunks are in memory
+            print("Downloading solar data...")
+            with PipelineRun(self.engine, 'nsrdb', {'lat': lat, 'lon': lon, 'year': year,
+                                                    'site_id': site_id}) as run:
+                errors = []
+
+                def transform(chunk):
+                    with metrics.timed('NREL', 'frame_build') as m:
+                        df = nsrdb_chunk_frame(chunk, site_id, raw_json)
+                        m.rows = len(df)
+                    return df
+
+                def on_error(stage, item, e):
+                    errors.append(f"{stage}: {e}")
+                    if isinstance(e, BatchWriteError):
+                        get_queue().put_rows(e.df, e.table, schema=e.schema, error=e.error)
+
+                write = BatchWriteStage(self.writer, batch_rows=chunksize)
+                pipeline = Pipeline([
+                    Stage('transform', transform),
+                    Stage('validate', lambda df: self._validate(df, lat)),
+                    write
+                ], queue_size=PIPELINE_QUEUE_SIZE, name='nsrdb',
+                   on_error=on_error)
+                run.add_pipeline(pipeline)
+                pipeline.run(self.stream_nsrdb_csv(download_url, chunksize=chunksize, priority=priority))
+                get_queue().close()
+                self.quality.record_counts()
+            
+                total = write.rows['api_ingest.nrel_pvdaq']
+                run.finish(status='failed' if errors else 'ok', rows_written=total, errors=len(errors))
+                if errors:
+                    print(f"❌ NSRDB load failed after {total} rows: {errors[0]}")
+                    return 0
+                if total:
+                    print(f"✅ Loaded {total} NREL records")
+                else:
+                    print("❌ No rows in NSRDB download")
+                return total
                 
         except Exception as e:
             print(f"❌ Error loading NREL data: {e}")
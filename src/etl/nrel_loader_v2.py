@@ -2,20 +2,58 @@
 """NREL Data Loader - Using simpler API endpoints"""
 
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
-import requests
+from src.etl import http_client, metrics, response_cache
+from src.etl.bulk_writer import BulkWriter
+from src.etl.data_quality import DataQuality
+from src.etl.migrations import ensure_schema
+from src.etl.payload_store import PayloadStore
 import json
 import time
 
 load_dotenv()
 
+def pvwatts_year_index(year=2024):
+    """Hourly timestamps for a PVWatts typical year (8760 hours, no Feb 29)"""
+    index = pd.date_range(f'{year}-01-01', f'{year}-12-31 23:00', freq='h')
+    return index[~((index.month == 2) & (index.day == 29))]
+
+def _hourly_column(values, n, fill=np.nan):
+    """Array of length n from a PVWatts output list, padded with fill"""
+    column = np.full(n, fill, dtype=float)
+    values = np.asarray(values[:n], dtype=float)
+    column[:len(values)] = values
+    return column
+
+def pvwatts_hourly_frame(outputs, site_id='PVWATTS_SIM', year=2024, payload_hash=None):
+    """Build the full-year hourly DataFrame from PVWatts outputs in one step"""
+    ac = outputs.get('ac', [])
+    timestamps = pvwatts_year_index(year)
+    n = min(len(ac), len(timestamps))
+    
+    return pd.DataFrame({
+        'site_id': site_id,
+        'timestamp': timestamps[:n],
+        'ac_power': _hourly_column(ac, n, 0),
+        'dc_power': _hourly_column(outputs.get('dc', []), n, 0),
+        'poa_irradiance': _hourly_column(outputs.get('poa', []), n, 0),
+        'ambient_temp': _hourly_column(outputs.get('tamb', []), n),
+        'raw_json': '{"hour": ' + pd.Series(np.arange(n)).astype(str) + '}',
+        'raw_payload_hash': payload_hash
+    })
+
 class NRELLoaderV2:
     def __init__(self):
         self.api_key = os.getenv('NREL_API_KEY')
         self.engine = self._get_db_engine()
+        ensure_schema(self.engine)
+        self.writer = BulkWriter(self.engine)
+        self.payloads = PayloadStore(self.engine)
+        self.quality = DataQuality(self.engine)
     
     def _get_db_engine(self):
         db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/solar_analytics"
@@ -34,7 +72,7 @@ class NRELLoaderV2:
         }
         
         try:
-            resp = requests.get(url, params=params, timeout=10)
+            resp = http_client.get(url, params=params, timeout=10)
             print(f"API Response: {resp.status_code}")
             if resp.status_code == 200:
                 data = resp.json()
@@ -48,10 +86,8 @@ class NRELLoaderV2:
             print(f"❌ Connection error: {e}")
             return False
     
-    def load_solar_resource_monthly(self, lat=33.4484, lon=-112.0740):
-        """Load monthly average solar data"""
-        print(f"Loading monthly solar averages for {lat}, {lon}...")
-        
+    def fetch_solar_resource_monthly(self, lat=33.4484, lon=-112.0740, site_id='NREL_MONTHLY'):
+        """Fetch monthly average solar data as a DataFrame (no database write)"""
         url = "https://developer.nrel.gov/api/solar/solar_resource/v1.json"
         params = {
             'api_key': self.api_key,
@@ -60,64 +96,79 @@ class NRELLoaderV2:
         }
         
         try:
-            resp = requests.get(url, params=params, timeout=30)
-            if resp.status_code == 200:
-                data = resp.json()
-                
-                # Extract monthly averages
-                if 'outputs' in data:
-                    outputs = data['outputs']
-                    avg_dni = outputs.get('avg_dni', {})
-                    avg_ghi = outputs.get('avg_ghi', {})
-                    
-                    # Create records for each month
-                    records = []
-                    months = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 
-                             'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
-                    
-                    for i, month in enumerate(months, 1):
-                        if 'monthly' in avg_dni and 'monthly' in avg_ghi:
-                            record = {
-                                'site_id': 'NREL_MONTHLY',
-                                'timestamp': pd.to_datetime(f'2024-{i:02d}-15'),  # Middle of month
-                                'ghi': avg_ghi['monthly'].get(month, 0),
-                                'dni': avg_dni['monthly'].get(month, 0),
-                                'dhi': 0,  # Not available in this endpoint
-                                'ambient_temp': None,
-                                'wind_speed': None,
-                                'raw_json': json.dumps({'month': month, 'data': outputs})
-                            }
-                            records.append(record)
-                    
-                    if records:
-                        df = pd.DataFrame(records)
-                        df.to_sql('nrel_pvdaq', self.engine, schema='api_ingest', 
-                                 if_exists='append', index=False)
-                        print(f"✅ Loaded {len(records)} monthly records")
-                        
-                        # Show sample
-                        print("\nSample data:")
-                        for r in records[:3]:
-                            print(f"  {r['timestamp'].strftime('%B')}: GHI={r['ghi']:.1f}, DNI={r['dni']:.1f}")
-                        
-                        return len(records)
-                else:
-                    print("❌ No outputs in response")
-                    print(f"Response: {data}")
-                    return 0
-            else:
+            resp = response_cache.get(url, params=params, timeout=30)
+            if resp.status_code != 200:
                 print(f"❌ API error: {resp.status_code}")
                 print(f"Response: {resp.text[:500]}")
+                return pd.DataFrame()
+            
+            data = metrics.decode_json(resp, 'NREL')
+            
+            # Extract monthly averages
+            if 'outputs' not in data:
+                print("❌ No outputs in response")
+                print(f"Response: {data}")
+                return pd.DataFrame()
+            
+            outputs = data['outputs']
+            payload_hash = self.payloads.put(resp.content, 'nrel_solar_resource')
+            avg_dni = outputs.get('avg_dni', {})
+            avg_ghi = outputs.get('avg_ghi', {})
+            
+            # Create records for each month
+            with metrics.timed('NREL', 'frame_build') as m:
+                records = []
+                months = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 
+                         'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+                
+                for i, month in enumerate(months, 1):
+                    if 'monthly' in avg_dni and 'monthly' in avg_ghi:
+                        record = {
+                            'site_id': site_id,
+                            'timestamp': pd.to_datetime(f'2024-{i:02d}-15'),  # Middle of month
+                            'ghi': avg_ghi['monthly'].get(month, 0),
+                            'dni': avg_dni['monthly'].get(month, 0),
+                            'dhi': 0,  # Not available in this endpoint
+                            'ambient_temp': None,
+                            'wind_speed': None,
+                            'raw_json': json.dumps({'month': month}),
+                            'raw_payload_hash': payload_hash
+                        }
+                        records.append(record)
+                m.rows = len(records)
+            
+            return pd.DataFrame(records)
+            
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return pd.DataFrame()
+    
+    def load_solar_resource_monthly(self, lat=33.4484, lon=-112.0740, site_id='NREL_MONTHLY'):
+        """Load monthly average solar data"""
+        print(f"Loading monthly solar averages for {lat}, {lon}...")
+        
+        try:
+            df = self.fetch_solar_resource_monthly(lat, lon, site_id=site_id)
+            if df.empty:
                 return 0
+            
+            self.quality.write(self.writer, df, 'nrel_pvdaq', latitude=lat)
+            self.quality.record_counts()
+            print(f"✅ Loaded {len(df)} monthly records")
+            
+            # Show sample
+            print("\nSample data:")
+            for _, r in df.head(3).iterrows():
+                print(f"  {r['timestamp'].strftime('%B')}: GHI={r['ghi']:.1f}, DNI={r['dni']:.1f}")
+            
+            return len(df)
                 
         except Exception as e:
             print(f"❌ Error: {e}")
             return 0
     
-    def load_pvwatts_hourly(self, lat=33.4484, lon=-112.0740):
-        """Load hourly PV simulation data using PVWatts"""
-        print(f"\nLoading PVWatts hourly data for {lat}, {lon}...")
-        
+    def fetch_pvwatts_hourly(self, lat=33.4484, lon=-112.0740, site_id='PVWATTS_SIM'):
+        """Fetch hourly PV simulation data as a DataFrame (no database write)"""
         url = "https://developer.nrel.gov/api/pvwatts/v8.json"
         params = {
             'api_key': self.api_key,
@@ -133,53 +184,47 @@ class NRELLoaderV2:
         }
         
         try:
-            resp = requests.get(url, params=params, timeout=30)
-            if resp.status_code == 200:
-                data = resp.json()
-                
-                if 'outputs' in data:
-                    outputs = data['outputs']
-                    
-                    # Get just first 48 hours as sample
-                    ac = outputs.get('ac', [])[:48]
-                    dc = outputs.get('dc', [])[:48]
-                    poa = outputs.get('poa', [])[:48]
-                    tamb = outputs.get('tamb', [])[:48]
-                    
-                    records = []
-                    base_time = pd.to_datetime('2024-01-01')
-                    
-                    for i in range(min(48, len(ac))):
-                        record = {
-                            'site_id': 'PVWATTS_SIM',
-                            'timestamp': base_time + pd.Timedelta(hours=i),
-                            'ac_power': ac[i] if i < len(ac) else 0,
-                            'dc_power': dc[i] if i < len(dc) else 0,
-                            'poa_irradiance': poa[i] if i < len(poa) else 0,
-                            'ambient_temp': tamb[i] if i < len(tamb) else None,
-                            'raw_json': json.dumps({'hour': i})
-                        }
-                        records.append(record)
-                    
-                    if records:
-                        df = pd.DataFrame(records)
-                        df.to_sql('nrel_pvdaq', self.engine, schema='api_ingest', 
-                                 if_exists='append', index=False)
-                        print(f"✅ Loaded {len(records)} hourly records")
-                        
-                        # Show sample
-                        print("\nSample hourly data:")
-                        for r in records[10:13]:  # Midday hours
-                            print(f"  {r['timestamp'].strftime('%H:%M')}: AC={r['ac_power']:.0f}W, POA={r['poa_irradiance']:.0f}W/m²")
-                        
-                        return len(records)
-                else:
-                    print("❌ No outputs in response")
-                    return 0
-            else:
+            resp = response_cache.get(url, params=params, timeout=30)
+            if resp.status_code != 200:
                 print(f"❌ API error: {resp.status_code}")
                 print(f"Response: {resp.text[:500]}")
+                return pd.DataFrame()
+            
+            data = metrics.decode_json(resp, 'NREL')
+            
+            if 'outputs' not in data:
+                print("❌ No outputs in response")
+                return pd.DataFrame()
+            
+            payload_hash = self.payloads.put(resp.content, 'nrel_pvwatts')
+            with metrics.timed('NREL', 'frame_build') as m:
+                df = pvwatts_hourly_frame(data['outputs'], site_id, payload_hash=payload_hash)
+                m.rows = len(df)
+            return df
+            
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return pd.DataFrame()
+    
+    def load_pvwatts_hourly(self, lat=33.4484, lon=-112.0740, site_id='PVWATTS_SIM'):
+        """Load hourly PV simulation data using PVWatts"""
+        print(f"\nLoading PVWatts hourly data for {lat}, {lon}...")
+        
+        try:
+            df = self.fetch_pvwatts_hourly(lat, lon, site_id=site_id)
+            if df.empty:
                 return 0
+            
+            self.quality.write(self.writer, df, 'nrel_pvdaq', latitude=lat)
+            self.quality.record_counts()
+            print(f"✅ Loaded {len(df)} hourly records")
+            
+            # Show sample
+            print("\nSample hourly data:")
+            for _, r in df.iloc[10:13].iterrows():  # Midday hours
+                print(f"  {r['timestamp'].strftime('%H:%M')}: AC={r['ac_power']:.0f}W, POA={r['poa_irradiance']:.0f}W/m²")
+            
+            return len(df)
                 
         except Exception as e:
             print(f"❌ Error: {e}")
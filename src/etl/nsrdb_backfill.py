@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Resumable parallel NSRDB historical backfill
+
+Splits a backfill into (site, year) partitions and loads them across a
+process pool with NRELLoader. Each finished partition is checkpointed in
+api_ingest.backfill_ledger, so re-running the same command after an
+interruption only fetches what is still missing (failed partitions are
+retried). Requests go out at backfill priority, behind real-time loads.
+
+    python -m src.etl.nsrdb_backfill --start 1998 --end 2023 --workers 4 [--sites sites.json]
+"""
+
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+from src.etl import rate_limiter
+from src.etl.cli import DEFAULT_SITES, arg, load_sites
+from src.etl.migrations import ensure_schema, get_db_engine
+
+load_dotenv()
+
+SOURCE = 'nsrdb'
+FIRST_NSRDB_YEAR = 1998
+DEFAULT_WORKERS = 4
+
+
+def nsrdb_site_id(site):
+    """Stored site_id (and ledger key); sites given only by coordinates are keyed by them"""
+    if site.get('site_id'):
+        return f"NSRDB_{site['site_id']}"
+    return f"NSRDB_{float(site['lat']):.4f}_{float(site['lon']):.4f}"
+
+
+class BackfillLedger:
+    """Checkpoints of finished (site, year) partitions in api_ingest.backfill_ledger"""
+
+    def __init__(self, engine, source=SOURCE):
+        self.engine = engine
+        self.source = source
+
+    def completed(self):
+        """{(site_id, year)} already loaded"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT site_id, year FROM api_ingest.backfill_ledger
+                WHERE source = :source AND status = 'done'
+            """), {'source': self.source}).fetchall()
+        return {(row.site_id, row.year) for row in rows}
+
+    def record(self, site_id, year, rows, seconds, error=None):
+        with self.engine.connect() as conn:
+            conn.execute(text("""
+                INSERT INTO api_ingest.backfill_ledger
+                    (source, site_id, year, status, rows, seconds, error, updated_at)
+                VALUES (:source, :site_id, :year, :status, :rows, :seconds, :error, NOW())
+                ON CONFLICT (source, site_id, year) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    rows = EXCLUDED.rows,
+                    seconds = EXCLUDED.seconds,
+                    error = EXCLUDED.error,
+                    attempts = api_ingest.backfill_ledger.attempts + 1,
+                    updated_at = NOW()
+            """), {'source': self.source, 'site_id': site_id, 'year': year,
+                   'status': 'failed' if error else 'done', 'rows': rows,
+                   'seconds': round(seconds, 2), 'error': error})
+            conn.commit()
+
+
+def partitions(sites, start_year, end_year, done=()):
+    """(site, year) pairs still to load, oldest year first across all sites"""
+    return [(site, year)
+            for year in range(start_year, end_year + 1)
+            for site in sites
+            if (nsrdb_site_id(site), year) not in done]
+
+
+# One loader per worker process (engines and HTTP pools don't survive fork)
+_loader = None
+
+
+def _init_worker(workers):
+    global _loader
+    from src.etl.nrel_loader import NRELLoader
+
+    # Every process has its own token bucket; split the NREL budget between them
+    scheduler = rate_limiter.get_scheduler()
+    rate, burst = scheduler.limits['NREL']
+    scheduler.limits['NREL'] = (rate / workers, max(1, burst // workers))
+    _loader = NRELLoader()
+
+
+def _load_partition(site, year, interval):
+    """(rows, seconds, error) for one partition; runs in a worker process"""
+    start = time.perf_counter()
+    try:
+        rows = _loader.load_solar_resource_data(
+            site['lat'], site['lon'], year=year, site_id=nsrdb_site_id(site),
+            interval=interval, priority=rate_limiter.PRIORITY_BACKFILL)
+        error = None if rows else 'no rows loaded'
+    except Exception as e:
+        rows, error = 0, str(e)
+    return rows, time.perf_counter() - start, error
+
+
+def _format_eta(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def run_backfill(sites=None, start_year=FIRST_NSRDB_YEAR, end_year=None, workers=DEFAULT_WORKERS,
+                 interval=60):
+    """Load every missing (site, year) partition; returns a stats dict"""
+    sites = sites or DEFAULT_SITES
+    end_year = end_year or datetime.now().year - 1
+
+    engine = get_db_engine()
+    ensure_schema(engine)
+    ledger = BackfillLedger(engine)
+
+    total = len(sites) * (end_year - start_year + 1)
+    todo = partitions(sites, start_year, end_year, ledger.completed())
+    print(f"🗄️  NSRDB backfill {start_year}-{end_year} for {len(sites)} sites: "
+          f"{total} partitions, {total - len(todo)} already done, {len(todo)} to load "
+          f"({workers} workers)")
+
+    start = time.perf_counter()
+    done = failed = rows_total = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(workers,)) as pool:
+        futures = {pool.submit(_load_partition, site, year, interval): (site, year)
+                   for site, year in todo}
+        for future in as_completed(futures):
+            site, year = futures[future]
+            rows, seconds, error = future.result()
+            ledger.record(nsrdb_site_id(site), year, rows, seconds, error)
+
+            done += 1
+            rows_total += rows
+            if error:
+                failed += 1
+            elapsed = time.perf_counter() - start
+            eta = elapsed / done * (len(todo) - done)
+            status = f"❌ {error}" if error else f"{rows:,} rows in {seconds:.1f}s"
+            print(f"[{done}/{len(todo)}] {site.get('name', nsrdb_site_id(site))} {year}: {status} | "
+                  f"{rows_total / elapsed:,.0f} rows/sec, ETA {_format_eta(eta)}")
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'partitions': total,
+        'skipped': total - len(todo),
+        'loaded': done - failed,
+        'failed': failed,
+        'rows': rows_total,
+        'elapsed_seconds': round(elapsed, 2),
+        'rows_per_sec': round(rows_total / elapsed) if elapsed > 0 else 0,
+    }
+    print(f"✅ Backfill finished in {_format_eta(elapsed)}: {stats['loaded']} loaded, "
+          f"{failed} failed (re-run to retry), {rows_total:,} rows ({stats['rows_per_sec']:,} rows/sec)")
+    return stats
+
+
+if __name__ == "__main__":
+    run_backfill(load_sites(),
+                 start_year=arg('--start', FIRST_NSRDB_YEAR, int),
+                 end_year=arg('--end', None, int),
+                 workers=arg('--workers', DEFAULT_WORKERS, int),
+                 interval=arg('--interval', 60, int))
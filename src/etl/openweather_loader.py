@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""OpenWeather loader - current conditions and 5 day / 3 hour forecast per site
+
+Fetches both endpoints for every site concurrently through IngestEngine and
+bulk-writes api_ingest.openweather_current and api_ingest.openweather_forecast.
+A 1,000-site refresh is 2,000 requests, so the free tier's 60 calls/minute
+can't keep a 15-minute cadence; set RATE_LIMIT_OPENWEATHER to the plan's
+limit (e.g. RATE_LIMIT_OPENWEATHER=50,50 for 3,000 calls/minute).
+
+    python -m src.etl.openweather_loader [--sites sites.json] [--workers N]
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.etl import http_client, metrics
+from src.etl.bulk_writer import BulkWriter
+from src.etl.cli import DEFAULT_SITES, arg, load_sites
+from src.etl.migrations import ensure_schema, get_db_engine
+from src.etl.payload_store import PayloadStore
+
+load_dotenv()
+
+CURRENT_URL = 'https://api.openweathermap.org/data/2.5/weather'
+FORECAST_URL = 'https://api.openweathermap.org/data/2.5/forecast'
+
+# Flattened OpenWeather field -> column, shared by both tables
+CONDITION_COLUMNS = {
+    'main.temp': 'temperature',
+    'main.feels_like': 'feels_like',
+    'main.humidity': 'humidity',
+    'main.pressure': 'pressure',
+    'wind.speed': 'wind_speed',
+    'wind.deg': 'wind_direction',
+    'wind.gust': 'wind_gust',
+    'clouds.all': 'cloud_cover',
+    'visibility': 'visibility'
+}
+CURRENT_COLUMNS = dict(CONDITION_COLUMNS, **{'rain.1h': 'rain_1h', 'snow.1h': 'snow_1h'})
+FORECAST_COLUMNS = dict(CONDITION_COLUMNS, **{'pop': 'precipitation_probability',
+                                              'rain.3h': 'rain_3h', 'snow.3h': 'snow_3h'})
+
+def conditions_frame(entries, columns):
+    """Typed columns for a list of OpenWeather condition entries (one pass per column)"""
+    flat = pd.json_normalize(entries)
+    df = pd.DataFrame(index=flat.index)
+    for field, column in columns.items():
+        df[column] = pd.to_numeric(flat[field], errors='coerce') if field in flat else np.nan
+
+    # Only the primary condition is kept
+    weather = [(entry.get('weather') or [{}])[0] for entry in entries]
+    df['weather_id'] = pd.array([w.get('id') for w in weather], dtype='Int64')
+    df['weather_main'] = [w.get('main') for w in weather]
+    df['description'] = [w.get('description') for w in weather]
+    df['dt'] = pd.to_datetime(flat['dt'], unit='s')  # naive UTC, like the TIMESTAMP columns
+    return df
+
+
+class OpenWeatherLoader:
+    def __init__(self):
+        self.api_key = os.getenv('OPENWEATHER_API_KEY')
+        self.engine = get_db_engine()
+        ensure_schema(self.engine)
+        self.writer = BulkWriter(self.engine)
+        self.payloads = PayloadStore(self.engine)
+
+    def _get(self, url, lat, lon, source):
+        """(data, payload_hash) for one OpenWeather call, or (None, None)"""
+        params = {'lat': lat, 'lon': lon, 'appid': self.api_key, 'units': 'metric'}
+        resp = http_client.get(url, params=params, timeout=30)
+        if resp.status_code != 200:
+            print(f"❌ OpenWeather API error: {resp.status_code}")
+            return None, None
+        return metrics.decode_json(resp, 'OpenWeather'), self.payloads.put(resp.content, source)
+
+    def fetch_current(self, lat=33.4484, lon=-112.0740, site_id='OPENWEATHER'):
+        """Current conditions as a one-row DataFrame (no database write)"""
+        try:
+            data, payload_hash = self._get(CURRENT_URL, lat, lon, 'openweather_current')
+            if data is None:
+                return pd.DataFrame()
+
+            with metrics.timed('OpenWeather', 'frame_build') as m:
+                df = conditions_frame([data], CURRENT_COLUMNS).rename(columns={'dt': 'observed_at'})
+                df.insert(0, 'site_id', site_id)
+                df.insert(1, 'location_lat', lat)
+                df.insert(2, 'location_lon', lon)
+                df['raw_payload_hash'] = payload_hash
+                m.rows = len(df)
+            return df
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return pd.DataFrame()
+
+    def fetch_forecast(self, lat=33.4484, lon=-112.0740, site_id='OPENWEATHER'):
+        """5 day / 3 hour forecast as a DataFrame (no database write)"""
+        try:
+            data, payload_hash = self._get(FORECAST_URL, lat, lon, 'openweather_forecast')
+            if data is None or not data.get('list'):
+                return pd.DataFrame()
+
+            with metrics.timed('OpenWeather', 'frame_build') as m:
+                df = conditions_frame(data['list'], FORECAST_COLUMNS).rename(columns={'dt': 'valid_time'})
+                # pop is a 0-1 fraction; store percent like Tomorrow.io's precipitation_probability
+                df['precipitation_probability'] *= 100
+                df.insert(0, 'site_id', site_id)
+                df.insert(1, 'location_lat', lat)
+                df.insert(2, 'location_lon', lon)
+                df.insert(3, 'forecast_time', datetime.utcnow())
+                df['raw_payload_hash'] = payload_hash
+                m.rows = len(df)
+            return df
+
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return pd.DataFrame()
+
+    def load_sites(self, sites=None, max_workers=None):
+        """Fetch current + forecast for every site concurrently and bulk-write both tables"""
+        from src.etl.ingest_engine import (IngestEngine, DEFAULT_MAX_WORKERS,
+                                           openweather_current_job, openweather_forecast_job)
+
+        engine = IngestEngine(max_workers=max_workers or DEFAULT_MAX_WORKERS)
+        return engine.run(sites or DEFAULT_SITES,
+                          [openweather_current_job(self), openweather_forecast_job(self)])
+
+
+if __name__ == "__main__":
+    OpenWeatherLoader().load_sites(load_sites(), max_workers=arg('--workers', None, int))
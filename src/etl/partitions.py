@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Monthly partition maintenance for the time-partitioned ingest tables
+
+api_ingest.nrel_pvdaq (by timestamp) and tomorrow_weather (by valid_time) are
+range-partitioned by month (migration 15), so time-bounded queries only read
+the partitions they touch. This job pre-creates partitions for the coming
+months, gives any month that landed in the <table>_default partition its own
+partition, and applies retention by detaching and dropping whole months.
+
+    python -m src.etl.partitions [--months-ahead N] [--list]
+    python -m src.etl.partitions --drop-before 2023-01 --table tomorrow_weather
+"""
+
+import os
+import sys
+from datetime import date
+
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+from src.etl.cli import arg
+from src.etl.migrations import ensure_schema, get_db_engine
+
+load_dotenv()
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    'nrel_pvdaq': 'timestamp',
+    'tomorrow_weather': 'valid_time',
+}
+DEFAULT_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+
+
+def retention_months(table):
+    """Months kept for a table (RETENTION_MONTHS_TOMORROW_WEATHER=12), None = keep everything"""
+    value = os.getenv(f"RETENTION_MONTHS_{table.upper()}")
+    return int(value) if value else None
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(value):
+    """'2024-03' -> date(2024, 3, 1)"""
+    year, month = value.split('-')[:2]
+    return date(int(year), int(month), 1)
+
+
+class PartitionManager:
+    def __init__(self, engine=None):
+        self.engine = engine or get_db_engine()
+        ensure_schema(self.engine)
+
+    def partitions(self, table):
+        """[{'name', 'month' (None for default), 'rows' (estimate), 'bytes'}] oldest first"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT child.relname AS name, child.reltuples::BIGINT AS rows,
+                       pg_total_relation_size(child.oid) AS bytes
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+                WHERE ns.nspname = 'api_ingest' AND parent.relname = :table
+                ORDER BY child.relname
+            """), {'table': table}).fetchall()
+
+        partitions = []
+        for row in rows:
+            suffix = row.name[len(table) + 1:]
+            month = None if suffix == 'default' else parse_month(suffix.replace('_', '-'))
+            partitions.append({'name': row.name, 'month': month,
+                               'rows': max(row.rows, 0), 'bytes': row.bytes})
+        return partitions
+
+    def _ensure(self, conn, table, month):
+        return conn.execute(text("SELECT api_ingest.ensure_month_partition(:table, :key, :month)"),
+                            {'table': table, 'key': PARTITIONED_TABLES[table], 'month': month}).scalar()
+
+    def ensure_partitions(self, months_ahead=DEFAULT_MONTHS_AHEAD):
+        """Create this month's and the next months_ahead partitions, and split months out of default"""
+        created = []
+        this_month = date.today().replace(day=1)
+        for table, key in PARTITIONED_TABLES.items():
+            existing = {p['name'] for p in self.partitions(table)}
+            with self.engine.begin() as conn:
+                stray = conn.execute(text(f"""
+                    SELECT DISTINCT date_trunc('month', {key})::DATE
+                    FROM api_ingest.{table}_default WHERE {key} IS NOT NULL
+                """)).scalars().all()
+                months = sorted(set(stray) | {add_months(this_month, n) for n in range(months_ahead + 1)})
+                for month in months:
+                    name = self._ensure(conn, table, month)
+                    if name not in existing:
+                        created.append(name)
+        if created:
+            print(f"✅ Created {len(created)} partitions: {', '.join(created)}")
+        return created
+
+    def drop_before(self, table, cutoff):
+        """Detach and drop every monthly partition of table that ends on or before cutoff (a month)"""
+        dropped = []
+        for partition in self.partitions(table):
+            if partition['month'] is None or partition['month'] >= cutoff:
+                continue
+            # Detach first so readers only wait for a brief lock, then drop the standalone table
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE api_ingest.{table} DETACH PARTITION api_ingest.{partition['name']}"))
+                conn.execute(text(f"DROP TABLE api_ingest.{partition['name']}"))
+            dropped.append(partition)
+        if dropped:
+            print(f"🗑️  Dropped {len(dropped)} {table} partitions before {cutoff:%Y-%m} "
+                  f"(~{sum(p['rows'] for p in dropped):,} rows)")
+        return dropped
+
+    def apply_retention(self):
+        """drop_before() for every table with a RETENTION_MONTHS_<TABLE> setting"""
+        dropped = []
+        this_month = date.today().replace(day=1)
+        for table in PARTITIONED_TABLES:
+            months = retention_months(table)
+            if months:
+                dropped += self.drop_before(table, add_months(this_month, -months))
+        return dropped
+
+    def run(self, months_ahead=DEFAULT_MONTHS_AHEAD):
+        """The maintenance job: pre-create, split default, apply retention"""
+        created = self.ensure_partitions(months_ahead)
+        dropped = self.apply_retention()
+        return {'created': created, 'dropped': [p['name'] for p in dropped]}
+
+    def print_partitions(self):
+        for table in PARTITIONED_TABLES:
+            partitions = self.partitions(table)
+            print(f"\n🗂️  api_ingest.{table}: {len(partitions)} partitions")
+            for p in partitions:
+                print(f"  {p['name']}: ~{p['rows']:,} rows, {p['bytes'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    manager = PartitionManager()
+    drop_before = arg('--drop-before', None, parse_month)
+    if drop_before:
+        table = arg('--table', None)
+        if table not in PARTITIONED_TABLES:
+            print(f"❌ --drop-before needs --table ({', '.join(PARTITIONED_TABLES)})")
+            sys.exit(1)
+        manager.drop_before(table, drop_before)
+    else:
+        manager.run(arg('--months-ahead', DEFAULT_MONTHS_AHEAD, int))
+    if '--list' in sys.argv:
+        manager.print_partitions()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Content-addressed store for raw API responses
+
+Each distinct response body is stored once, zlib-compressed, in
+api_ingest.raw_payloads under the sha256 of its bytes. Ingest rows keep only
+raw_payload_hash (plus a tiny row locator in raw_json where one is useful)
+instead of a copy of the response per row.
+"""
+
+import sys
+import json
+import zlib
+import hashlib
+import threading
+
+from sqlalchemy import text
+
+COMPRESSION_LEVEL = 6
+
+
+def payload_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+class PayloadStore:
+    """Put/get raw payloads by hash, skipping hashes this process already stored"""
+
+    def __init__(self, engine, level=COMPRESSION_LEVEL):
+        self.engine = engine
+        self.level = level
+        self._lock = threading.Lock()
+        self._known = set()
+        self.counters = {'stored': 0, 'deduped': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+
+    def put(self, body, source, content_type='application/json'):
+        """Store body (bytes or str) if new; returns its hash"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = payload_hash(body)
+
+        with self._lock:
+            if digest in self._known:
+                self.counters['deduped'] += 1
+                return digest
+
+        compressed = zlib.compress(body, self.level)
+        with self.engine.connect() as conn:
+            result = conn.execute(text("""
+                INSERT INTO api_ingest.raw_payloads
+                    (payload_hash, source, content_type, raw_bytes, stored_bytes, payload)
+                VALUES (:hash, :source, :content_type, :raw_bytes, :stored_bytes, :payload)
+                ON CONFLICT (payload_hash) DO NOTHING
+            """), {'hash': digest, 'source': source, 'content_type': content_type,
+                   'raw_bytes': len(body), 'stored_bytes': len(compressed), 'payload': compressed})
+            conn.commit()
+
+        with self._lock:
+            self._known.add(digest)
+            if result.rowcount:
+                self.counters['stored'] += 1
+                self.counters['raw_bytes'] += len(body)
+                self.counters['stored_bytes'] += len(compressed)
+            else:
+                self.counters['deduped'] += 1
+        return digest
+
+    def get(self, digest):
+        """Decompressed body bytes, or None if unknown"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT payload FROM api_ingest.raw_payloads WHERE payload_hash = :hash
+            """), {'hash': digest}).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(bytes(row.payload))
+
+    def get_json(self, digest):
+        body = self.get(digest)
+        return None if body is None else json.loads(body)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['compression_ratio'] = (round(stats['raw_bytes'] / stats['stored_bytes'], 1)
+                                      if stats['stored_bytes'] else 0.0)
+        return stats
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"\n🗜️  Raw payloads: {s['stored']} stored, {s['deduped']} deduplicated, "
+              f"{s['raw_bytes'] / 1024:.1f} KB -> {s['stored_bytes'] / 1024:.1f} KB "
+              f"({s['compression_ratio']}x)")
+
+
+def compact_legacy_rows(engine):
+    """Move the full response copies in old NREL monthly rows into the store
+
+    Rows written before the store kept json.dumps({'month', 'data': outputs})
+    per row; afterwards they hold {'month'} plus raw_payload_hash. Run VACUUM
+    FULL (or pg_repack) on api_ingest.nrel_pvdaq afterwards to return the space.
+    """
+    store = PayloadStore(engine)
+    with engine.connect() as conn:
+        payloads = conn.execute(text("""
+            SELECT DISTINCT raw_json->'data' AS data
+            FROM api_ingest.nrel_pvdaq
+            WHERE raw_json ? 'data' AND raw_payload_hash IS NULL
+        """)).fetchall()
+
+        updated = 0
+        for row in payloads:
+            body = json.dumps(row.data, sort_keys=True)
+            digest = store.put(body, 'nrel_solar_resource')
+            result = conn.execute(text("""
+                UPDATE api_ingest.nrel_pvdaq
+                SET raw_payload_hash = :hash,
+                    raw_json = jsonb_build_object('month', raw_json->'month')
+                WHERE raw_json ? 'data' AND raw_payload_hash IS NULL
+                  AND raw_json->'data' = CAST(:data AS JSONB)
+            """), {'hash': digest, 'data': body})
+            updated += result.rowcount
+        conn.commit()
+
+    print(f"✅ Compacted {updated} rows into {len(payloads)} stored payloads")
+    return updated
+
+
+if __name__ == "__main__":
+    from src.etl.migrations import ensure_schema, get_db_engine
+
+    engine = get_db_engine()
+    ensure_schema(engine)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'compact':
+        compact_legacy_rows(engine)
+    else:
+        print("Usage: python -m src.etl.payload_store compact")
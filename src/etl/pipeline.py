@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Staged ingestion pipeline: bounded queues between concurrent stages
+
+A pipeline pulls items from a source generator and passes them through
+stages (the ingest engine runs fetch -> transform -> validate -> write),
+each run by its own worker threads. Stages are connected by bounded queues,
+so a slow stage (usually the DB writer) blocks the ones before it instead of
+letting fetched data pile up in memory, while network and DB I/O still
+overlap. Response decoding stays inside the loaders' fetch calls, on the
+fetch workers, where it is timed as each provider's decode stage (see metrics).
+
+A stage function returns the item for the next stage, None to drop it, or a
+generator to emit several.
+"""
+
+import time
+import queue
+import types
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_BATCH_ROWS = 200_000
+
+_DONE = object()
+
+
+class BatchWriteError(Exception):
+    """An upsert failed; carries the whole batch so it is not lost with the buffer"""
+
+    def __init__(self, schema, table, df, error):
+        super().__init__(f"{schema}.{table} ({len(df)} rows): {error}")
+        self.schema = schema
+        self.table = table
+        self.df = df
+        self.error = error
+
+
+class Stage:
+    """One pipeline step run by `workers` threads
+
+    flush() is called once after the last input item, from the last worker
+    to finish; whatever it returns (or yields) goes downstream. A flush that
+    can fail part-way reports each failed item through fail(item, exc), which
+    the running Pipeline points at its error handling.
+    """
+
+    def __init__(self, name, fn, workers=1, flush=None):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.flush = flush
+        self.fail = None
+
+
+class BatchWriteStage(Stage):
+    """Write stage that groups (schema, table, df) items into large upserts
+
+    Rows are buffered per table until batch_rows is reached, so each COPY is
+    big enough to be efficient; the buffer bound keeps memory flat however
+    long the run is. Emits (table_ref, rows_written) per upsert; `rows` counts
+    rows handed to the writer, `written` the rows the upserts inserted or changed.
+    A failed upsert raises BatchWriteError with every buffered row of the batch;
+    in the final flush each table is written on its own, so one failing table
+    is reported with its (schema, table, df) and the others are still written.
+    """
+
+    def __init__(self, writer, batch_rows=DEFAULT_BATCH_ROWS, workers=1, name='write'):
+        super().__init__(name, self._add, workers=workers, flush=self._flush_all)
+        self.writer = writer
+        self.batch_rows = batch_rows
+        self._lock = threading.Lock()
+        self._buffers = defaultdict(list)
+        self._rows = defaultdict(int)
+        self.rows = defaultdict(int)
+        self.written = defaultdict(int)
+
+    def _take(self, key):
+        frames = self._buffers.pop(key, [])
+        self._rows.pop(key, None)
+        return frames
+
+    def _write(self, key, frames):
+        schema, table = key
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        try:
+            rows = self.writer.upsert(df, table, schema=schema)
+        except Exception as e:
+            raise BatchWriteError(schema, table, df, e) from e
+        with self._lock:
+            self.rows[f"{schema}.{table}"] += len(df)
+            self.written[f"{schema}.{table}"] += rows
+        return f"{schema}.{table}", rows
+
+    def _add(self, item):
+        schema, table, df = item
+        key = (schema, table)
+        with self._lock:
+            self._buffers[key].append(df)
+            self._rows[key] += len(df)
+            frames = self._take(key) if self._rows[key] >= self.batch_rows else None
+        return self._write(key, frames) if frames else None
+
+    def _flush_all(self):
+        with self._lock:
+            pending = [(key, self._take(key)) for key in list(self._buffers)]
+        for key, frames in pending:
+            if not frames:
+                continue
+            try:
+                result = self._write(key, frames)
+            except BatchWriteError as e:
+                if self.fail is None:
+                    raise
+                self.fail((e.schema, e.table, e.df), e)
+                continue
+            yield result
+
+
+class Pipeline:
+    """Run a source through stages connected by bounded queues
+
+    on_error(stage_name, item, exc) is called for every item a stage fails on;
+    the item is dropped and the pipeline keeps going. Items whose on_error
+    call itself raised are counted as 'lost'.
+    """
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE, on_error=None, name='pipeline'):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.name = name
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def _count(self, stage, name, value=1):
+        with self._lock:
+            self.counters[stage][name] += value
+
+    def _put(self, q, item, stage):
+        """Put downstream, timing how long a full queue held this stage back"""
+        start = time.perf_counter()
+        q.put(item)
+        self._count(stage, 'blocked_seconds', time.perf_counter() - start)
+        self._count(stage, 'out')
+        depth = q.qsize()
+        with self._lock:
+            self.counters[stage]['max_queue'] = max(self.counters[stage]['max_queue'], depth)
+
+    def _emit(self, result, out_q, stage):
+        if result is None:
+            return
+        if isinstance(result, types.GeneratorType):
+            for item in result:
+                if item is not None:
+                    self._put(out_q, item, stage)
+        else:
+            self._put(out_q, result, stage)
+
+    def _fail(self, stage, item, exc):
+        self._count(stage, 'errors')
+        if self.on_error is None:
+            print(f"❌ {self.name}/{stage} failed: {exc}")
+            return
+        # A handler that raises must not kill the worker, or run() never drains
+        try:
+            self.on_error(stage, item, exc)
+        except Exception as e:
+            self._count(stage, 'lost')
+            print(f"❌ {self.name}/{stage} error handler failed: {e} (handling: {exc})")
+
+    def _worker(self, stage, in_q, out_q, remaining, next_workers):
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+            self._count(stage.name, 'in')
+            start = time.perf_counter()
+            try:
+                self._emit(stage.fn(item), out_q, stage.name)
+            except Exception as e:
+                self._fail(stage.name, item, e)
+            self._count(stage.name, 'busy_seconds', time.perf_counter() - start)
+
+        with self._lock:
+            remaining[stage.name] -= 1
+            last = remaining[stage.name] == 0
+        if not last:
+            return
+
+        # Last worker out flushes the stage and shuts down the next one
+        if stage.flush is not None:
+            try:
+                self._emit(stage.flush(), out_q, stage.name)
+            except Exception as e:
+                self._fail(stage.name, None, e)
+        for _ in range(next_workers):
+            out_q.put(_DONE)
+
+    def _feed(self, source, out_q, workers):
+        try:
+            for item in source:
+                self._put(out_q, item, 'source')
+        except Exception as e:
+            self._fail('source', None, e)
+        finally:
+            for _ in range(workers):
+                out_q.put(_DONE)
+
+    def run(self, source):
+        """Drain source through every stage; returns the final stage's outputs"""
+        self.counters = {name: defaultdict(float) for name in ['source'] + [s.name for s in self.stages]}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = queue.Queue()  # last stage's outputs, unbounded (small summaries)
+        remaining = {stage.name: stage.workers for stage in self.stages}
+        for stage in self.stages:
+            stage.fail = lambda item, exc, name=stage.name: self._fail(name, item, exc)
+
+        threads = [threading.Thread(target=self._feed, name=f"{self.name}-source",
+                                    args=(source, queues[0], self.stages[0].workers), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            last = i == len(self.stages) - 1
+            out_q = results if last else queues[i + 1]
+            next_workers = 0 if last else self.stages[i + 1].workers
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._worker, name=f"{self.name}-{stage.name}-{n}",
+                    args=(stage, queues[i], out_q, remaining, next_workers),
+                    daemon=True))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+
+        outputs = []
+        while not results.empty():
+            outputs.append(results.get())
+        return outputs
+
+    def stats(self):
+        with self._lock:
+            stages = {name: dict(counters) for name, counters in self.counters.items()}
+        for counters in stages.values():
+            for name in ('in', 'out', 'errors', 'lost', 'max_queue'):
+                counters[name] = int(counters.get(name, 0))
+            counters['busy_seconds'] = round(counters.get('busy_seconds', 0.0), 2)
+            counters['blocked_seconds'] = round(counters.get('blocked_seconds', 0.0), 2)
+        return stages
+
+    def print_stats(self):
+        print(f"\n🔀 {self.name} stages (busy includes blocked = waiting on a full queue):")
+        for name, s in self.stats().items():
+            lost = f" ({s['lost']} lost)" if s['lost'] else ""
+            print(f"  {name}: {s['in']} in, {s['out']} out, {s['errors']} errors{lost}, "
+                  f"busy {s['busy_seconds']}s, blocked {s['blocked_seconds']}s, "
+                  f"max queue {s['max_queue']}")
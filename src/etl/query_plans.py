@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""EXPLAIN-based regression check for the time-series index plan
+
+Each check is a dashboard, loader or mart query together with the indexes
+(migration 16 and later) that are expected to serve it. The check runs
+EXPLAIN (FORMAT JSON), collects every index the plan touches, and passes if
+one of the expected indexes is among them. Indexes on the partitioned parents
+show up in plans under the partitions' own index names, so those are mapped
+back through pg_partition_tree. Run it against a loaded database (plans on
+near-empty tables are all sequential scans); it exits 1 if any query stopped
+using its index, so it can gate schema or query changes.
+
+    python -m src.etl.query_plans [--analyze] [--verbose]
+"""
+
+import sys
+import json
+
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+from src.etl.migrations import ensure_schema, get_db_engine
+
+load_dotenv()
+
+PLAN_CHECKS = [
+    {
+        'name': 'pv_dashboard',
+        'source': 'visualize_data_production.py',
+        'sql': """
+            SELECT timestamp, ac_power, dc_power, poa_irradiance
+            FROM api_ingest.nrel_pvdaq
+            WHERE site_id = 'PVWATTS_SIM'
+            AND timestamp IS NOT NULL
+            ORDER BY timestamp
+        """,
+        'indexes': ['uq_nrel_pvdaq_site_timestamp'],
+    },
+    {
+        'name': 'capacity_factor',
+        'source': 'calculate_metrics.py',
+        'sql': """
+            SELECT ac_power, timestamp
+            FROM api_ingest.nrel_pvdaq
+            WHERE site_id = 'PVWATTS_SIM'
+            AND ac_power IS NOT NULL
+        """,
+        'indexes': ['uq_nrel_pvdaq_site_timestamp'],
+    },
+    {
+        'name': 'forecast_chart',
+        'source': 'visualize_data_production.py',
+        'sql': """
+            SELECT valid_time, temperature, cloud_cover, humidity
+            FROM api_ingest.tomorrow_weather
+            WHERE valid_time >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '24 hours'
+            ORDER BY valid_time
+            LIMIT 48
+        """,
+        'indexes': ['idx_tomorrow_weather_valid_time_chart'],
+    },
+    {
+        'name': 'forecast_stored_values',
+        'source': 'src/etl/forecast_watermark.py',
+        'sql': """
+            SELECT DISTINCT ON (valid_time) valid_time, temperature, cloud_cover
+            FROM api_ingest.tomorrow_weather
+            WHERE location_lat = 33.4484 AND location_lon = -112.074
+              AND valid_time BETWEEN (NOW() AT TIME ZONE 'UTC') AND (NOW() AT TIME ZONE 'UTC') + INTERVAL '5 days'
+            ORDER BY valid_time, forecast_time DESC
+        """,
+        'indexes': ['idx_tomorrow_weather_location_valid_forecast'],
+    },
+    {
+        'name': 'nrel_loaded_since',
+        'source': 'incremental refreshes',
+        'sql': """
+            SELECT site_id, timestamp
+            FROM api_ingest.nrel_pvdaq
+            WHERE ingested_at > NOW() - INTERVAL '5 minutes'
+        """,
+        'indexes': ['brin_nrel_pvdaq_ingested_at'],
+    },
+    {
+        'name': 'tomorrow_loaded_since',
+        'source': 'incremental refreshes',
+        'sql': """
+            SELECT location_lat, location_lon, valid_time
+            FROM api_ingest.tomorrow_weather
+            WHERE ingested_at > NOW() - INTERVAL '5 minutes'
+        """,
+        'indexes': ['brin_tomorrow_weather_ingested_at'],
+    },
+]
+
+
+def plan_indexes(plan):
+    """Every 'Index Name' in an EXPLAIN (FORMAT JSON) plan tree"""
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names |= plan_indexes(child)
+    return names
+
+
+def plan_scans(plan):
+    """(node type, relation) of every scan node, for reporting a failed check"""
+    scans = []
+    if 'Relation Name' in plan:
+        scans.append((plan['Node Type'], plan['Relation Name']))
+    for child in plan.get('Plans', []):
+        scans += plan_scans(child)
+    return scans
+
+
+class QueryPlanChecker:
+    def __init__(self, engine=None, checks=None):
+        self.engine = engine or get_db_engine()
+        self.checks = PLAN_CHECKS if checks is None else checks
+        ensure_schema(self.engine)
+
+    def _index_family(self, conn, index):
+        """An api_ingest index and, if it is on a partitioned table, its partitions' indexes
+
+        Empty if the index does not exist.
+        """
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': f"api_ingest.{index}"}).scalar() is None:
+            return set()
+        return set(conn.execute(text("""
+            SELECT c.relname
+            FROM pg_partition_tree(CAST(:name AS regclass)) tree
+            JOIN pg_class c ON c.oid = tree.relid
+        """), {'name': f"api_ingest.{index}"}).scalars().all())
+
+    def explain(self, conn, sql):
+        raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        return plan[0]['Plan']
+
+    def check(self, conn, check):
+        plan = self.explain(conn, check['sql'])
+        used = plan_indexes(plan)
+        missing = []
+        matched = []
+        for index in check['indexes']:
+            family = self._index_family(conn, index)
+            if not family:
+                missing.append(index)
+            elif used & family:
+                matched.append(index)
+        return {'name': check['name'], 'source': check['source'], 'ok': bool(matched),
+                'matched': matched, 'missing': missing, 'cost': plan['Total Cost'],
+                'scans': plan_scans(plan)}
+
+    def run(self, analyze=False):
+        """Check every query; analyze=True refreshes planner statistics first"""
+        with self.engine.connect() as conn:
+            if analyze:
+                conn.execute(text("ANALYZE api_ingest.nrel_pvdaq"))
+                conn.execute(text("ANALYZE api_ingest.tomorrow_weather"))
+                conn.commit()
+            return [self.check(conn, check) for check in self.checks]
+
+    @staticmethod
+    def print_results(results, verbose=False):
+        print("🔎 Query plan checks:")
+        for r in results:
+            if r['ok']:
+                print(f"  ✅ {r['name']} ({r['source']}): {', '.join(r['matched'])}, cost {r['cost']:,.0f}")
+            else:
+                print(f"  ❌ {r['name']} ({r['source']}): expected index not used, cost {r['cost']:,.0f}")
+                for index in r['missing']:
+                    print(f"      missing index: {index}")
+            if verbose or not r['ok']:
+                scans = sorted(set(r['scans']))
+                for node, relation in scans[:5]:
+                    print(f"      {node} on {relation}")
+                if len(scans) > 5:
+                    print(f"      ... {len(scans) - 5} more scans")
+        failed = sum(not r['ok'] for r in results)
+        if failed:
+            print(f"❌ {failed} of {len(results)} queries no longer use their indexes")
+        else:
+            print(f"✅ All {len(results)} queries use their indexes")
+
+
+if __name__ == "__main__":
+    checker = QueryPlanChecker()
+    results = checker.run(analyze='--analyze' in sys.argv)
+    checker.print_results(results, verbose='--verbose' in sys.argv)
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Per-provider token-bucket rate limiter and request scheduler
+
+Every outgoing API request takes a token from the bucket for its provider and
+API key. Waiting requests are served in priority order (real-time before
+backfill), and a 429 with Retry-After pauses the whole bucket.
+"""
+
+import os
+import time
+import heapq
+import hashlib
+import itertools
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PRIORITY_REALTIME = 0
+PRIORITY_BACKFILL = 10
+
+# Provider -> (sustained requests/sec, burst size), from each plan's published limits
+PROVIDER_LIMITS = {
+    'NREL': (1000 / 3600, 10),        # 1,000 requests/hour
+    'Tomorrow.io': (25 / 3600, 3),    # 25 requests/hour, 3/sec
+    'OpenWeather': (60 / 60, 10),     # 60 calls/minute
+    'NOAA': (5.0, 5),                 # no published limit; stay polite
+}
+
+
+def _env_limits():
+    """Overrides like RATE_LIMIT_TOMORROW_IO=0.5,5 for paid plans"""
+    limits = {}
+    for provider in PROVIDER_LIMITS:
+        name = 'RATE_LIMIT_' + ''.join(c if c.isalnum() else '_' for c in provider).upper()
+        value = os.getenv(name)
+        if value:
+            rate, capacity = value.split(',')
+            limits[provider] = (float(rate), int(capacity))
+    return limits
+
+
+HOST_PROVIDERS = {
+    'developer.nrel.gov': 'NREL',
+    'api.tomorrow.io': 'Tomorrow.io',
+    'api.openweathermap.org': 'OpenWeather',
+    'api.weather.gov': 'NOAA',
+}
+
+KEY_PARAMS = ('api_key', 'apikey', 'appid')
+DEFAULT_RETRY_AFTER = 60  # seconds to pause when a 429 has no Retry-After
+
+
+def provider_for_url(url):
+    return HOST_PROVIDERS.get(urlsplit(url).hostname)
+
+
+def api_key_from_params(params):
+    for name in KEY_PARAMS:
+        if params and params.get(name):
+            return params[name]
+    return None
+
+
+def parse_retry_after(value, default=DEFAULT_RETRY_AFTER):
+    """Retry-After as seconds (delta-seconds or HTTP-date form)"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Classic token bucket with an optional hard pause (Retry-After)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now):
+        """Take a token and return 0, or return seconds until one is available"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds, now):
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = now
+
+
+class RequestScheduler:
+    """Priority queue of requests in front of one token bucket per (provider, key)"""
+
+    def __init__(self, limits=None):
+        self.limits = dict(PROVIDER_LIMITS)
+        self.limits.update(_env_limits())
+        self.limits.update(limits or {})
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._buckets = {}
+        self._queues = {}
+        self._stats = {}
+
+    def _bucket_id(self, provider, api_key):
+        # Never keep raw keys around in stats output
+        if not api_key:
+            return (provider, None)
+        return (provider, 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8])
+
+    def _bucket(self, bucket_id):
+        if bucket_id not in self._buckets:
+            rate, capacity = self.limits[bucket_id[0]]
+            self._buckets[bucket_id] = TokenBucket(rate, capacity)
+            self._queues[bucket_id] = []
+            self._stats[bucket_id] = {
+                'requests': 0, 'throttled': 0,
+                'wait_total_s': 0.0, 'wait_max_s': 0.0
+            }
+        return self._buckets[bucket_id]
+
+    def acquire(self, provider, api_key=None, priority=PRIORITY_REALTIME):
+        """Block until this request may be sent; returns seconds waited"""
+        if provider not in self.limits:
+            return 0.0
+
+        bucket_id = self._bucket_id(provider, api_key)
+        start = time.monotonic()
+        with self._cond:
+            bucket = self._bucket(bucket_id)
+            queue = self._queues[bucket_id]
+            ticket = (priority, next(self._seq))
+            heapq.heappush(queue, ticket)
+
+            while True:
+                if queue[0] == ticket:
+                    wait = bucket.try_take(time.monotonic())
+                    if wait == 0:
+                        heapq.heappop(queue)
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+            waited = time.monotonic() - start
+            stats = self._stats[bucket_id]
+            stats['requests'] += 1
+            stats['wait_total_s'] += waited
+            stats['wait_max_s'] = max(stats['wait_max_s'], waited)
+        return waited
+
+    def report(self, provider, api_key, response):
+        """Feed a response back; a 429 pauses the bucket for Retry-After"""
+        if provider not in self.limits or response.status_code != 429:
+            return
+        bucket_id = self._bucket_id(provider, api_key)
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        with self._cond:
+            self._bucket(bucket_id).pause(delay, time.monotonic())
+            self._stats[bucket_id]['throttled'] += 1
+            self._cond.notify_all()
+
+    def stats(self):
+        """Queue depth and wait time per (provider, key)"""
+        with self._cond:
+            report = {}
+            for bucket_id, stats in self._stats.items():
+                provider, key = bucket_id
+                name = f"{provider} ({key})" if key else provider
+                report[name] = {
+                    'queue_depth': len(self._queues[bucket_id]),
+                    'requests': stats['requests'],
+                    'throttled': stats['throttled'],
+                    'avg_wait_s': round(stats['wait_total_s'] / stats['requests'], 3) if stats['requests'] else 0.0,
+                    'max_wait_s': round(stats['wait_max_s'], 3)
+                }
+            return report
+
+    def print_stats(self):
+        print("\n⏱️  Rate limiter:")
+        for name, s in sorted(self.stats().items()):
+            print(f"  {name}: {s['requests']} requests, queue={s['queue_depth']}, "
+                  f"wait avg {s['avg_wait_s']}s max {s['max_wait_s']}s, {s['throttled']} throttled")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide shared scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
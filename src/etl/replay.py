@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Record and replay API responses for offline ingestion benchmarks
+
+A RecordingAdapter captures every response (status, headers, body, latency)
+that passes through an HttpClient into a zip fixture archive; a ReplayAdapter
+serves them back from that archive, either at full speed or at the recorded
+latency. Both mount on the client's requests.Session, so loaders run unchanged.
+
+    API_RECORD=fixtures/api.zip python load_more_data.py   # capture a live run
+    API_REPLAY=fixtures/api.zip python load_more_data.py   # re-run it offline
+    python -m src.etl.replay bench fixtures/api.zip [--realtime] [--repeat N]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import atexit
+import hashlib
+import zipfile
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.response import HTTPResponse
+from dotenv import load_dotenv
+
+from src.etl import response_cache
+
+load_dotenv()
+
+MANIFEST_NAME = 'manifest.json'
+
+# Hop-by-hop/encoding headers that no longer describe the stored (decoded) body
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+def fixture_url(url):
+    """URL with API keys stripped and the query sorted (fixture lookup key)"""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in response_cache.SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+class FixtureArchive:
+    """Recorded responses keyed by (method, fixture_url); bodies stored once by sha256"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._bodies = {}
+        self._cursor = {}
+
+    @classmethod
+    def load(cls, path):
+        archive = cls(path)
+        with zipfile.ZipFile(path) as zf:
+            manifest = json.loads(zf.read(MANIFEST_NAME))
+            for entry in manifest:
+                digest = entry['body']
+                if digest not in archive._bodies:
+                    archive._bodies[digest] = zf.read(f"bodies/{digest}")
+                archive._entries.setdefault((entry['method'], entry['url']), []).append(entry)
+        return archive
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, method, url, status_code, headers, body, elapsed_ms):
+        digest = hashlib.sha256(body).hexdigest()
+        entry = {
+            'method': method,
+            'url': fixture_url(url),
+            'status_code': status_code,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            'elapsed_ms': round(elapsed_ms, 2),
+            'body': digest,
+            'recorded_at': time.time()
+        }
+        with self._lock:
+            self._bodies[digest] = body
+            self._entries.setdefault((method, entry['url']), []).append(entry)
+        return entry
+
+    def next(self, method, url):
+        """(entry, body) for a request, cycling through repeated recordings; None if unrecorded"""
+        key = (method, fixture_url(url))
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+            entry = entries[i % len(entries)]
+            return entry, self._bodies[entry['body']]
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            manifest = [e for entries in self._entries.values() for e in entries]
+            tmp = f"{path}.tmp"
+            with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=1))
+                for digest, body in self._bodies.items():
+                    zf.writestr(f"bodies/{digest}", body)
+        os.replace(tmp, path)
+        return len(manifest)
+
+
+def _build_response(adapter, request, status_code, headers, body):
+    """requests.Response whose raw stream (and .content) yield body"""
+    headers = {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}
+    headers['Content-Length'] = str(len(body))
+    raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status_code,
+                       preload_content=False, decode_content=False)
+    return adapter.build_response(request, raw)
+
+
+class RecordingAdapter(BaseAdapter):
+    """Send through the wrapped adapter and store each response in the archive"""
+
+    def __init__(self, inner, archive):
+        super().__init__()
+        self.inner = inner
+        self.archive = archive
+
+    @property
+    def poolmanager(self):
+        # HttpClient.stats() reads connection reuse from here
+        return self.inner.poolmanager
+
+    def send(self, request, **kwargs):
+        # Adapter send returns once headers are parsed, so this is time to first byte
+        start = time.perf_counter()
+        resp = self.inner.send(request, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        body = resp.content  # drains streamed bodies; they're re-served from memory below
+        self.archive.add(request.method, request.url, resp.status_code, resp.headers, body, elapsed_ms)
+        replayed = _build_response(self.inner, request, resp.status_code, resp.headers, body)
+        resp.close()
+        return replayed
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Serve recorded responses; realtime=True sleeps each recording's latency first"""
+
+    def __init__(self, archive, realtime=False):
+        super().__init__()
+        self.archive = archive
+        self.realtime = realtime
+
+    def send(self, request, **kwargs):
+        found = self.archive.next(request.method, request.url)
+        if found is None:
+            raise requests.ConnectionError(f"No recorded response for {request.method} "
+                                           f"{fixture_url(request.url)}", request=request)
+        entry, body = found
+        if self.realtime:
+            time.sleep(entry['elapsed_ms'] / 1000)
+        return _build_response(self, request, entry['status_code'], entry['headers'], body)
+
+
+def disable_response_cache():
+    """Route every request to the transport (a cache hit would skip record/replay)"""
+    response_cache.get_cache().ttls = {}
+
+
+def record(client, archive):
+    """Mount a recorder on an HttpClient; live requests still go out rate-limited"""
+    client.mount(RecordingAdapter(client.adapter, archive))
+    disable_response_cache()
+    return archive
+
+
+def replay(client, archive, realtime=False):
+    """Mount a replayer on an HttpClient; no network, no rate limiting"""
+    client.mount(ReplayAdapter(archive, realtime=realtime))
+    client.scheduler = None
+    disable_response_cache()
+    return archive
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def _shared_archive(path, mode):
+    """One archive per path per process, so every client records into the same file"""
+    with _archives_lock:
+        if path not in _archives:
+            if mode == 'replay':
+                _archives[path] = FixtureArchive.load(path)
+            else:
+                archive = _archives[path] = FixtureArchive(path)
+                atexit.register(archive.save)
+        return _archives[path]
+
+
+def install_from_env(client):
+    """Honor API_REPLAY / API_RECORD (and API_REPLAY_REALTIME=1) for a new HttpClient"""
+    replay_path = os.getenv('API_REPLAY')
+    record_path = os.getenv('API_RECORD')
+    if replay_path:
+        replay(client, _shared_archive(replay_path, 'replay'),
+               realtime=os.getenv('API_REPLAY_REALTIME') == '1')
+    elif record_path:
+        record(client, _shared_archive(record_path, 'record'))
+
+
+def _benchmark_loaders(lat=33.4484, lon=-112.0740):
+    """(name, fn) pairs; each fn fetches, parses and writes, returning rows handled"""
+    from src.etl.latency_collector import LatencyCollector
+    from src.etl.nrel_loader_v2 import NRELLoaderV2
+    from src.etl.tomorrow_loader_v3 import TomorrowLoaderV3
+
+    nrel = NRELLoaderV2()
+    tomorrow = TomorrowLoaderV3()
+    latency = LatencyCollector()
+
+    def write(loader, df, table):
+        loader.writer.upsert(df, table)
+        return len(df)
+
+    return latency, [
+        ('nrel_monthly', lambda: write(nrel, nrel.fetch_solar_resource_monthly(lat, lon), 'nrel_pvdaq')),
+        ('pvwatts_hourly', lambda: write(nrel, nrel.fetch_pvwatts_hourly(lat, lon), 'nrel_pvdaq')),
+        ('tomorrow_forecast', lambda: write(tomorrow, tomorrow.fetch_forecast(lat, lon), 'tomorrow_weather')),
+        ('latency_collector', lambda: len(latency.collect_all_latencies())),
+    ]
+
+
+def run_benchmark(path, mode='replay', realtime=False, repeat=1):
+    """Record one live pass into `path`, or replay it `repeat` times and report throughput"""
+    from src.etl import http_client
+
+    if mode == 'record':
+        archive = FixtureArchive(path)
+        record(http_client.get_client(), archive)
+    else:
+        archive = FixtureArchive.load(path)
+        replay(http_client.get_client(), archive, realtime=realtime)
+        print(f"▶️  Replaying {len(archive)} recorded responses from {path} "
+              f"({'recorded latency' if realtime else 'full speed'})")
+
+    latency, loaders = _benchmark_loaders()
+    if mode == 'record':
+        record(latency.http, archive)
+    else:
+        replay(latency.http, archive, realtime=realtime)
+
+    results = {}
+    for _ in range(repeat if mode == 'replay' else 1):
+        for name, fn in loaders:
+            start = time.perf_counter()
+            rows = fn()
+            totals = results.setdefault(name, {'rows': 0, 'seconds': 0.0})
+            totals['rows'] += rows
+            totals['seconds'] += time.perf_counter() - start
+
+    print(f"\n⏱️  Ingest benchmark ({mode}, {repeat if mode == 'replay' else 1} pass(es)):")
+    for name, s in results.items():
+        rate = s['rows'] / s['seconds'] if s['seconds'] else 0
+        print(f"  {name}: {s['rows']:,} rows in {s['seconds']:.3f}s ({rate:,.0f} rows/sec)")
+
+    if mode == 'record':
+        print(f"\n💾 Recorded {archive.save()} responses to {path}")
+    http_client.get_client().print_stats()
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ('record', 'bench'):
+        print("Usage: python -m src.etl.replay record|bench ARCHIVE [--realtime] [--repeat N]")
+        sys.exit(1)
+
+    repeat = int(sys.argv[sys.argv.index('--repeat') + 1]) if '--repeat' in sys.argv else 1
+    run_benchmark(sys.argv[2], mode='record' if sys.argv[1] == 'record' else 'replay',
+                  realtime='--realtime' in sys.argv, repeat=repeat)
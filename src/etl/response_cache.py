@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Persistent on-disk cache for API responses
+
+Responses are stored content-addressed by endpoint + normalized params (API
+keys excluded), expire per endpoint, and are evicted least-recently-used once
+the cache grows past its size limit.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from dotenv import load_dotenv
+
+from src.etl import http_client
+
+load_dotenv()
+
+CACHE_DIR = os.getenv('API_CACHE_DIR', '.cache/api_responses')
+DEFAULT_MAX_BYTES = int(os.getenv('API_CACHE_MAX_MB', 512)) * 1024 * 1024
+
+# Params that identify the caller, not the data
+SECRET_PARAMS = {'api_key', 'apikey', 'appid'}
+
+# Endpoint prefix -> TTL in seconds (None = never expires). Unlisted endpoints bypass the cache.
+ENDPOINT_TTLS = {
+    'https://developer.nrel.gov/api/solar/solar_resource/': None,   # static per lat/lon
+    'https://developer.nrel.gov/api/pvwatts/': 30 * 24 * 3600,      # deterministic simulation
+    'https://api.tomorrow.io/v4/weather/forecast': 5 * 60,
+    'https://api.weather.gov/points/': None,                        # site -> NWS grid cell
+}
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response served from disk"""
+
+    from_cache = True
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def normalize_params(params):
+    """Sorted, stringified params with API keys dropped"""
+    normalized = []
+    for name, value in sorted((params or {}).items()):
+        if name in SECRET_PARAMS:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ','.join(str(v) for v in value)
+        normalized.append((name, str(value)))
+    return normalized
+
+
+def cache_key(url, params=None):
+    payload = json.dumps([url, normalize_params(params)], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Disk cache with per-endpoint TTLs and size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = dict(ENDPOINT_TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self._size = None  # lazily measured on first write
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'bypass': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def ttl_for(self, url):
+        """(cacheable, ttl) for the longest matching endpoint prefix"""
+        matches = [prefix for prefix in self.ttls if url.startswith(prefix)]
+        if not matches:
+            return False, None
+        return True, self.ttls[max(matches, key=len)]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _read(self, path):
+        """(meta, body) or None; one JSON metadata line followed by the raw body"""
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, meta, body):
+        """Store an entry; returns how many bytes the cache grew (less when overwriting one)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Thread idents repeat across processes sharing the cache dir
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(body)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        os.replace(tmp, path)
+        return os.path.getsize(path) - previous
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.tmp'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _evict(self, added_bytes):
+        """Account for a write of added_bytes, then drop least-recently-used entries until it fits"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += added_bytes
+            if self._size <= self.max_bytes:
+                return
+
+            for path, size, _ in sorted(self._entries(), key=lambda e: e[2]):
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                self.counters['evictions'] += 1
+
+    def get(self, url, params=None, **kwargs):
+        """GET through the cache; falls through to the shared HTTP client on a miss"""
+        cacheable, ttl = self.ttl_for(url)
+        if not cacheable:
+            self._count('bypass')
+            return http_client.get(url, params=params, **kwargs)
+
+        key = cache_key(url, params)
+        path = self._path(key)
+        entry = self._read(path)
+        if entry is not None:
+            meta, body = entry
+            if ttl is None or time.time() - meta['stored_at'] < ttl:
+                try:
+                    os.utime(path)  # mtime doubles as the LRU clock
+                except OSError:
+                    pass
+                self._count('hits')
+                return CachedResponse(url, meta['status_code'], meta['headers'], body)
+            self._count('expired')
+
+        self._count('misses')
+        resp = http_client.get(url, params=params, **kwargs)
+        if resp.status_code == 200:
+            meta = {
+                'url': url,
+                'params': normalize_params(params),
+                'stored_at': time.time(),
+                'status_code': resp.status_code,
+                'headers': {'Content-Type': resp.headers.get('Content-Type', '')}
+            }
+            self._evict(self._write(path, meta, resp.content))
+        return resp
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"\n💾 Response cache: {s['hits']} hits, {s['misses']} misses "
+              f"({s['expired']} expired), hit rate {s['hit_rate'] * 100:.1f}%, "
+              f"{s['evictions']} evictions")
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                os.remove(path)
+            self._size = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide shared cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def get(url, params=None, **kwargs):
+    return get_cache().get(url, params=params, **kwargs)
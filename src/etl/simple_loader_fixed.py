@@ -4,9 +4,11 @@
 import os
 import pandas as pd
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from dotenv import load_dotenv
-import requests
+from src.etl import http_client
+from src.etl.bulk_writer import BulkWriter
+from src.etl.migrations import ensure_schema
 
 load_dotenv()
 
@@ -28,7 +30,7 @@ def test_load_openweather():
     }
     
     try:
-        resp = requests.get(url, params=params)
+        resp = http_client.get(url, params=params)
         if resp.status_code == 200:
             data = resp.json()
             
@@ -43,24 +45,10 @@ def test_load_openweather():
             
             # Save to test table
             engine = get_db_engine()
-            
-            # First create a test table if it doesn't exist
-            with engine.connect() as conn:
-                conn.execute(text("""
-                    CREATE TABLE IF NOT EXISTS api_ingest.weather_test (
-                        id SERIAL PRIMARY KEY,
-                        timestamp TIMESTAMP,
-                        temperature FLOAT,
-                        humidity FLOAT,
-                        wind_speed FLOAT,
-                        description TEXT
-                    );
-                """))
-                conn.commit()
+            ensure_schema(engine)
             
             # Insert the data
-            df = pd.DataFrame([record])
-            df.to_sql('weather_test', engine, schema='api_ingest', if_exists='append', index=False)
+            BulkWriter(engine).write_records([record], 'weather_test')
             print(f"✅ Saved weather data: {record['temperature']}°C, {record['description']}")
             
             return True
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Snap sites to provider grid cells so nearby sites share one API request
+
+Every provider's data has a coarser effective resolution than our site
+coordinates (NSRDB is a ~4 km grid), so sites in the same cell get the same
+answer. SpatialIndex groups sites by a provider-specific cell key; ingestion
+fetches once at the cell center and fans the result out to every member.
+"""
+
+import os
+import math
+from collections import OrderedDict
+
+# Provider -> cell size in degrees (lat and lon). Providers not listed are
+# fetched per site.
+CELL_DEGREES = {
+    'NREL': 0.04,          # NSRDB ~4 km grid (solar_resource, PVWatts, NSRDB downloads)
+    'Tomorrow.io': 0.01,   # ~1 km forecast grid
+    'OpenWeather': 0.01,
+}
+
+
+def _env_cell_degrees():
+    """Overrides like CELL_DEGREES_TOMORROW_IO=0.05 (0 turns snapping off)"""
+    sizes = {}
+    for provider in CELL_DEGREES:
+        name = 'CELL_DEGREES_' + ''.join(c if c.isalnum() else '_' for c in provider).upper()
+        value = os.getenv(name)
+        if value:
+            sizes[provider] = float(value)
+    return sizes
+
+
+def cell_degrees(provider):
+    """Cell size for a provider, or None when its requests are not snapped"""
+    size = _env_cell_degrees().get(provider, CELL_DEGREES.get(provider))
+    return size or None
+
+
+def cell_key(provider, lat, lon, degrees=None):
+    """(provider, row, col) of the cell containing lat/lon"""
+    degrees = degrees or cell_degrees(provider)
+    return provider, math.floor(lat / degrees), math.floor(lon / degrees)
+
+
+def cell_center(key, degrees=None):
+    """(lat, lon) every request for the cell is made at"""
+    provider, row, col = key
+    degrees = degrees or cell_degrees(provider)
+    return round((row + 0.5) * degrees, 4), round((col + 0.5) * degrees, 4)
+
+
+class SpatialIndex:
+    """Sites grouped by provider cell, in first-seen order"""
+
+    def __init__(self, provider, sites=(), degrees=None):
+        self.provider = provider
+        self.degrees = degrees or cell_degrees(provider)
+        self.cells = OrderedDict()
+        for site in sites:
+            self.add(site)
+
+    def add(self, site):
+        key = cell_key(self.provider, site['lat'], site['lon'], self.degrees)
+        self.cells.setdefault(key, []).append(site)
+        return key
+
+    def fetch_site(self, key):
+        """Site dict to fetch for a cell: the first member, moved to the cell center"""
+        lat, lon = cell_center(key, self.degrees)
+        return dict(self.cells[key][0], lat=lat, lon=lon)
+
+    def __iter__(self):
+        """(fetch_site, member_sites) per cell"""
+        for key, members in self.cells.items():
+            yield self.fetch_site(key), members
+
+    def __len__(self):
+        return len(self.cells)
+
+    def sites(self):
+        return sum(len(members) for members in self.cells.values())
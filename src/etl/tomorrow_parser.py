@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Vectorized parser for Tomorrow.io v4 timeline payloads
+
+Normalizes every timeline in a forecast response (minutely, hourly, daily)
+into one typed DataFrame each, in a single columnar pass per timeline. Every
+field in `values` becomes a snake_case column (solarGHI -> solar_ghi,
+temperatureApparent -> temperature_apparent), including fields we don't
+store yet, so new fields show up without code changes.
+
+    python -m src.etl.tomorrow_parser [iterations]   # parse-time benchmark
+"""
+
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+TIMELINES = ('minutely', 'hourly', 'daily')
+
+# Integer-coded fields; everything else numeric is float
+INTEGER_FIELDS = {'weather_code', 'weather_code_max', 'weather_code_min',
+                  'uv_index', 'uv_index_max', 'uv_index_min', 'uv_index_avg',
+                  'uv_health_concern', 'uv_health_concern_max', 'uv_health_concern_min',
+                  'uv_health_concern_avg'}
+
+# Precipitation types summed into precipitation_intensity when the API has no total
+INTENSITY_FIELDS = ['rain_intensity', 'snow_intensity', 'sleet_intensity', 'freezing_rain_intensity']
+
+# api_ingest.tomorrow_weather value columns (see migrations.py)
+TOMORROW_WEATHER_COLUMNS = [
+    'temperature', 'temperature_apparent', 'humidity', 'dew_point',
+    'wind_speed', 'wind_gust', 'wind_direction',
+    'cloud_cover', 'cloud_base', 'cloud_ceiling',
+    'precipitation_intensity', 'precipitation_probability',
+    'rain_intensity', 'snow_intensity', 'sleet_intensity', 'freezing_rain_intensity',
+    'rain_accumulation', 'snow_accumulation', 'sleet_accumulation', 'ice_accumulation',
+    'snow_depth', 'evapotranspiration',
+    'pressure_surface_level', 'pressure_sea_level', 'altimeter_setting', 'visibility',
+    'uv_index', 'uv_health_concern', 'weather_code',
+    'solar_ghi', 'solar_dni', 'solar_dhi'
+]
+
+_CAMEL = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+
+
+def snake_case(name):
+    """camelCase field name -> snake_case column (acronyms kept together)"""
+    return _CAMEL.sub('_', name).lower()
+
+
+def parse_timeline(entries):
+    """One timeline's [{'time', 'values'}] entries as a typed DataFrame"""
+    if not entries:
+        return pd.DataFrame({'valid_time': pd.Series(dtype='datetime64[ns, UTC]')})
+
+    values = pd.DataFrame.from_records([entry.get('values') or {} for entry in entries])
+    values.columns = [snake_case(c) for c in values.columns]
+
+    for column in values.columns:
+        if column.endswith('_time'):
+            # Daily sunrise/sunset/moonrise... times
+            values[column] = pd.to_datetime(values[column], utc=True, errors='coerce')
+        elif column in INTEGER_FIELDS:
+            values[column] = pd.to_numeric(values[column], errors='coerce').round().astype('Int64')
+        elif values[column].dtype == object:
+            values[column] = pd.to_numeric(values[column], errors='coerce')
+
+    valid_time = pd.to_datetime([entry.get('time') for entry in entries], utc=True)
+    values.insert(0, 'valid_time', valid_time)
+    return values
+
+
+def parse_timelines(payload):
+    """{'minutely': df, 'hourly': df, 'daily': df} for a forecast response"""
+    timelines = (payload or {}).get('timelines') or {}
+    return {name: parse_timeline(timelines.get(name) or []) for name in TIMELINES}
+
+
+def forecast_rows(hourly, lat, lon, forecast_time, payload_hash=None, hours=None):
+    """api_ingest.tomorrow_weather rows from a parsed hourly timeline"""
+    if hours is not None:
+        hourly = hourly.iloc[:hours]
+
+    rows = pd.DataFrame({
+        'location_lat': lat,
+        'location_lon': lon,
+        'forecast_time': forecast_time,
+        'valid_time': hourly['valid_time'].to_numpy()
+    }, index=hourly.index)
+
+    if 'precipitation_intensity' not in hourly:
+        present = [c for c in INTENSITY_FIELDS if c in hourly]
+        if present:
+            hourly = hourly.assign(precipitation_intensity=hourly[present].sum(axis=1, min_count=1))
+
+    # .array keeps the nullable Int64 columns integer; to_numpy() would make them float
+    # and COPY would send "3.0" to the INTEGER columns
+    for column in TOMORROW_WEATHER_COLUMNS:
+        if column in hourly:
+            rows[column] = hourly[column].array
+        elif column in INTEGER_FIELDS:
+            rows[column] = pd.array([pd.NA] * len(rows), dtype='Int64')
+        else:
+            rows[column] = np.nan
+
+    rows['valid_time'] = pd.to_datetime(rows['valid_time'], utc=True)
+    rows['raw_payload_hash'] = payload_hash
+    return rows.reset_index(drop=True)
+
+
+def _legacy_parse(payload, lat, lon, forecast_time, hours=None):
+    """The per-interval dict loop this module replaces (benchmark baseline only)"""
+    records = []
+    for interval in payload['timelines']['hourly'][:hours]:
+        values = interval.get('values', {})
+        records.append({
+            'location_lat': lat,
+            'location_lon': lon,
+            'forecast_time': forecast_time,
+            'valid_time': pd.to_datetime(interval.get('time')),
+            'temperature': values.get('temperature'),
+            'cloud_cover': values.get('cloudCover'),
+            'precipitation_intensity': values.get('precipitationProbability', 0),
+            'humidity': values.get('humidity'),
+            'wind_speed': values.get('windSpeed'),
+            'dew_point': values.get('dewPoint')
+        })
+    return pd.DataFrame(records)
+
+
+def benchmark(iterations=200, forecast_hours=120, minutely=60):
+    """Per-payload parse time for a 120-hour hourly + 1-minute minutely forecast"""
+    from src.etl.mock_api import MockConfig, tomorrow_forecast_payload
+
+    config = MockConfig(forecast_hours=forecast_hours, minutely=minutely)
+    payload = tomorrow_forecast_payload({'location': ['33.4484,-112.0740']}, config)
+    forecast_time = pd.Timestamp.utcnow().tz_localize(None)
+
+    def timed(fn):
+        fn()  # warm up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - start) / iterations * 1000
+
+    frames = parse_timelines(payload)
+    print(f"⏱️  Tomorrow.io parse benchmark ({iterations} iterations): "
+          + ", ".join(f"{name} {len(df)} rows x {df.shape[1]} cols" for name, df in frames.items()))
+
+    legacy_ms = timed(lambda: _legacy_parse(payload, 33.4484, -112.0740, forecast_time))
+    full_ms = timed(lambda: parse_timelines(payload))
+    rows_ms = timed(lambda: forecast_rows(parse_timeline(payload['timelines']['hourly']),
+                                          33.4484, -112.0740, forecast_time))
+    print(f"  legacy loop (hourly, 6 fields):        {legacy_ms:.2f} ms/payload")
+    print(f"  hourly -> tomorrow_weather rows:       {rows_ms:.2f} ms/payload "
+          f"({legacy_ms / rows_ms:.1f}x faster)")
+    print(f"  all timelines, every field:            {full_ms:.2f} ms/payload")
+    return {'legacy_ms': legacy_ms, 'rows_ms': rows_ms, 'all_timelines_ms': full_ms}
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,22 @@
+import json
+import sys
+
+from src.etl.cli import arg, load_sites
+
+
+def test_arg(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['prog', '--workers', '8', '--name', 'x'])
+
+    assert arg('--workers', 4, int) == 8
+    assert arg('--name', None) == 'x'
+    assert arg('--missing', 'default') == 'default'
+
+
+def test_load_sites(monkeypatch, tmp_path):
+    path = tmp_path / 'sites.json'
+    path.write_text(json.dumps([{'lat': 1.0, 'lon': 2.0}]))
+
+    monkeypatch.setattr(sys, 'argv', ['prog'])
+    assert load_sites() is None
+    monkeypatch.setattr(sys, 'argv', ['prog', '--sites', str(path)])
+    assert load_sites() == [{'lat': 1.0, 'lon': 2.0}]
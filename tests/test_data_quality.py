@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.data_quality import RULES, DataQuality, ghi_upper_limit
+
+BITS = {rule.name: rule.bit for rule in RULES['nrel_pvdaq']}
+
+
+def pv_frame(**columns):
+    n = len(next(iter(columns.values())))
+    return pd.DataFrame(dict({'site_id': 'SITE',
+                              'timestamp': pd.date_range('2024-06-21 00:00', periods=n, freq='h')}, **columns))
+
+
+@pytest.fixture
+def quality():
+    return DataQuality(engine=None)
+
+
+def test_bits_are_unique():
+    bits = [rule.bit for rules in RULES.values() for rule in rules]
+    assert len(bits) == len(set(bits))
+    assert all(bit & (bit - 1) == 0 for bit in bits)
+
+
+def test_tables_without_rules_pass_through(quality):
+    df = pd.DataFrame({'temperature': [20.0]})
+    clean, quarantined = quality.check(df, 'tomorrow_weather')
+    assert clean is df and quarantined is None
+
+
+def test_frames_no_rule_applies_to_get_zero_flags(quality):
+    clean, quarantined = quality.check(pd.DataFrame({'site_id': ['A'], 'note': ['x']}), 'nrel_pvdaq')
+    assert clean['dq_flags'].tolist() == [0] and quarantined is None
+
+
+def test_generation_without_irradiance_columns_is_not_checked(quality):
+    clean, quarantined = quality.check(pv_frame(ac_power=[1500.0, 0.0]), 'nrel_pvdaq')
+    assert clean['dq_flags'].tolist() == [0, 0] and quarantined is None
+
+
+def test_quarantine_rules_divert_rows(quality):
+    df = pv_frame(ghi=[100.0, -20.0, 5000.0, 300.0], ambient_temp=[20.0, 20.0, 20.0, 75.0])
+    clean, quarantined = quality.check(df, 'nrel_pvdaq', latitude=33.45)
+
+    assert clean['ghi'].tolist() == [100.0]
+    assert clean['dq_flags'].tolist() == [0]
+    assert quarantined['table_name'].unique().tolist() == ['nrel_pvdaq']
+    assert quarantined['dq_flags'].tolist() == [BITS['negative_irradiance'], BITS['ghi_above_clear_sky'],
+                                                BITS['temperature_out_of_range']]
+    assert quarantined['row_json'].str.contains('"ghi"').all()
+
+
+def test_flag_rules_keep_rows(quality):
+    # AC output with zero irradiance at night
+    df = pv_frame(poa_irradiance=[0.0, 500.0], ac_power=[800.0, 1500.0])
+    clean, quarantined = quality.check(df, 'nrel_pvdaq')
+
+    assert quarantined is None
+    assert clean['dq_flags'].tolist() == [BITS['night_generation'], 0]
+
+
+def test_stuck_sensor_needs_the_full_duration(quality):
+    stuck = pv_frame(poa_irradiance=[400.0] * 6 + [410.0])
+    clean, _ = quality.check(stuck, 'nrel_pvdaq')
+    assert (clean['dq_flags'].to_numpy()[:6] & BITS['stuck_sensor']).all()
+    assert clean['dq_flags'].iloc[6] & BITS['stuck_sensor'] == 0
+
+    short = pv_frame(poa_irradiance=[400.0] * 3 + [410.0])
+    clean, _ = quality.check(short, 'nrel_pvdaq')
+    assert not (clean['dq_flags'].to_numpy() & BITS['stuck_sensor']).any()
+
+
+def test_counts_accumulate_per_rule(quality):
+    quality.check(pv_frame(ghi=[100.0, -20.0]), 'nrel_pvdaq')
+    quality.check(pv_frame(ghi=[-30.0]), 'nrel_pvdaq')
+
+    counts = quality.stats()[('nrel_pvdaq', 'negative_irradiance', 'quarantine')]
+    assert counts == {'rows_checked': 3, 'violations': 2}
+
+
+def test_ghi_limit_is_lower_away_from_the_sun():
+    noon = pd.DatetimeIndex(['2024-06-21'])
+    assert ghi_upper_limit(noon, latitude=23.45)[0] > ghi_upper_limit(noon, latitude=60.0)[0]
+    assert ghi_upper_limit(noon)[0] == pytest.approx(1.2 * 1361 * (1 + 0.033 * np.cos(2 * np.pi * 173 / 365)) + 50)
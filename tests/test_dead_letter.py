@@ -0,0 +1,119 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from src.etl.data_quality import DataQuality
+from src.etl.dead_letter import DeadLetterQueue, replay, rows_frame
+from src.etl.ingest_engine import IngestEngine
+from src.etl.pipeline import Pipeline, BatchWriteStage
+
+
+class RecordingWriter:
+    """upsert() stand-in that keeps what it was given and rejects `failing` tables"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.upserts = defaultdict(list)
+
+    def upsert(self, df, table, schema='api_ingest'):
+        if table in self.failing:
+            raise RuntimeError('simulated write failure')
+        self.upserts[f"{schema}.{table}"].append(df)
+        return len(df)
+
+    def rows(self, table_ref):
+        return sum(len(df) for df in self.upserts[table_ref])
+
+
+class OfflineQuality(DataQuality):
+    def record_counts(self):
+        return 0
+
+
+@pytest.fixture
+def dlq(tmp_path):
+    queue = DeadLetterQueue(str(tmp_path))
+    yield queue
+    queue.close()
+
+
+def entries(dlq):
+    dlq.close()
+    return [entry for path in dlq.segments() for entry in dlq.read_segment(path)]
+
+
+def pv_rows(site_id, ambient_temp):
+    return pd.DataFrame({
+        'site_id': site_id,
+        'timestamp': pd.date_range('2024-06-01 12:00', periods=len(ambient_temp), freq='h'),
+        'ac_power': 1500.0,
+        'poa_irradiance': 800.0,
+        'ambient_temp': ambient_temp,
+    })
+
+
+def test_rows_round_trip(dlq):
+    df = pv_rows('A', [20.0, 21.5])
+    dlq.put_rows(df, 'nrel_pvdaq', error='boom')
+    dlq.put_fetch('pvwatts_hourly', [{'site_id': 'A', 'lat': 33.4, 'lon': -112.0}], 'timeout')
+
+    stored = entries(dlq)
+    assert [e['kind'] for e in stored] == ['rows', 'fetch']
+    restored = rows_frame(stored[0])
+    assert restored['ambient_temp'].tolist() == [20.0, 21.5]
+    assert pd.to_datetime(restored['timestamp']).tolist() == df['timestamp'].tolist()
+
+    stats = dlq.stats()
+    assert stats['rows'] == {'api_ingest.nrel_pvdaq': 2}
+    assert stats['fetch'] == {'pvwatts_hourly': 1}
+
+
+def test_final_flush_dead_letters_only_the_failed_table(dlq):
+    # The engine's error handling, without its database connection
+    engine = IngestEngine.__new__(IngestEngine)
+    engine.dead_letters = dlq
+    writer = RecordingWriter(failing={'failing'})
+
+    # The failing table is buffered first, so it is flushed before the other one
+    items = [('api_ingest', 'failing', pd.DataFrame({'site_id': ['A', 'B'], 'value': [1.0, 2.0]})),
+             ('api_ingest', 'written', pd.DataFrame({'site_id': ['C', 'D', 'E'], 'value': [3.0, 4.0, 5.0]})),
+             ('api_ingest', 'failing', pd.DataFrame({'site_id': ['F'], 'value': [6.0]}))]
+    Pipeline([BatchWriteStage(writer)], on_error=engine._on_error, name='flush').run(iter(items))
+
+    dead = entries(dlq)
+    assert [(e['kind'], e['table'], e['row_count']) for e in dead] == [('rows', 'failing', 3)]
+    assert writer.rows('api_ingest.written') == 3
+
+
+def test_replay_validates_rows_that_failed_validation(dlq):
+    # Failed in the validate stage: never checked, one row out of range
+    dlq.put_rows(pv_rows('UNCHECKED', [20.0, 95.0]), 'nrel_pvdaq', error='boom',
+                 stage='validate', latitude=33.45)
+    # Failed in the write stage: already validated, written as it is
+    dlq.put_rows(pv_rows('CHECKED', [21.0]).assign(dq_flags=0), 'nrel_pvdaq', error='boom')
+    dlq.close()
+
+    writer = RecordingWriter()
+    engine = SimpleNamespace(writer=writer, quality=OfflineQuality(None))
+    result = replay(dlq, engine=engine)
+
+    assert result['rows_written'] == {'api_ingest.nrel_pvdaq': 2, 'api_ingest.dq_quarantine': 1}
+    written = pd.concat(writer.upserts['api_ingest.nrel_pvdaq'], ignore_index=True)
+    assert sorted(written['site_id']) == ['CHECKED', 'UNCHECKED']
+    assert written['dq_flags'].notna().all()
+    quarantined = writer.upserts['api_ingest.dq_quarantine'][0]
+    assert quarantined['site_id'].tolist() == ['UNCHECKED']
+    assert dlq.segments() == []
+
+
+def test_replay_dead_letters_failed_writes_again(dlq):
+    dlq.put_rows(pv_rows('A', [20.0]).assign(dq_flags=0), 'nrel_pvdaq', error='boom')
+    dlq.close()
+
+    engine = SimpleNamespace(writer=RecordingWriter(failing={'nrel_pvdaq'}), quality=OfflineQuality(None))
+    assert replay(dlq, engine=engine)['rows_written'] == {}
+
+    again = entries(dlq)
+    assert [(e['table'], e['stage'], e['row_count']) for e in again] == [('nrel_pvdaq', 'replay', 1)]
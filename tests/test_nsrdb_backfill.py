@@ -0,0 +1,19 @@
+from src.etl.nsrdb_backfill import nsrdb_site_id, partitions
+
+SITES = [
+    {'name': 'Phoenix', 'lat': 33.4484, 'lon': -112.0740, 'site_id': 'PHOENIX'},
+    {'lat': 39.7392, 'lon': -104.9903},
+]
+
+
+def test_site_id_from_site_id_or_coordinates():
+    assert nsrdb_site_id(SITES[0]) == 'NSRDB_PHOENIX'
+    assert nsrdb_site_id(SITES[1]) == 'NSRDB_39.7392_-104.9903'
+    assert nsrdb_site_id({'lat': '39.7392', 'lon': '-104.99030001'}) == 'NSRDB_39.7392_-104.9903'
+
+
+def test_partitions_skip_completed_oldest_year_first():
+    done = {('NSRDB_PHOENIX', 2020), ('NSRDB_39.7392_-104.9903', 2021)}
+    todo = [(nsrdb_site_id(site), year) for site, year in partitions(SITES, 2020, 2021, done)]
+
+    assert todo == [('NSRDB_39.7392_-104.9903', 2020), ('NSRDB_PHOENIX', 2021)]
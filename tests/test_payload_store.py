@@ -0,0 +1,66 @@
+import zlib
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+from src.etl.payload_store import PayloadStore, payload_hash
+
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite with an api_ingest.raw_payloads table shaped like the migration's"""
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def attach(dbapi_connection, _):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS api_ingest")
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE api_ingest.raw_payloads (
+                payload_hash CHAR(64) PRIMARY KEY,
+                source VARCHAR(50),
+                content_type VARCHAR(100),
+                raw_bytes INTEGER,
+                stored_bytes INTEGER,
+                payload BLOB
+            )
+        """))
+    return engine
+
+
+def stored_rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT payload_hash, raw_bytes, payload FROM api_ingest.raw_payloads")).fetchall()
+
+
+def test_put_get_round_trip(engine):
+    store = PayloadStore(engine)
+    body = b'{"outputs": {"avg_ghi": {"annual": 5.9}}}' * 20
+
+    digest = store.put(body, 'nrel_solar_resource')
+
+    assert digest == payload_hash(body)
+    assert store.get(digest) == body
+    assert store.get('0' * 64) is None
+    (row,) = stored_rows(engine)
+    assert row.raw_bytes == len(body)
+    assert len(row.payload) < len(body) and zlib.decompress(row.payload) == body
+
+
+def test_same_body_is_stored_once(engine):
+    body = '{"a": 1}'
+    first, second = PayloadStore(engine), PayloadStore(engine)
+
+    assert first.put(body, 'test') == first.put(body.encode('utf-8'), 'test') == second.put(body, 'test')
+
+    assert len(stored_rows(engine)) == 1
+    assert first.stats()['stored'] == 1 and first.stats()['deduped'] == 1
+    # Another process already stored it: the insert is a no-op
+    assert second.stats()['stored'] == 0 and second.stats()['deduped'] == 1
+
+
+def test_get_json(engine):
+    store = PayloadStore(engine)
+    assert store.get_json(store.put('{"a": [1, 2]}', 'test')) == {'a': [1, 2]}
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+
+from src.etl.pipeline import BatchWriteError, BatchWriteStage, Pipeline, Stage
+
+
+class RecordingWriter:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.batches = defaultdict(list)
+
+    def upsert(self, df, table, schema='api_ingest'):
+        if table in self.failing:
+            raise RuntimeError('simulated write failure')
+        self.batches[table].append(len(df))
+        return len(df)
+
+
+def frame(n):
+    return pd.DataFrame({'value': range(n)})
+
+
+def run_with_timeout(pipeline, source, seconds=10):
+    """pipeline.run(source), failing the test instead of hanging"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(outputs=pipeline.run(source)), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), 'pipeline did not finish'
+    return result['outputs']
+
+
+def test_items_flow_through_every_stage():
+    def split(n):
+        for i in range(n):
+            yield i
+
+    stages = [Stage('double', lambda n: n * 2, workers=3),
+              Stage('split', split, workers=2),
+              Stage('drop_odd', lambda n: n if n % 2 == 0 else None)]
+    outputs = Pipeline(stages).run(iter([1, 2, 3]))
+
+    assert sorted(outputs) == [0, 0, 0, 2, 2, 4]
+
+
+def test_stats_count_items_per_stage():
+    pipeline = Pipeline([Stage('square', lambda n: n * n, workers=2)])
+    pipeline.run(iter(range(10)))
+
+    stats = pipeline.stats()
+    assert stats['source']['out'] == 10
+    assert stats['square']['in'] == 10 and stats['square']['out'] == 10
+
+
+def test_failed_items_go_to_on_error_and_the_rest_continue():
+    errors = []
+
+    def check(n):
+        if n == 3:
+            raise ValueError('bad item')
+        return n
+
+    pipeline = Pipeline([Stage('check', check, workers=2)],
+                        on_error=lambda stage, item, exc: errors.append((stage, item, str(exc))))
+    outputs = pipeline.run(iter(range(6)))
+
+    assert sorted(outputs) == [0, 1, 2, 4, 5]
+    assert errors == [('check', 3, 'bad item')]
+    assert pipeline.stats()['check']['errors'] == 1
+
+
+def test_a_failing_error_handler_does_not_hang_the_run():
+    def handler(stage, item, exc):
+        raise RuntimeError('handler broke')
+
+    def fail(n):
+        raise ValueError('bad item')
+
+    pipeline = Pipeline([Stage('fail', fail, workers=2), Stage('after', lambda n: n)], on_error=handler)
+    assert run_with_timeout(pipeline, iter(range(5))) == []
+    assert pipeline.stats()['fail']['lost'] == 5
+
+
+def test_bounded_queues_hold_the_source_back():
+    def slow(n):
+        time.sleep(0.005)
+        return n
+
+    pipeline = Pipeline([Stage('slow', slow)], queue_size=2)
+    assert len(pipeline.run(iter(range(30)))) == 30
+    assert pipeline.stats()['source']['max_queue'] <= 2
+    assert pipeline.stats()['source']['blocked_seconds'] > 0
+
+
+def test_batch_write_groups_rows_per_table():
+    writer = RecordingWriter()
+    write = BatchWriteStage(writer, batch_rows=10)
+    items = [('api_ingest', 'a', frame(4)) for _ in range(5)] + [('api_ingest', 'b', frame(3))]
+
+    outputs = Pipeline([write]).run(iter(items))
+
+    # 4+4+4 reaches the batch size, the remaining 8 rows go out in the final flush
+    assert writer.batches == {'a': [12, 8], 'b': [3]}
+    assert sorted(outputs) == [('api_ingest.a', 8), ('api_ingest.a', 12), ('api_ingest.b', 3)]
+    assert write.rows == {'api_ingest.a': 20, 'api_ingest.b': 3}
+
+
+def test_failed_batch_reports_every_buffered_row():
+    errors = []
+    write = BatchWriteStage(RecordingWriter(failing={'a'}), batch_rows=10)
+    items = [('api_ingest', 'a', frame(6)), ('api_ingest', 'a', frame(6))]
+
+    Pipeline([write], on_error=lambda stage, item, exc: errors.append(exc)).run(iter(items))
+
+    (error,) = errors
+    assert isinstance(error, BatchWriteError)
+    assert (error.schema, error.table, len(error.df)) == ('api_ingest', 'a', 12)
+
+
+def test_final_flush_writes_the_other_tables_when_one_fails():
+    errors = []
+    writer = RecordingWriter(failing={'a'})
+    items = [('api_ingest', 'a', frame(2)), ('api_ingest', 'b', frame(3))]
+
+    Pipeline([BatchWriteStage(writer)], on_error=lambda stage, item, exc: errors.append(item)).run(iter(items))
+
+    assert writer.batches == {'b': [3]}
+    assert [(schema, table, len(df)) for schema, table, df in errors] == [('api_ingest', 'a', 2)]
+
+
+def test_flush_outside_a_pipeline_raises():
+    write = BatchWriteStage(RecordingWriter(failing={'a'}))
+    write.fn(('api_ingest', 'a', frame(2)))
+
+    with pytest.raises(BatchWriteError):
+        list(write.flush())
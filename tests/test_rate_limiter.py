@@ -0,0 +1,86 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.etl.rate_limiter import (PRIORITY_BACKFILL, PRIORITY_REALTIME, RequestScheduler, TokenBucket,
+                                  api_key_from_params, parse_retry_after, provider_for_url)
+
+
+def test_bucket_allows_a_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    now = bucket.updated
+
+    assert [bucket.try_take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_take(now) == pytest.approx(0.5)
+    assert bucket.try_take(now + 0.5) == 0.0
+    # Idle time never banks more than the capacity
+    assert [bucket.try_take(now + 100) for _ in range(4)][-1] > 0
+
+
+def test_pause_blocks_until_it_ends():
+    bucket = TokenBucket(rate=100.0, capacity=10)
+    now = bucket.updated
+    bucket.pause(30, now)
+
+    assert bucket.try_take(now + 10) == pytest.approx(20)
+    assert bucket.try_take(now + 30.1) == 0.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('12') == 12.0
+    assert parse_retry_after(None) == 60
+    assert parse_retry_after('soon', default=5) == 5
+    http_date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(http_date) <= 30
+
+
+def test_provider_and_key_lookup():
+    assert provider_for_url('https://api.tomorrow.io/v4/weather/forecast') == 'Tomorrow.io'
+    assert provider_for_url('https://example.com/') is None
+    assert api_key_from_params({'appid': 'k'}) == 'k'
+    assert api_key_from_params(None) is None
+
+
+def test_unknown_providers_are_not_limited():
+    assert RequestScheduler(limits={}).acquire('Nobody') == 0.0
+
+
+def test_realtime_requests_go_before_queued_backfill():
+    scheduler = RequestScheduler(limits={'Test': (10.0, 1)})
+    scheduler.acquire('Test')  # empty the bucket; the next token is 100 ms away
+    order = []
+
+    def request(priority, label):
+        scheduler.acquire('Test', priority=priority)
+        order.append(label)
+
+    backfill = threading.Thread(target=request, args=(PRIORITY_BACKFILL, 'backfill'))
+    realtime = threading.Thread(target=request, args=(PRIORITY_REALTIME, 'realtime'))
+    backfill.start()
+    time.sleep(0.02)
+    realtime.start()
+    backfill.join(5)
+    realtime.join(5)
+
+    assert order == ['realtime', 'backfill']
+    assert scheduler.stats()['Test']['requests'] == 3
+
+
+def test_429_pauses_the_bucket_per_key():
+    scheduler = RequestScheduler(limits={'Test': (1000.0, 10)})
+    scheduler.acquire('Test', api_key='secret-key')
+    scheduler.report('Test', 'secret-key', SimpleNamespace(status_code=429, headers={'Retry-After': '0.2'}))
+
+    start = time.monotonic()
+    scheduler.acquire('Test', api_key='other-key')
+    assert time.monotonic() - start < 0.1
+    scheduler.acquire('Test', api_key='secret-key')
+    assert time.monotonic() - start >= 0.15
+
+    stats = scheduler.stats()
+    assert sum(s['throttled'] for s in stats.values()) == 1
+    assert not any('secret' in name for name in stats)
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from src.etl import response_cache
+from src.etl.response_cache import ResponseCache, cache_key
+
+
+class FakeResponse:
+    status_code = 200
+    from_cache = False
+
+    def __init__(self, content):
+        self.content = content
+        self.headers = {'Content-Type': 'application/json'}
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """URLs fetched from the network; the body is the fetch count, padded to a fixed size"""
+    calls = []
+
+    def get(url, params=None, **kwargs):
+        calls.append(url)
+        return FakeResponse(str(len(calls)).encode().ljust(100))
+
+    monkeypatch.setattr(response_cache.http_client, 'get', get)
+    return calls
+
+
+def disk_bytes(cache):
+    return sum(size for _, size, _ in cache._entries())
+
+
+def test_hit_after_miss(tmp_path, fetched):
+    cache = ResponseCache(str(tmp_path), ttls={'https://static/': None})
+
+    first = cache.get('https://static/a', params={'lat': 1, 'api_key': 'secret'})
+    second = cache.get('https://static/a', params={'lat': 1, 'api_key': 'other'})
+
+    assert fetched == ['https://static/a']
+    assert second.from_cache and second.content == first.content
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_api_keys_do_not_change_the_key():
+    assert cache_key('https://x', {'lat': 1, 'apikey': 'a'}) == cache_key('https://x', {'lat': '1'})
+    assert cache_key('https://x', {'lat': 1}) != cache_key('https://x', {'lat': 2})
+
+
+def test_uncached_endpoints_bypass(tmp_path, fetched):
+    cache = ResponseCache(str(tmp_path), ttls={'https://static/': None})
+
+    cache.get('https://live/a')
+    cache.get('https://live/a')
+
+    assert len(fetched) == 2
+    assert cache.stats()['bypass'] == 2
+    assert disk_bytes(cache) == 0
+
+
+def test_refreshing_expired_entries_keeps_size_exact(tmp_path, fetched):
+    cache = ResponseCache(str(tmp_path), ttls={'https://ttl/': 0})
+
+    for _ in range(5):
+        cache.get('https://ttl/a')
+        cache.get('https://ttl/b')
+
+    assert len(fetched) == 10
+    assert cache.stats()['expired'] == 8
+    assert cache._size == disk_bytes(cache)
+    assert cache.stats()['evictions'] == 0
+
+
+def test_evicts_least_recently_used(tmp_path, fetched):
+    cache = ResponseCache(str(tmp_path), ttls={'https://static/': None})
+    cache.get('https://static/a')
+    entry_bytes = disk_bytes(cache)
+    cache.max_bytes = 2 * entry_bytes + 10
+
+    cache.get('https://static/b')
+    os.utime(cache._path(cache_key('https://static/a')), (1, 1))
+    os.utime(cache._path(cache_key('https://static/b')), (2, 2))
+    cache.get('https://static/c')
+
+    assert cache.stats()['evictions'] == 1
+    assert not os.path.exists(cache._path(cache_key('https://static/a')))
+    assert os.path.exists(cache._path(cache_key('https://static/b')))
+    assert cache._size == disk_bytes(cache) <= cache.max_bytes
+
+
+def test_no_temp_files_left(tmp_path, fetched):
+    cache = ResponseCache(str(tmp_path), ttls={'https://static/': None})
+    cache.get('https://static/a')
+
+    names = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert names == [cache_key('https://static/a')]
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from src.etl.ingest_engine import IngestEngine, IngestJob, relabel_site_id
+from src.etl.spatial_index import SpatialIndex, cell_center, cell_degrees, cell_key
+
+PHOENIX = {'name': 'Phoenix', 'lat': 33.4484, 'lon': -112.0740, 'site_id': 'PHOENIX'}
+TEMPE = {'name': 'Tempe', 'lat': 33.4500, 'lon': -112.0790, 'site_id': 'TEMPE'}
+DENVER = {'name': 'Denver', 'lat': 39.7392, 'lon': -104.9903, 'site_id': 'DENVER'}
+
+
+def test_nearby_sites_share_a_cell():
+    index = SpatialIndex('NREL', [PHOENIX, TEMPE, DENVER], degrees=0.04)
+
+    assert len(index) == 2 and index.sites() == 3
+    cells = list(index)
+    assert cells[0][1] == [PHOENIX, TEMPE]
+    assert cells[1][1] == [DENVER]
+
+
+def test_fetch_site_is_the_first_member_at_the_cell_center():
+    index = SpatialIndex('NREL', [PHOENIX, TEMPE], degrees=0.04)
+    (fetch_site, _), = list(index)
+
+    assert fetch_site['site_id'] == 'PHOENIX'
+    assert (fetch_site['lat'], fetch_site['lon']) == (33.46, -112.06)
+    assert PHOENIX['lat'] == 33.4484  # members are not modified
+
+
+def test_cells_floor_negative_coordinates():
+    key = cell_key('NREL', -0.01, -0.01, degrees=0.04)
+    assert key == ('NREL', -1, -1)
+    assert cell_center(key, degrees=0.04) == (-0.02, -0.02)
+
+
+def test_cell_size_overrides(monkeypatch):
+    assert cell_degrees('NREL') == 0.04
+    assert cell_degrees('NOAA') is None
+
+    monkeypatch.setenv('CELL_DEGREES_TOMORROW_IO', '0.05')
+    monkeypatch.setenv('CELL_DEGREES_NREL', '0')
+    assert cell_degrees('Tomorrow.io') == pytest.approx(0.05)
+    assert cell_degrees('NREL') is None
+
+
+def test_engine_fetches_once_per_cell_and_fans_out():
+    engine = IngestEngine.__new__(IngestEngine)
+    engine.snap_to_cells = True
+    job = IngestJob('monthly', 'NREL', 'nrel_pvdaq', fetch=None, fan_out=relabel_site_id('NREL_MONTHLY'))
+
+    plan = engine._plan([PHOENIX, TEMPE, DENVER], job)
+    assert [members for _, members in plan] == [[PHOENIX, TEMPE], [DENVER]]
+
+    fetch_site, members = plan[0]
+    df = pd.DataFrame({'site_id': ['NREL_MONTHLY_PHOENIX'], 'ghi': [5.9]})
+    rows = list(IngestEngine._transform_stage().fn((job, members, df, fetch_site)))
+    assert [(table, out['site_id'].tolist()) for _, table, out, _ in rows] == [
+        ('nrel_pvdaq', ['NREL_MONTHLY_PHOENIX']), ('nrel_pvdaq', ['NREL_MONTHLY_TEMPE'])]
@@ -0,0 +1,81 @@
+import re
+
+import pandas as pd
+
+from src.etl.bulk_writer import frame_to_csv
+from src.etl.migrations import MIGRATIONS
+from src.etl.mock_api import MockConfig, tomorrow_forecast_payload
+from src.etl.tomorrow_parser import TOMORROW_WEATHER_COLUMNS, forecast_rows, parse_timeline, snake_case
+
+FORECAST_TIME = pd.Timestamp('2024-06-01 12:00:00')
+
+
+def tomorrow_weather_types():
+    """{column: 'FLOAT' | 'INTEGER'} for api_ingest.tomorrow_weather, from the migrations"""
+    types = {}
+    for _, _, sql in MIGRATIONS:
+        for statement in sql.split(';'):
+            if re.search(r'(CREATE TABLE IF NOT EXISTS|ALTER TABLE) api_ingest\.tomorrow_weather\b', statement):
+                pattern = r'^\s+(?:ADD COLUMN IF NOT EXISTS )?(\w+) (FLOAT|INTEGER)\b'
+                types.update(re.findall(pattern, statement, re.M))
+    return types
+
+
+def hourly_rows(hours=24, **kwargs):
+    payload = tomorrow_forecast_payload({'location': ['33.4484,-112.0740']}, MockConfig(forecast_hours=hours))
+    hourly = parse_timeline(payload['timelines']['hourly'])
+    return forecast_rows(hourly, 33.4484, -112.074, FORECAST_TIME, **kwargs)
+
+
+def test_snake_case():
+    assert snake_case('solarGHI') == 'solar_ghi'
+    assert snake_case('temperatureApparent') == 'temperature_apparent'
+    assert snake_case('uvHealthConcern') == 'uv_health_concern'
+
+
+def test_forecast_rows_match_target_column_types():
+    rows = hourly_rows()
+    types = tomorrow_weather_types()
+
+    assert set(TOMORROW_WEATHER_COLUMNS) <= set(types)
+    for column in TOMORROW_WEATHER_COLUMNS:
+        if types[column] == 'INTEGER':
+            assert pd.api.types.is_integer_dtype(rows[column]), column
+        else:
+            assert pd.api.types.is_float_dtype(rows[column]), column
+
+
+def test_integer_columns_copy_without_decimals():
+    rows = hourly_rows()[['uv_index', 'weather_code', 'uv_health_concern']]
+    lines = frame_to_csv(rows).read().splitlines()
+
+    assert lines
+    for line in lines:
+        uv_index, weather_code, uv_health_concern = line.split(',')
+        assert uv_index.isdigit() and weather_code in ('1000', '1102')
+        # Not in the mock payload, so NULL
+        assert uv_health_concern == '\\N'
+
+
+def test_integer_columns_with_gaps_stay_integer():
+    payload = tomorrow_forecast_payload({'location': ['33.4484,-112.0740']}, MockConfig(forecast_hours=3))
+    entries = payload['timelines']['hourly']
+    del entries[1]['values']['uvIndex']
+    rows = forecast_rows(parse_timeline(entries), 33.4484, -112.074, FORECAST_TIME)
+
+    assert str(rows['uv_index'].dtype) == 'Int64'
+    assert rows['uv_index'].isna().tolist() == [False, True, False]
+    assert '.0' not in frame_to_csv(rows[['uv_index']]).read()
+
+
+def test_forecast_rows_hours_and_payload_hash():
+    rows = hourly_rows(hours=5, payload_hash='a' * 64)
+
+    assert len(rows) == 5
+    assert list(rows.index) == list(range(5))
+    assert (rows['raw_payload_hash'] == 'a' * 64).all()
+    assert str(rows['valid_time'].dtype) == 'datetime64[ns, UTC]'
+
+
+def test_empty_timeline():
+    assert parse_timeline([]).columns.tolist() == ['valid_time']
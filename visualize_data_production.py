@@ -211,6 +211,7 @@ try:
     tomorrow_df = pd.read_sql("""
         SELECT valid_time, temperature, cloud_cover, humidity
         FROM api_ingest.tomorrow_weather
+        WHERE valid_time >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '24 hours'
         ORDER BY valid_time
         LIMIT 48
     """, engine)